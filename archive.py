@@ -0,0 +1,191 @@
+# XWALL 2025
+
+"""
+Archive of recorded frames, readable at any time without decoding what
+comes before it.
+
+Two files: NAME.frames holds the frames one after the other, each one a
+PNG (or zlib of the raw pixels), and NAME.index a fixed-width record per
+frame with its time and where it is. The index is read through mmap, so
+finding the frame shown at a time is a binary search and one decode.
+
+    with Archive("session") as archive:
+        archive.append(pg.screenshot())
+    ...
+    t, frame = Archive("session").at(start + 14 * 60 + 32)
+"""
+
+import hashlib
+import mmap
+import os
+import struct
+import time as tm
+import zlib
+from io import BytesIO
+
+from PIL import Image
+
+
+class Archive:
+
+    # time, offset, length, width, height, mode, codec
+    RECORD = struct.Struct("<dQIHHBB6x")
+    MODES = ("RGB", "RGBA", "L", "P")
+    CODECS = ("png", "zlib")
+
+    def __init__(self, path: str, codec: str = "png", dedup: bool = True):
+        """
+        Args:
+            path (str): name of the archive, without extension.
+            codec (str): "png" (smaller) or "zlib" (faster) for new frames.
+            dedup (bool): do not store a frame identical to the last one,
+                at() returns the last one for its time anyway.
+        """
+        if codec not in self.CODECS:
+            raise ValueError(f"Invalid codec: {codec}, use one of {self.CODECS}")
+        self.path = path
+        self.codec = codec
+        self.dedup = dedup
+        self.data_path, self.index_path = path + ".frames", path + ".index"
+        self.writer = None
+        self.last = None
+        self.size = 0
+        self.index = self.data = None
+        self.refresh()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
+
+    def __len__(self):
+        return self.size
+
+    def refresh(self):
+        """Map the files again, to see the frames appended since (also by this Archive)."""
+        self._unmap()
+        if not os.path.exists(self.index_path):
+            self.size = 0
+            return
+        self.size = os.path.getsize(self.index_path) // self.RECORD.size
+        if self.size:
+            with open(self.index_path, "rb") as f:
+                self.index = mmap.mmap(f.fileno(), self.size * self.RECORD.size, access = mmap.ACCESS_READ)
+            with open(self.data_path, "rb") as f:
+                self.data = mmap.mmap(f.fileno(), 0, access = mmap.ACCESS_READ)
+
+    def _unmap(self):
+        for view in (self.index, self.data):
+            if view is not None:
+                view.close()
+        self.index = self.data = None
+
+    def close(self):
+        if self.writer:
+            for f in self.writer:
+                f.close()
+            self.writer = None
+        self._unmap()
+
+    # writing
+
+    def append(self, frame: Image.Image, t: float = None):
+        """Append a frame taken at time t (now by default), times never going back."""
+        t = tm.time() if t is None else t
+        if self.writer is None:
+            self.writer = open(self.data_path, "ab"), open(self.index_path, "ab")
+            self.last = (self.time(self.size - 1) if self.size else None), None
+        last_time, last_hash = self.last
+        if last_time is not None and t < last_time:
+            raise ValueError(f"Frame at {t} before the last one at {last_time}")
+
+        if frame.mode not in self.MODES:
+            frame = frame.convert("RGB")
+        raw = frame.tobytes()
+        digest = hashlib.blake2b(raw, digest_size = 16).digest() if self.dedup else None
+        if digest is not None and digest == last_hash:
+            return False
+
+        if self.codec == "png":
+            buffer = BytesIO()
+            frame.save(buffer, "PNG", compress_level = 1)
+            chunk = buffer.getvalue()
+        else:
+            chunk = zlib.compress(raw, 1)
+
+        data, index = self.writer
+        offset = data.seek(0, os.SEEK_END)
+        data.write(chunk)
+        # data first: an index record never points past the end of the data
+        data.flush()
+        index.write(self.RECORD.pack(t, offset, len(chunk), frame.width, frame.height,
+                                     self.MODES.index(frame.mode), self.CODECS.index(self.codec)))
+        index.flush()
+        self.last = t, digest
+        return True
+
+    # reading
+
+    def record(self, i: int):
+        """Return (time, offset, length, width, height, mode, codec) of frame i."""
+        return self.RECORD.unpack_from(self.index, i * self.RECORD.size)
+
+    def time(self, i: int) -> float:
+        return struct.unpack_from("<d", self.index, i * self.RECORD.size)[0]
+
+    def find(self, t: float) -> int:
+        """Return the position of the last frame at or before t, -1 if none."""
+        lo, hi = 0, self.size
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self.time(mid) <= t:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo - 1
+
+    def frame(self, i: int) -> Image.Image:
+        """Decode frame i."""
+        _, offset, length, width, height, mode, codec = self.record(i)
+        chunk = self.data[offset:offset + length]
+        if self.CODECS[codec] == "png":
+            image = Image.open(BytesIO(chunk))
+            image.load()
+            return image
+        return Image.frombytes(self.MODES[mode], (width, height), zlib.decompress(chunk))
+
+    def __getitem__(self, i: int):
+        if i < 0:
+            i += self.size
+        if not 0 <= i < self.size:
+            raise IndexError(i)
+        return self.time(i), self.frame(i)
+
+    def at(self, t: float):
+        """Return (time, frame) of the frame shown at time t."""
+        i = self.find(t)
+        if i < 0:
+            raise KeyError(f"No frame at or before {t}")
+        return self[i]
+
+    def range(self, start: float = None, end: float = None):
+        """Yield (time, frame) from the frame shown at start to the one shown at end."""
+        first = max(self.find(start), 0) if start is not None else 0
+        last = self.find(end) if end is not None else self.size - 1
+        for i in range(first, last + 1):
+            yield self[i]
+
+    def export(self, path: str, start: float = None, end: float = None, speed: float = 1.0):
+        """Write the frames from start to end to an animated PNG, return how many."""
+        frames, times = [], []
+        for t, frame in self.range(start, end):
+            frames.append(frame)
+            times.append(t)
+        if not frames:
+            return 0
+        steps = [max(round((b - a) * 1000 / speed), 1) for a, b in zip(times, times[1:])]
+        frames[0].save(path, "PNG", save_all = True, append_images = frames[1:],
+                       duration = steps + [steps[-1] if steps else 1000], loop = 0)
+        return len(frames)
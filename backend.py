@@ -0,0 +1,649 @@
+# XWALL 2025
+
+import mmap
+import struct
+import threading
+import time as tm
+
+from collections import Counter
+
+try:
+    import winreg
+except ImportError:
+    winreg = None
+
+
+# winreg constants, mirrored so the key classes work where winreg is missing
+KEY_READ = 0x20019
+KEY_ALL_ACCESS = 0xF003F
+KEY_WOW64_64KEY = 0x0100
+KEY_WOW64_32KEY = 0x0200
+
+REG_NONE = 0
+REG_SZ = 1
+REG_EXPAND_SZ = 2
+REG_BINARY = 3
+REG_DWORD = 4
+REG_DWORD_BIG_ENDIAN = 5
+REG_LINK = 6
+REG_MULTI_SZ = 7
+REG_QWORD = 11
+
+HIVES = {
+    "HKEY_CLASSES_ROOT": 0x80000000,
+    "HKEY_CURRENT_USER": 0x80000001,
+    "HKEY_LOCAL_MACHINE": 0x80000002,
+    "HKEY_USERS": 0x80000003,
+    "HKEY_CURRENT_CONFIG": 0x80000005,
+    }
+
+
+def decode(data: bytes, type_: int):
+    """Convert raw value data to what winreg returns for type_."""
+    if type_ in (REG_SZ, REG_EXPAND_SZ, REG_LINK):
+        text = bytes(data).decode("utf-16-le", errors = "replace")
+        return text.split("\x00", 1)[0]
+    if type_ == REG_MULTI_SZ:
+        text = bytes(data).decode("utf-16-le", errors = "replace").rstrip("\x00")
+        return text.split("\x00") if text else []
+    if type_ == REG_DWORD and len(data) == 4:
+        return struct.unpack("<I", data)[0]
+    if type_ == REG_DWORD_BIG_ENDIAN and len(data) == 4:
+        return struct.unpack(">I", data)[0]
+    if type_ == REG_QWORD and len(data) == 8:
+        return struct.unpack("<Q", data)[0]
+    return bytes(data) if data else None
+
+
+def encode(value, type_: int):
+    """Convert a value as returned by winreg back to raw data."""
+    if value is None:
+        return b""
+    if type_ in (REG_SZ, REG_EXPAND_SZ, REG_LINK):
+        return (str(value) + "\x00").encode("utf-16-le")
+    if type_ == REG_MULTI_SZ:
+        return "".join(item + "\x00" for item in value).encode("utf-16-le") + b"\x00\x00"
+    if type_ == REG_DWORD:
+        return struct.pack("<I", value)
+    if type_ == REG_DWORD_BIG_ENDIAN:
+        return struct.pack(">I", value)
+    if type_ == REG_QWORD:
+        return struct.pack("<Q", value)
+    return bytes(value)
+
+
+class Backend:
+    """
+    Registry access used by Address and the key classes.
+
+    The methods mirror the winreg functions the key classes need: handles
+    returned by open_key are context managers, missing keys or values raise
+    FileNotFoundError and enumerating past the last item raises OSError.
+    """
+
+    def roots(self):
+        """Return a dict mapping hive names to root handles."""
+        raise NotImplementedError
+
+    def open_key(self, root, sub_path: str = None, access: int = KEY_READ):
+        raise NotImplementedError
+
+    def query_info(self, handle):
+        """Return (number of subkeys, number of values, last write time)."""
+        raise NotImplementedError
+
+    def enum_key(self, handle, index: int):
+        raise NotImplementedError
+
+    def enum_value(self, handle, index: int):
+        """Return (name, value, type) of the value at index."""
+        raise NotImplementedError
+
+    def query_value(self, handle, name: str):
+        """Return (value, type) of the named value."""
+        raise NotImplementedError
+
+    def listing(self, handle):
+        """Return (subkey names, [(name, value, type)], last write time)."""
+        numf, nume, mtime = self.query_info(handle)
+        fkeys = [self.enum_key(handle, i) for i in range(numf)]
+        ekeys = [self.enum_value(handle, i) for i in range(nume)]
+        return fkeys, ekeys, mtime
+
+    def create_key(self, root, sub_path: str):
+        """Open the key, creating it and its parents when missing."""
+        raise PermissionError(f"Read-only backend: {sub_path}")
+
+    def write_value(self, handle, name: str, value, type_: int):
+        raise PermissionError(f"Read-only backend: {name}")
+
+    def delete_key(self, handle, name: str):
+        raise PermissionError(f"Read-only backend: {name}")
+
+    def delete_value(self, handle, name: str):
+        raise PermissionError(f"Read-only backend: {name}")
+
+    def event(self, name: str, address: object = None):
+        """Told by the key classes what happens above the backend, e.g. "fallback"."""
+
+
+class WinregBackend(Backend):
+    """The live registry of this machine, through winreg."""
+
+    def __init__(self):
+        if winreg is None:
+            raise OSError("winreg is only available on Windows.")
+        self.hives = {name: getattr(winreg, name) for name in HIVES}
+
+    def roots(self):
+        return self.hives
+
+    def open_key(self, root, sub_path = None, access = KEY_READ):
+        return winreg.OpenKey(root, sub_path, 0, access)
+
+    def query_info(self, handle):
+        return winreg.QueryInfoKey(handle)
+
+    def enum_key(self, handle, index):
+        return winreg.EnumKey(handle, index)
+
+    def enum_value(self, handle, index):
+        return winreg.EnumValue(handle, index)
+
+    def query_value(self, handle, name):
+        return winreg.QueryValueEx(handle, name)
+
+    def create_key(self, root, sub_path):
+        return winreg.CreateKeyEx(root, sub_path, 0, KEY_ALL_ACCESS)
+
+    def write_value(self, handle, name, value, type_):
+        winreg.SetValueEx(handle, name, 0, type_, value)
+
+    def delete_key(self, handle, name):
+        winreg.DeleteKey(handle, name)
+
+    def delete_value(self, handle, name):
+        winreg.DeleteValue(handle, name)
+
+
+class Node:
+    """A key of the MemoryBackend tree, usable as its own handle."""
+
+    __slots__ = ("name", "keys", "values", "mtime")
+
+    def __init__(self, name: str, mtime: int = 0):
+        self.name = name
+        self.keys = {}      # lower name -> Node
+        self.values = {}    # lower name -> (name, value, type)
+        self.mtime = mtime
+
+    def __repr__(self):
+        return f"<Node '{self.name}'>"
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+class MemoryBackend(Backend):
+    """
+    A registry tree held in dicts, for tests and benchmarks off-Windows.
+
+    backend = MemoryBackend()
+    backend.set_value("HKEY_CURRENT_USER\\Software\\Vendor", "Path", "C:\\")
+    """
+
+    def __init__(self):
+        self.tree = {name: Node(name) for name in HIVES}
+        self.clock = 0
+
+    def _tick(self):
+        self.clock += 1
+        return self.clock
+
+    def roots(self):
+        return self.tree
+
+    def _find(self, node, sub_path):
+        for part in (sub_path.split("\\") if sub_path else ()):
+            if not part:
+                continue
+            try:
+                node = node.keys[part.lower()]
+            except KeyError:
+                raise FileNotFoundError(2, "The system cannot find the file specified", sub_path)
+        return node
+
+    def open_key(self, root, sub_path = None, access = KEY_READ):
+        if isinstance(root, str):
+            root = self.tree[root]
+        return self._find(root, sub_path)
+
+    def query_info(self, handle):
+        return len(handle.keys), len(handle.values), handle.mtime
+
+    def enum_key(self, handle, index):
+        try:
+            return list(handle.keys.values())[index].name
+        except IndexError:
+            raise OSError(259, "No more data is available")
+
+    def enum_value(self, handle, index):
+        try:
+            return list(handle.values.values())[index]
+        except IndexError:
+            raise OSError(259, "No more data is available")
+
+    def query_value(self, handle, name):
+        try:
+            _, value, type_ = handle.values[name.lower()]
+        except KeyError:
+            raise FileNotFoundError(2, "The system cannot find the file specified", name)
+        return value, type_
+
+    def listing(self, handle):
+        fkeys = [node.name for node in handle.keys.values()]
+        return fkeys, list(handle.values.values()), handle.mtime
+
+    def delete_key(self, handle, name):
+        try:
+            node = handle.keys[name.lower()]
+        except KeyError:
+            raise FileNotFoundError(2, "The system cannot find the file specified", name)
+        if node.keys:
+            raise PermissionError(5, "Access is denied", name)
+        del handle.keys[name.lower()]
+        handle.mtime = self._tick()
+
+    def delete_value(self, handle, name):
+        try:
+            del handle.values[name.lower()]
+        except KeyError:
+            raise FileNotFoundError(2, "The system cannot find the file specified", name)
+        handle.mtime = self._tick()
+
+    def create_key(self, root, sub_path):
+        node = self.tree[root] if isinstance(root, str) else root
+        for part in sub_path.split("\\") if sub_path else ():
+            if not part:
+                continue
+            child = node.keys.get(part.lower())
+            if child is None:
+                child = node.keys[part.lower()] = Node(part, self._tick())
+                node.mtime = child.mtime
+            node = child
+        return node
+
+    def write_value(self, handle, name, value, type_):
+        handle.values[name.lower()] = (name, value, type_)
+        handle.mtime = self._tick()
+
+    def add_key(self, path: str):
+        """Create the key at path (hive name included) with its parents."""
+        hive, _, sub_path = path.partition("\\")
+        return self.create_key(hive, sub_path)
+
+    def set_value(self, path: str, name: str, value, type_: int = REG_SZ):
+        node = self.add_key(path)
+        self.write_value(node, name, value, type_)
+        return node
+
+
+class Cell:
+    """Handle of a key in an offline hive: the offset of its nk cell."""
+
+    __slots__ = ("offset",)
+
+    def __init__(self, offset: int):
+        self.offset = offset
+
+    def __repr__(self):
+        return f"<Cell {self.offset:#x}>"
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+class HiveBackend(Backend):
+    """
+    Read-only access to an offline REGF hive file (e.g. an exported SOFTWARE
+    hive) mounted under one root name.
+
+    The file is memory-mapped and records are decoded only when a key or a
+    value is actually read, so walking a large hive does not load it.
+    """
+
+    BASE = 4096     # hive bins start after the base block
+
+    def __init__(self, path: str, root: str = "HKEY_LOCAL_MACHINE"):
+        if root not in HIVES:
+            raise ValueError(f"Invalid root: {root}")
+        self.path = path
+        self.root = root
+        with open(path, "rb") as f:
+            self.map = mmap.mmap(f.fileno(), 0, access = mmap.ACCESS_READ)
+        if self.map[:4] != b"regf":
+            self.close()
+            raise ValueError(f"Not a REGF hive: {path}")
+        root_offset, = struct.unpack_from("<i", self.map, 0x24)
+        self.top = Cell(root_offset)
+        self.hives = {root: self.top}
+
+    def close(self):
+        self.map.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
+
+    def roots(self):
+        return self.hives
+
+    # --- cells ---
+
+    def _cell(self, offset):
+        """Return the position of the data of the cell at offset."""
+        return self.BASE + offset + 4
+
+    def _nk(self, offset):
+        pos = self._cell(offset)
+        if self.map[pos:pos + 2] != b"nk":
+            raise OSError(f"Corrupted key cell at {offset:#x}")
+        return pos
+
+    def _name(self, pos, size, compressed):
+        raw = self.map[pos:pos + size]
+        return raw.decode("latin-1") if compressed else raw.decode("utf-16-le")
+
+    def _key_name(self, offset):
+        pos = self._nk(offset)
+        flags, = struct.unpack_from("<H", self.map, pos + 2)
+        size, = struct.unpack_from("<H", self.map, pos + 72)
+        return self._name(pos + 76, size, flags & 0x0020)
+
+    def _subkey_list(self, pos):
+        count, = struct.unpack_from("<I", self.map, pos + 20)
+        list_offset, = struct.unpack_from("<i", self.map, pos + 28)
+        return count, list_offset
+
+    def _subkeys(self, list_offset):
+        """Yield the nk offsets of a subkey list (lf, lh, li or ri)."""
+        pos = self._cell(list_offset)
+        sign = self.map[pos:pos + 2]
+        count, = struct.unpack_from("<H", self.map, pos + 2)
+        if sign in (b"lf", b"lh"):
+            for i in range(count):
+                yield struct.unpack_from("<i", self.map, pos + 4 + i * 8)[0]
+        elif sign == b"li":
+            for i in range(count):
+                yield struct.unpack_from("<i", self.map, pos + 4 + i * 4)[0]
+        elif sign == b"ri":
+            for i in range(count):
+                yield from self._subkeys(struct.unpack_from("<i", self.map, pos + 4 + i * 4)[0])
+        else:
+            raise OSError(f"Corrupted subkey list at {list_offset:#x}")
+
+    def _values(self, handle):
+        """Return the vk offsets of a key."""
+        pos = self._nk(handle.offset)
+        count, list_offset = struct.unpack_from("<Ii", self.map, pos + 36)
+        if not count:
+            return ()
+        return struct.unpack_from(f"<{count}i", self.map, self._cell(list_offset))
+
+    def _data(self, pos, size, offset):
+        if size & 0x80000000:       # small data stored in the offset field
+            return self.map[pos + 8:pos + 8 + (size & 0x7FFFFFFF)]
+        start = self._cell(offset)
+        if self.map[start:start + 2] == b"db" and size > 16344:
+            count, segments = struct.unpack_from("<Hi", self.map, start + 2)
+            chunks, left = [], size
+            for seg in struct.unpack_from(f"<{count}i", self.map, self._cell(segments)):
+                chunk = min(left, 16344)
+                chunks.append(self.map[self._cell(seg):self._cell(seg) + chunk])
+                left -= chunk
+            return b"".join(chunks)
+        return self.map[start:start + size]
+
+    def _vk(self, offset):
+        pos = self._cell(offset)
+        if self.map[pos:pos + 2] != b"vk":
+            raise OSError(f"Corrupted value cell at {offset:#x}")
+        size_name, size, data, type_, flags = struct.unpack_from("<HIiIH", self.map, pos + 2)
+        name = self._name(pos + 20, size_name, flags & 0x0001)
+        return name, decode(self._data(pos, size, data), type_), type_
+
+    # --- Backend ---
+
+    def open_key(self, root, sub_path = None, access = KEY_READ):
+        if isinstance(root, str):
+            root = self.hives[root]
+        offset = root.offset
+        for part in (sub_path.split("\\") if sub_path else ()):
+            if not part:
+                continue
+            pos = self._nk(offset)
+            count, list_offset = self._subkey_list(pos)
+            wanted = part.lower()
+            for child in (self._subkeys(list_offset) if count else ()):
+                if self._key_name(child).lower() == wanted:
+                    offset = child
+                    break
+            else:
+                raise FileNotFoundError(2, "The system cannot find the file specified", sub_path)
+        return Cell(offset)
+
+    def query_info(self, handle):
+        pos = self._nk(handle.offset)
+        mtime, = struct.unpack_from("<Q", self.map, pos + 4)
+        numf, = struct.unpack_from("<I", self.map, pos + 20)
+        nume, = struct.unpack_from("<I", self.map, pos + 36)
+        return numf, nume, mtime
+
+    def enum_key(self, handle, index):
+        pos = self._nk(handle.offset)
+        count, list_offset = self._subkey_list(pos)
+        if not 0 <= index < count:
+            raise OSError(259, "No more data is available")
+        for i, child in enumerate(self._subkeys(list_offset)):
+            if i == index:
+                return self._key_name(child)
+        raise OSError(259, "No more data is available")
+
+    def listing(self, handle):
+        _, _, mtime = self.query_info(handle)
+        pos = self._nk(handle.offset)
+        count, list_offset = self._subkey_list(pos)
+        fkeys = [self._key_name(child) for child in self._subkeys(list_offset)] if count else []
+        ekeys = [self._vk(offset) for offset in self._values(handle)]
+        return fkeys, ekeys, mtime
+
+    def enum_value(self, handle, index):
+        values = self._values(handle)
+        if not 0 <= index < len(values):
+            raise OSError(259, "No more data is available")
+        return self._vk(values[index])
+
+    def query_value(self, handle, name):
+        wanted = (name or "").lower()
+        for offset in self._values(handle):
+            found, value, type_ = self._vk(offset)
+            if found.lower() == wanted:
+                return value, type_
+        raise FileNotFoundError(2, "The system cannot find the file specified", name)
+
+
+class Tracked:
+    """A handle of the wrapped backend, with the subtree it belongs to."""
+
+    __slots__ = ("handle", "hive", "subtree")
+
+    def __init__(self, handle, hive: str, subtree: str):
+        self.handle = handle
+        self.hive = hive
+        self.subtree = subtree
+
+    def __enter__(self):
+        self.handle.__enter__()
+        return self
+
+    def __exit__(self, *exc):
+        return self.handle.__exit__(*exc)
+
+
+class Instrumented(Backend):
+    """
+    Wraps a backend to find where a scan spends its time. Opt-in:
+
+    ABC.backend = probe = Instrumented(ABC.backend)
+    ... walk, search, delete ...
+    probe.report()
+
+    Counts the calls ("open", "enum", "query", ...), the errors and the
+    access fallbacks of the key classes for each hive, and times every
+    top-level subtree (HKEY_LOCAL_MACHINE\\SOFTWARE, ...). "wall" is the time
+    from the first call in a subtree to the first call elsewhere, meaningful
+    for plain walks; "busy" is the time spent inside the calls.
+
+    Args:
+        hook (callable): called as hook(event, hive, subtree, seconds, error)
+            after every call.
+    """
+
+    EVENTS = {
+        "open_key": "open", "create_key": "open", "query_info": "info",
+        "enum_key": "enum", "enum_value": "enum", "listing": "enum",
+        "query_value": "query", "delete_key": "delete", "delete_value": "delete",
+        "write_value": "write",
+        }
+
+    def __init__(self, backend: Backend, hook: object = None):
+        self.backend = backend
+        self.hook = hook
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        self.counts = Counter()     # (hive, event) -> calls
+        self.busy = Counter()       # (hive, subtree) -> seconds inside calls
+        self.wall = Counter()       # (hive, subtree) -> seconds spent there
+        self.span = None, None      # current (hive, subtree), since when
+
+    def roots(self):
+        return self.backend.roots()
+
+    def _where(self, root, sub_path):
+        if isinstance(root, Tracked):
+            top = (sub_path or "").split("\\", 1)[0]
+            return root.handle, root.hive, root.subtree or top
+        for hive, handle in self.backend.roots().items():
+            if handle is root or (isinstance(root, str) and root == hive):
+                return root, hive, (sub_path or "").split("\\", 1)[0]
+        return root, None, None
+
+    def _record(self, event, hive, subtree, start, error = None):
+        now = tm.perf_counter()
+        where = hive, subtree
+        with self.lock:
+            self.counts[hive, event] += 1
+            if error is not None:
+                self.counts[hive, "error"] += 1
+            self.busy[where] += now - start
+            current, since = self.span
+            if current != where:
+                if current is not None:
+                    self.wall[current] += start - since
+                self.span = where, start
+        if self.hook:
+            self.hook(event, hive, subtree, now - start, error)
+
+    def _call(self, method, handle, *args):
+        start = tm.perf_counter()
+        try:
+            result = getattr(self.backend, method)(handle.handle, *args)
+        except OSError as err:
+            self._record(self.EVENTS[method], handle.hive, handle.subtree, start, err)
+            raise
+        self._record(self.EVENTS[method], handle.hive, handle.subtree, start)
+        return result
+
+    def _open(self, method, root, sub_path, *args):
+        root, hive, subtree = self._where(root, sub_path)
+        start = tm.perf_counter()
+        try:
+            handle = getattr(self.backend, method)(root, sub_path, *args)
+        except OSError as err:
+            self._record("open", hive, subtree, start, err)
+            raise
+        self._record("open", hive, subtree, start)
+        return Tracked(handle, hive, subtree)
+
+    def open_key(self, root, sub_path = None, access = KEY_READ):
+        return self._open("open_key", root, sub_path, access)
+
+    def create_key(self, root, sub_path):
+        return self._open("create_key", root, sub_path)
+
+    def query_info(self, handle):
+        return self._call("query_info", handle)
+
+    def enum_key(self, handle, index):
+        return self._call("enum_key", handle, index)
+
+    def enum_value(self, handle, index):
+        return self._call("enum_value", handle, index)
+
+    def query_value(self, handle, name):
+        return self._call("query_value", handle, name)
+
+    def listing(self, handle):
+        return self._call("listing", handle)
+
+    def write_value(self, handle, name, value, type_):
+        return self._call("write_value", handle, name, value, type_)
+
+    def delete_key(self, handle, name):
+        return self._call("delete_key", handle, name)
+
+    def delete_value(self, handle, name):
+        return self._call("delete_value", handle, name)
+
+    def event(self, name, address = None):
+        hive = address.base.name if address is not None else None
+        subtree = address.core[1] if address is not None and address.size > 1 else ""
+        self._record(name, hive, subtree, tm.perf_counter())
+        self.backend.event(name, address)
+
+    def summary(self):
+        """
+        Return {"hives": {hive: {event: count}}, "subtrees": [(path, wall,
+        busy)]} with the subtrees slowest first.
+        """
+        with self.lock:
+            wall = Counter(self.wall)
+            current, since = self.span
+            if current is not None:
+                wall[current] += tm.perf_counter() - since
+            hives = {}
+            for (hive, event), count in self.counts.items():
+                hives.setdefault(hive, {})[event] = count
+            subtrees = [("\\".join(p for p in where if p), wall[where], busy)
+                        for where, busy in self.busy.items()]
+        subtrees.sort(key = lambda item: item[1], reverse = True)
+        return {"hives": hives, "subtrees": subtrees}
+
+    def report(self, top: int = 10):
+        summary = self.summary()
+        for hive, events in summary["hives"].items():
+            counts = " ".join(f"{event}={count}" for event, count in sorted(events.items()))
+            print(f"{hive}: {counts}")
+        for path, wall, busy in summary["subtrees"][:top]:
+            print(f"{wall:10.3f}s {busy:10.3f}s  {path}")
@@ -0,0 +1,253 @@
+# XWALL 2025
+
+"""
+Benchmarks of the registry tree, the netsh parser and the keyboard log on synthetic data,
+runnable anywhere: the registry is a MemoryBackend tree, the keyboard a
+synthetic stream of events.
+
+    python bench.py --fanout 6 --depth 5 --values 3 --rules 20000
+    python bench.py --save baseline.json
+    python bench.py --compare baseline.json
+"""
+
+import argparse
+import io
+import json
+import os
+import sys
+import tempfile
+import time as tm
+import tracemalloc
+
+import backend as bk
+from keylog import KeyLog, Typed
+from xwall import ABC, Address, FKEY, HKEY, Netsh
+
+
+class Fixtures:
+
+    @staticmethod
+    def tree(fanout: int, depth: int, values: int, root: str = "HKEY_LOCAL_MACHINE\\Bench"):
+        """Return a MemoryBackend holding fanout ** depth keys under root."""
+        backend = bk.MemoryBackend()
+        stack = [(backend.add_key(root), 0)]
+        while stack:
+            node, level = stack.pop()
+            for i in range(values):
+                backend.write_value(node, f"value{i}", i, bk.REG_DWORD)
+            if level < depth:
+                for i in range(fanout):
+                    stack.append((backend.create_key(node, f"key{i}"), level + 1))
+        return backend
+
+    @staticmethod
+    def rules(count: int):
+        """Return the text of `netsh advfirewall firewall show rule name=all verbose`."""
+        lines = [""]
+        for i in range(count):
+            lines += [
+                f"Rule Name:                            APW-{i}-BKI-program{i}",
+                "----------------------------------------------------------------------",
+                f"Description:                          Autofirewall generated rule {i}.",
+                f"Enabled:                              {'Yes' if i % 3 else 'No'}",
+                f"Direction:                            {'In' if i % 2 else 'Out'}",
+                "Profiles:                             Domain,Private,Public",
+                "Grouping:                             ",
+                "LocalIP:                              Any",
+                "RemoteIP:                             Any",
+                "Protocol:                             Any",
+                "Edge traversal:                       No",
+                f"Program:                              C:\\Program Files\\Vendor{i % 50}\\program{i}.exe",
+                "InterfaceTypes:                       Any",
+                "Security:                             NotRequired",
+                "Rule source:                          Local Setting",
+                "Action:                               Block",
+                "",
+                ]
+        lines.append("Ok.")
+        return "\n".join(lines)
+
+    @staticmethod
+    def typing(chars: int):
+        """Return the keyboard Events of typing about chars characters."""
+        line = "The Quick brown fox, jumps over the lazy Dog\b\bdog\n"
+        return list(KeyLog.events(line * (chars // len(line) + 1)))
+
+
+class Bench:
+
+    def __init__(self, fanout: int = 6, depth: int = 5, values: int = 3,
+                 rules: int = 20000, repeat: int = 3, keys: int = 50000):
+        self.fanout, self.depth, self.values = fanout, depth, values
+        self.rules = rules
+        self.keys = keys
+        self.repeat = repeat
+
+    @property
+    def hive(self):
+        return HKEY.HKEY_LOCAL_MACHINE()
+
+    def _walk(self):
+        return sum(1 for _ in self.hive.walk())
+
+    def _walk_parallel(self):
+        return sum(1 for _ in self.hive.walk(workers = 4, ordered = False))
+
+    def _search(self):
+        # the README loop: every item is built and tested, count the tested
+        tested = 0
+
+        def match(k):
+            nonlocal tested
+            tested += 1
+            return "3" in k.name
+
+        sum(1 for _ in self.hive.search(match))
+        return tested
+
+    def _query(self):
+        return sum(1 for _ in self.hive.query("Bench/key1/**/key3"))
+
+    def _delete(self):
+        deletion = FKEY(Address("HKEY_LOCAL_MACHINE", "Bench")).delete(preview = False)
+        return len(deletion.deleted)
+
+    def _netsh(self, lines: list):
+        return len(Netsh.rules_to_dict(lines))
+
+    def _netsh_stream(self, lines):
+        return sum(1 for _ in Netsh.parse(lines))
+
+    def _keylog(self, events: list, path: str):
+        # log every event, then rebuild the typed text from the file
+        with KeyLog(path) as log:
+            for event in events:
+                log(event)
+        typed = sum(1 for _ in Typed.strings(KeyLog.read(path)))
+        os.remove(path)
+        return len(events) if typed else 0
+
+    def _key_events(self):
+        handle, path = tempfile.mkstemp(suffix = ".log")
+        os.close(handle)
+        return self.events, path
+
+    def _use_tree(self):
+        ABC.backend = self.tree
+        return ()
+
+    def _use_new_tree(self):
+        ABC.backend = Fixtures.tree(self.fanout, self.depth, 0)
+        return ()
+
+    def _rule_lines(self):
+        # the whole output, split and stripped
+        text = self.text.strip().split("\n")
+        return [line.strip() for line in text if line.strip()],
+
+    def _rule_stream(self):
+        # the pipe of netsh, read line by line
+        return io.StringIO(self.text),
+
+    def cases(self):
+        """Return {name: (setup, run)}, setup returning the arguments of run."""
+        return {
+            "walk": (self._use_tree, self._walk),
+            "walk_parallel": (self._use_tree, self._walk_parallel),
+            "search": (self._use_tree, self._search),
+            "query": (self._use_tree, self._query),
+            "delete": (self._use_new_tree, self._delete),
+            "netsh": (self._rule_lines, self._netsh),
+            "netsh_stream": (self._rule_stream, self._netsh_stream),
+            "keylog": (self._key_events, self._keylog),
+            }
+
+    def measure(self, setup, run):
+        best, items = None, 0
+        for _ in range(self.repeat):
+            args = setup()
+            start = tm.perf_counter()
+            items = run(*args)
+            elapsed = tm.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+
+        # one more run, slower, for the memory peak and the backend calls
+        args = setup()
+        probe = bk.Instrumented(ABC.backend)
+        ABC.backend = probe
+        tracemalloc.start()
+        try:
+            run(*args)
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+            ABC.backend = probe.backend
+
+        calls = {}
+        for (_, event), count in probe.counts.items():
+            calls[event] = calls.get(event, 0) + count
+
+        return {"seconds": best, "items": items, "rate": items / best if best else 0,
+                "peak_kb": peak // 1024, "calls": calls}
+
+    def run(self, only: list = None):
+        self.tree = Fixtures.tree(self.fanout, self.depth, self.values)
+        self.text = Fixtures.rules(self.rules)
+        self.events = Fixtures.typing(self.keys)
+        results = {}
+        for name, (setup, run) in self.cases().items():
+            if only and name not in only:
+                continue
+            results[name] = self.measure(setup, run)
+        return results
+
+    @staticmethod
+    def report(results: dict, baseline: dict = None, tolerance: float = 0.10):
+        """Print the results, return the names slower than baseline beyond tolerance."""
+        slower = []
+        print(f"{'case':<15}{'items':>10}{'seconds':>10}{'items/s':>12}{'peak KB':>10}  calls")
+        for name, result in results.items():
+            calls = " ".join(f"{k}={v}" for k, v in result["calls"].items())
+            line = (f"{name:<15}{result['items']:>10}{result['seconds']:>10.4f}"
+                    f"{result['rate']:>12.0f}{result['peak_kb']:>10}  {calls}")
+            if baseline and name in baseline and baseline[name]["rate"]:
+                ratio = result["rate"] / baseline[name]["rate"]
+                line += f"  x{ratio:.2f}"
+                if ratio < 1 - tolerance:
+                    line += " SLOWER"
+                    slower.append(name)
+            print(line)
+        return slower
+
+
+def main(argv: list = None):
+    parser = argparse.ArgumentParser(description = "XWALL benchmarks")
+    parser.add_argument("--fanout", type = int, default = 6)
+    parser.add_argument("--depth", type = int, default = 5)
+    parser.add_argument("--values", type = int, default = 3)
+    parser.add_argument("--rules", type = int, default = 20000)
+    parser.add_argument("--repeat", type = int, default = 3)
+    parser.add_argument("--keys", type = int, default = 50000, help = "characters typed")
+    parser.add_argument("--only", nargs = "*", help = "cases to run")
+    parser.add_argument("--save", help = "write the results to a JSON baseline")
+    parser.add_argument("--compare", help = "JSON baseline to compare with")
+    parser.add_argument("--tolerance", type = float, default = 0.10)
+    args = parser.parse_args(argv)
+
+    bench = Bench(args.fanout, args.depth, args.values, args.rules, args.repeat, args.keys)
+    results = bench.run(args.only)
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)["results"]
+    slower = Bench.report(results, baseline, args.tolerance)
+
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump({"params": vars(args), "results": results}, f, indent = 2)
+    return 1 if slower else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
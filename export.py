@@ -0,0 +1,249 @@
+# XWALL 2025
+
+import io
+import gzip
+import json
+import re
+
+import backend as bk
+from xwall import ABC, Address, FKEY
+
+
+def _open(path: str, mode: str, compress: bool = None, encoding: str = "utf-8"):
+    """Open a buffered text file, gzipped if compress or if path ends with .gz."""
+    compress = str(path).endswith(".gz") if compress is None else compress
+    raw = gzip.open(path, mode + "b") if compress else open(path, mode + "b", buffering = 1 << 20)
+    return io.TextIOWrapper(raw, encoding = encoding, newline = "")
+
+
+def _writer(backend):
+    """Return write(path, values) storing one key with its values in backend."""
+    def write(path: str, values: list):
+        hive, _, sub_path = path.partition("\\")
+        with backend.create_key(backend.roots()[hive], sub_path) as handle:
+            for name, value, type_ in values:
+                backend.write_value(handle, name, value, type_)
+    return write
+
+
+class Reg:
+    """
+    Streaming export and import of .reg files, as written by regedit.
+
+    Keys are written one by one while the subtree is walked: memory stays
+    the same whatever the size of the subtree.
+    """
+
+    HEADER = "Windows Registry Editor Version 5.00"
+    WIDTH = 80
+
+    @staticmethod
+    def _quote(text: str):
+        return '"' + text.replace("\\", "\\\\").replace('"', '\\"') + '"'
+
+    @classmethod
+    def _hex(cls, prefix: str, data: bytes):
+        # regedit wraps hex data at 80 columns with a trailing backslash
+        text, lines, line = data.hex(","), [], prefix
+        while len(line) + len(text) > cls.WIDTH:
+            room = max((cls.WIDTH - 1 - len(line)) // 3, 1) * 3
+            lines.append(line + text[:room] + "\\")
+            text, line = text[room:], "  "
+        lines.append(line + text)
+        return "\r\n".join(lines)
+
+    @classmethod
+    def value(cls, name: str, value, type_: int):
+        """Return the .reg line of a value."""
+        key = cls._quote(name) + "=" if name else "@="
+        if type_ == bk.REG_SZ and isinstance(value, str):
+            return key + cls._quote(value)
+        if type_ == bk.REG_DWORD and isinstance(value, int):
+            return key + f"dword:{value:08x}"
+        prefix = "hex:" if type_ == bk.REG_BINARY else f"hex({type_:x}):"
+        # raw data, e.g. a malformed dword, is written as it is
+        data = value if isinstance(value, bytes) else bk.encode(value, type_)
+        return cls._hex(key + prefix, data)
+
+    @classmethod
+    def dump(cls, key: FKEY, path: str, compress: bool = None, **options):
+        """
+        Write the subtree of key to a .reg file (UTF-16, as regedit does).
+
+        Args:
+            compress (bool): gzip the file, by default if path ends with .gz.
+            options: listings arguments (depth, workers, ...).
+
+        Returns:
+            int: number of keys written.
+        """
+        count = 0
+        with _open(path, "w", compress, encoding = "utf-16") as f:
+            f.write(cls.HEADER + "\r\n\r\n")
+            for address, _, ekeys, _ in key.listings(**options):
+                f.write(f"[{address.str}]\r\n")
+                for name, value, type_ in ekeys:
+                    f.write(cls.value(name, value, type_) + "\r\n")
+                f.write("\r\n")
+                count += 1
+        return count
+
+    @staticmethod
+    def _unquote(text: str, start: int):
+        """Return the string quoted at text[start] and the index after it."""
+        chars, i = [], start + 1
+        while text[i] != '"':
+            if text[i] == "\\":
+                i += 1
+            chars.append(text[i])
+            i += 1
+        return "".join(chars), i + 1
+
+    @classmethod
+    def _parse(cls, line: str):
+        """Return (name, value, type) of a value line, value None to delete it."""
+        if line.startswith("@"):
+            name, i = "", 1
+        else:
+            name, i = cls._unquote(line, 0)
+        data = line[i + 1:].strip()
+
+        if data == "-":
+            return name, None, None
+        if data.startswith('"'):
+            return name, cls._unquote(data, 0)[0], bk.REG_SZ
+        if data.startswith("dword:"):
+            return name, int(data[6:], 16), bk.REG_DWORD
+        found = re.match(r"hex(?:\(([0-9a-fA-F]+)\))?:(.*)", data)
+        if not found:
+            raise ValueError(f"Invalid .reg value: {line}")
+        type_ = int(found.group(1), 16) if found.group(1) else bk.REG_BINARY
+        raw = bytes.fromhex(found.group(2).replace(",", "").replace(" ", ""))
+        return name, bk.decode(raw, type_), type_
+
+    @staticmethod
+    def _lines(f):
+        """Yield the logical lines of a .reg file, joining the continued ones."""
+        pending = ""
+        for line in f:
+            line = line.strip()
+            if line.endswith("\\") and not line.startswith("["):
+                pending += line[:-1]
+                continue
+            yield pending + line
+            pending = ""
+        if pending:
+            yield pending
+
+    @classmethod
+    def load(cls, path: str, backend: bk.Backend = None, compress: bool = None,
+             ondelete: object = None):
+        """
+        Import a .reg file into backend (ABC.backend by default), key by key.
+        "[-key]" sections and "name"=- lines delete as regedit does.
+
+        Args:
+            ondelete (callable): called with the Deletion of each "[-key]",
+                by default the keys denied are printed.
+
+        Returns:
+            int: number of keys written.
+        """
+        backend = backend if backend else ABC.backend
+        ondelete = ondelete if ondelete else cls._denied
+        write = _writer(backend)
+
+        with _open(path, "r", compress) as f:
+            head = f.buffer.read(2)
+        # regedit writes UTF-16 with a BOM, REGEDIT4 files are plain text
+        encoding = "utf-16" if head in (b"\xff\xfe", b"\xfe\xff") else "utf-8-sig"
+
+        count, current, values = 0, None, []
+        with _open(path, "r", compress, encoding = encoding) as f:
+            for line in cls._lines(f):
+                if not line or line.startswith(";") or line == cls.HEADER or line == "REGEDIT4":
+                    continue
+                if line.startswith("["):
+                    if current:
+                        write(current, values)
+                        count += 1
+                    current, values = line[1:-1], []
+                    if current.startswith("-"):
+                        ondelete(cls._delete(backend, current[1:]))
+                        current = None
+                    continue
+                if current:
+                    name, value, type_ = cls._parse(line)
+                    if type_ is None:
+                        cls._delete(backend, current, name)
+                    else:
+                        values.append((name, value, type_))
+            if current:
+                write(current, values)
+                count += 1
+        ABC.resolver.clear()
+        return count
+
+    @staticmethod
+    def _denied(deletion):
+        for address in deletion.denied:
+            print(f"Error: access denied: {address.str}")
+
+    @staticmethod
+    def _delete(backend, path: str, name: str = None):
+        """Delete the value name of path in backend, or path with its subtree."""
+        if name is None:
+            key = FKEY(Address(*path.split("\\")))
+            key.backend = backend
+            return key.delete(preview = False)
+        hive, _, sub_path = path.partition("\\")
+        root = backend.roots()[hive]
+        try:
+            with backend.open_key(root, sub_path or None, bk.KEY_ALL_ACCESS) as handle:
+                backend.delete_value(handle, name)
+        except FileNotFoundError:
+            pass
+
+
+class Jsonl:
+    """
+    Streaming export and import of JSON Lines, one key per line:
+    {"path": ..., "mtime": ..., "values": [[name, type, value], ...]}
+    with binary data as {"hex": ...}.
+    """
+
+    @staticmethod
+    def _encode(value):
+        return {"hex": value.hex()} if isinstance(value, bytes) else value
+
+    @staticmethod
+    def _decode(value):
+        return bytes.fromhex(value["hex"]) if isinstance(value, dict) else value
+
+    @classmethod
+    def dump(cls, key: FKEY, path: str, compress: bool = None, **options):
+        """Write the subtree of key, see Reg.dump."""
+        count = 0
+        with _open(path, "w", compress) as f:
+            for address, _, ekeys, mtime in key.listings(**options):
+                values = [[name, type_, cls._encode(value)] for name, value, type_ in ekeys]
+                f.write(json.dumps({"path": address.str, "mtime": mtime, "values": values}))
+                f.write("\n")
+                count += 1
+        return count
+
+    @classmethod
+    def load(cls, path: str, backend: bk.Backend = None, compress: bool = None):
+        """Import a JSON Lines file into backend (ABC.backend by default)."""
+        write = _writer(backend if backend else ABC.backend)
+        count = 0
+        with _open(path, "r", compress) as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                item = json.loads(line)
+                write(item["path"], [(name, cls._decode(value), type_)
+                                     for name, type_, value in item["values"]])
+                count += 1
+        ABC.resolver.clear()
+        return count
@@ -0,0 +1,196 @@
+# XWALL 2025
+
+"""
+Keyboard events logged to disk as they happen, in fixed-size records:
+time, key, scan code and down/up. Events are packed in a preallocated
+buffer and written in batches, at least every `every` seconds, so a crash
+loses at most the last batch and memory does not grow with the session.
+
+    with KeyLog("keys.log") as log:
+        kb.hook(log)
+        ...
+    text = list(Typed.strings(KeyLog.read("keys.log")))
+
+Any object with time, name, scan_code and event_type works as an event,
+e.g. the Event tuples of KeyLog.events(), to replay or benchmark anywhere.
+"""
+
+import struct
+import threading
+import time as tm
+from collections import namedtuple
+
+
+Event = namedtuple("Event", ["time", "name", "scan_code", "event_type"])
+
+
+class KeyLog:
+
+    # time, key, scan code, 1 down / 0 up
+    RECORD = struct.Struct("<dIHBx")
+
+    # names of more than one character, stored past the last code point
+    NAMES = ("unknown", "space", "enter", "tab", "backspace", "delete", "esc", "caps lock",
+             "shift", "right shift", "ctrl", "right ctrl", "alt", "alt gr", "windows",
+             "left", "right", "up", "down", "home", "end", "page up", "page down", "insert",
+             *(f"f{i}" for i in range(1, 13)))
+    BASE = 0x110000
+
+    def __init__(self, path: str, batch: int = 512, every: float = 5.0):
+        """
+        Args:
+            path (str): log file, appended to.
+            batch (int): events written together.
+            every (float): seconds after which pending events are written anyway.
+        """
+        self.path = path
+        self.batch = batch
+        self.every = every
+        self.buffer = bytearray(batch * self.RECORD.size)
+        self.count = 0
+        self.written = 0
+        self.flushed = tm.monotonic()
+        self.lock = threading.Lock()
+        self.file = open(path, "ab")
+        # pending events are written even when no key is pressed for a while
+        self.closing = threading.Event()
+        self.timer = threading.Thread(target = self._tick, daemon = True)
+        self.timer.start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
+
+    @classmethod
+    def code(cls, name: str) -> int:
+        if name and len(name) == 1:
+            return ord(name)
+        try:
+            return cls.BASE + cls.NAMES.index(name)
+        except ValueError:
+            return cls.BASE
+
+    @classmethod
+    def name(cls, code: int) -> str:
+        return chr(code) if code < cls.BASE else cls.NAMES[code - cls.BASE]
+
+    def __call__(self, event):
+        """Log an event, as a keyboard hook."""
+        self.add(event.time, event.name, event.scan_code or 0, event.event_type == "down")
+
+    def add(self, t: float, name: str, scan_code: int, down: bool):
+        with self.lock:
+            self.RECORD.pack_into(self.buffer, self.count * self.RECORD.size,
+                                  t, self.code(name), scan_code & 0xFFFF, down)
+            self.count += 1
+            if self.count == self.batch or tm.monotonic() - self.flushed >= self.every:
+                self._flush()
+
+    def _flush(self):
+        if self.count:
+            self.file.write(memoryview(self.buffer)[:self.count * self.RECORD.size])
+            self.file.flush()
+            self.written += self.count
+            self.count = 0
+        self.flushed = tm.monotonic()
+
+    def _tick(self):
+        while not self.closing.wait(self.every):
+            with self.lock:
+                if tm.monotonic() - self.flushed >= self.every:
+                    self._flush()
+
+    def flush(self):
+        with self.lock:
+            self._flush()
+
+    def close(self):
+        self.closing.set()
+        self.timer.join()
+        with self.lock:
+            if not self.file.closed:
+                self._flush()
+                self.file.close()
+
+    @classmethod
+    def read(cls, path: str, start: int = 0):
+        """Yield the Events logged in path from record start on."""
+        size = cls.RECORD.size
+        with open(path, "rb") as f:
+            f.seek(start * size)
+            while True:
+                # whole records only: the last one may still be being written
+                chunk = f.read(size * 4096)
+                chunk = chunk[:len(chunk) - len(chunk) % size]
+                if not chunk:
+                    return
+                for t, code, scan, down in cls.RECORD.iter_unpack(chunk):
+                    yield Event(t, cls.name(code), scan, "down" if down else "up")
+
+    @staticmethod
+    def events(text: str, start: float = 0.0, step: float = 0.05):
+        """Yield the Events of typing text, shift included, for tests and benchmarks."""
+        t = start
+        for char in text:
+            name = {" ": "space", "\n": "enter", "\t": "tab", "\b": "backspace"}.get(char, char.lower())
+            shift = char.isupper()
+            keys = (["shift"] if shift else []) + [name]
+            for key in keys:
+                yield Event(t, key, 0, "down")
+                t += step
+            for key in reversed(keys):
+                yield Event(t, key, 0, "up")
+                t += step
+
+
+class Typed:
+    """
+    Strings typed, rebuilt event by event as keyboard.get_typed_strings
+    does: feed() returns the strings ended by that event (enter, tab, ...)
+    and current is the one being typed.
+
+    typed = Typed()
+    for event in KeyLog.read("keys.log", start = seen):
+        for text in typed.feed(event):
+            ...
+    """
+
+    def __init__(self, backspace: bool = True):
+        self.backspace = backspace
+        self.shift = self.caps = False
+        self.chars = []
+
+    @property
+    def current(self) -> str:
+        return "".join(self.chars)
+
+    def feed(self, event) -> list:
+        name, down = event.name, event.event_type == "down"
+        if "shift" in name:
+            self.shift = down
+        elif not down:
+            pass
+        elif name == "caps lock":
+            self.caps = not self.caps
+        elif name == "backspace" and self.backspace:
+            if self.chars:
+                self.chars.pop()
+        elif name == "space" or len(name) == 1:
+            char = " " if name == "space" else name
+            self.chars.append(char.upper() if self.shift ^ self.caps else char)
+        else:
+            done = self.current
+            self.chars = []
+            return [done]
+        return []
+
+    @classmethod
+    def strings(cls, events, backspace: bool = True):
+        """Yield every string typed in events, the last one included."""
+        typed = cls(backspace)
+        for event in events:
+            yield from typed.feed(event)
+        yield typed.current
@@ -1,37 +1,64 @@
+import os
 import time as tm
+from concurrent.futures import ThreadPoolExecutor
 import pyautogui as pg
 from PIL import Image as img
 
 import keyboard as kb
 
+from recorder import Recorder, Delta, Scheduler
+from archive import Archive
+from keylog import KeyLog, Typed
 
-def listening():
 
-    kb.start_recording()
+def listening(folder: str = "recording", archive: bool = False):
+    """
+    Registra tastiera e schermo durante l'orario di lavoro.
+    Con archive lo schermo va in folder/session.frames, consultabile per tempo
+    (vedi archive.Archive), altrimenti in segmenti (vedi recorder.Recorder).
+    """
 
+    # keys go to folder/keys.log as they are pressed, see keylog.KeyLog
+    os.makedirs(folder, exist_ok = True)
+    keys = KeyLog(os.path.join(folder, "keys.log"))
+    start = os.path.getsize(keys.path) // KeyLog.RECORD.size
+    kb.hook(keys)
 
     START_W, END_W = 8, 22
     is_working_time = lambda h: True if START_W <= h <= END_W else False
 
-    time, timeout = 0, 30
-    hour = tm.localtime().tm_hour
-    screenshots = list()
+    timeout = 30
+    after_hours = lambda: not is_working_time(tm.localtime().tm_hour)
 
-    while is_working_time(hour) and time <= timeout:
-        screenshots.append(pg.screenshot())
+    try:
+        if archive:
+            # a screenshot every second in folder/session, found by time
+            with Archive(os.path.join(folder, "session")) as session:
+                scheduler = Scheduler(pg.screenshot, session.append, interval = 1)
+                metrics = scheduler.run(seconds = timeout, until = after_hours)
+            screen, segments = [], []
+        else:
+            # only the changed regions of the screen, when numpy is there
+            try:
+                delta = Delta()
+            except ImportError:
+                delta = None
 
-        # save every 10 seconds
-        if time > 0 and time % 10 == 0:
-            screenshots[0].save("out.gif", save_all=True,
-                                append_images=screenshots[1:],
-                                duration=500, loop=0)
-        tm.sleep(1)
-        time += 1
+            # one segment every 10 seconds in folder, each frame encoded once:
+            # a screenshot every second, frames processed and segments written by other threads
+            with ThreadPoolExecutor(1) as pool:
+                with Recorder(folder, segment = 10, duration = 500, delta = delta, pool = pool) as recorder:
+                    scheduler = Scheduler(pg.screenshot, recorder.add, interval = 1)
+                    metrics = scheduler.run(seconds = timeout, until = after_hours)
+            screen = [frame for _, frame in recorder.recent]
+            segments = Recorder.segments(folder)
+    finally:
+        kb.unhook(keys)
+        keys.close()
 
-    recorded = kb.stop_recording()
-    text = [txt for txt in kb.get_typed_strings(recorded) if txt != ""]
+    text = [txt for txt in Typed.strings(KeyLog.read(keys.path, start)) if txt != ""]
 
-    return {"text": text, "screen": screenshots}
+    return {"text": text, "screen": screen, "segments": segments, "metrics": metrics}
 
 
 def keyboard():
@@ -0,0 +1,462 @@
+# XWALL 2025
+
+"""
+Screen recording in bounded memory.
+
+Frames are kept only until the segment they belong to is written: every
+`segment` seconds the frames are saved to one GIF file and a line is added
+to index.jsonl, so each frame is encoded once and memory holds at most one
+segment, already reduced to palette images, plus the last `ring` frames.
+
+    recorder = Recorder("recording", segment = 10)
+    recorder.add(pg.screenshot())
+    ...
+    recorder.close()
+
+With a Delta stage (NumPy) unchanged frames are dropped and the others
+are stored as the rectangles that changed, segments being zip files of
+PNG patches instead of GIFs. A Scheduler captures at a steady cadence
+while other threads feed the recorder.
+"""
+
+import io
+import json
+import os
+import queue
+import threading
+import time as tm
+import zipfile
+from collections import deque, namedtuple
+
+from PIL import Image
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+class Delta:
+    """
+    Frames as changes against the previous frame.
+
+    push() compares the frame with the previous one tile by tile: nothing
+    is returned for an identical frame, a Patch with the rectangles that
+    changed otherwise, and a Key with the whole frame every `keyframe`
+    frames, when most of the frame changed, or after reset(), so that
+    playback can start at any Key. replay() rebuilds the frames.
+
+    delta = Delta()
+    items = [item for item in map(delta.push, frames) if item]
+    for t, frame in Delta.replay(items):
+        ...
+    """
+
+    Key = namedtuple("Key", ["t", "image"])
+    Patch = namedtuple("Patch", ["t", "rects"])     # rects: [(x, y, image)]
+
+    def __init__(self, tile: int = 32, keyframe: int = 300, limit: float = 0.5):
+        """
+        Args:
+            tile (int): side in pixels of the squares compared.
+            keyframe (int): frames between two Keys at most.
+            limit (float): changed fraction of the frame above which a Key
+                is stored instead of a Patch.
+        """
+        if np is None:
+            raise ImportError("Delta needs numpy")
+        self.tile = tile
+        self.keyframe = keyframe
+        self.limit = limit
+        self.stats = {"frames": 0, "dropped": 0, "keys": 0, "patches": 0, "pixels": 0}
+        self.reset()
+
+    def reset(self):
+        """Make the next frame a Key."""
+        self.previous, self.since = None, 0
+
+    def _tiles(self, current):
+        """Return the grid of tiles that differ from the previous frame."""
+        changed = (current != self.previous)
+        if changed.ndim == 3:
+            changed = changed.any(axis = 2)
+        h, w = changed.shape
+        t = self.tile
+        padded = np.zeros((-(-h // t) * t, -(-w // t) * t), dtype = bool)
+        padded[:h, :w] = changed
+        return padded.reshape(padded.shape[0] // t, t, padded.shape[1] // t, t).any(axis = (1, 3))
+
+    def _rects(self, grid):
+        """Return (x0, y0, x1, y1) tile rectangles covering the grid."""
+        # runs of changed tiles in each row, merged with the same run of the row above
+        rects, open_ = [], {}
+        for row, line in enumerate(grid):
+            runs, start = [], None
+            for col, dirty in enumerate(list(line) + [False]):
+                if dirty and start is None:
+                    start = col
+                elif not dirty and start is not None:
+                    runs.append((start, col))
+                    start = None
+            grown = {}
+            for run in runs:
+                top = open_.pop(run, row)
+                grown[run] = top
+            rects += [(x0, top, x1, row) for (x0, x1), top in open_.items()]
+            open_ = grown
+        rects += [(x0, top, x1, len(grid)) for (x0, x1), top in open_.items()]
+        return rects
+
+    def push(self, frame: Image.Image, t: float = None):
+        """Return a Key, a Patch or None if the frame did not change."""
+        t = tm.time() if t is None else t
+        current = np.asarray(frame)
+        self.stats["frames"] += 1
+        previous = self.previous
+        if previous is None or previous.shape != current.shape or self.since >= self.keyframe:
+            return self._key(frame, current, t)
+
+        grid = self._tiles(current)
+        if not grid.any():
+            self.stats["dropped"] += 1
+            return None
+        if grid.mean() > self.limit:
+            return self._key(frame, current, t)
+
+        self.previous, self.since = current, self.since + 1
+        h, w = current.shape[:2]
+        rects = []
+        for x0, y0, x1, y1 in self._rects(grid):
+            box = (x0 * self.tile, y0 * self.tile, min(x1 * self.tile, w), min(y1 * self.tile, h))
+            rects.append((box[0], box[1], frame.crop(box)))
+            self.stats["pixels"] += (box[2] - box[0]) * (box[3] - box[1])
+        self.stats["patches"] += 1
+        return self.Patch(t, rects)
+
+    def _key(self, frame, current, t):
+        self.previous, self.since = current, 0
+        self.stats["keys"] += 1
+        self.stats["pixels"] += current.shape[0] * current.shape[1]
+        return self.Key(t, frame.copy())
+
+    @classmethod
+    def replay(cls, items):
+        """Yield (t, frame) for each Key and Patch, frames rebuilt from the last Key."""
+        frame = None
+        for item in items:
+            if isinstance(item, cls.Key):
+                frame = item.image.copy()
+            else:
+                if frame is None:
+                    raise ValueError("Patch before the first Key")
+                for x, y, image in item.rects:
+                    frame.paste(image, (x, y))
+            yield item.t, frame.copy()
+
+    @classmethod
+    def save(cls, items: list, path: str, repeats: list = None):
+        """Write items to a zip of PNG images with a manifest.json."""
+        manifest = []
+        with zipfile.ZipFile(path, "w", zipfile.ZIP_STORED) as z:
+            for i, item in enumerate(items):
+                entry = {"t": item.t, "repeats": repeats[i] if repeats else 0}
+                if isinstance(item, cls.Key):
+                    entry["key"] = f"{i:06d}.png"
+                    z.writestr(entry["key"], cls._png(item.image))
+                else:
+                    entry["rects"] = []
+                    for j, (x, y, image) in enumerate(item.rects):
+                        name = f"{i:06d}-{j}.png"
+                        z.writestr(name, cls._png(image))
+                        entry["rects"].append([x, y, name])
+                manifest.append(entry)
+            z.writestr("manifest.json", json.dumps(manifest))
+
+    @classmethod
+    def load(cls, path: str):
+        """Return the items written by save()."""
+        items = []
+        with zipfile.ZipFile(path) as z:
+            for entry in json.loads(z.read("manifest.json")):
+                if "key" in entry:
+                    items.append(cls.Key(entry["t"], cls._image(z.read(entry["key"]))))
+                else:
+                    items.append(cls.Patch(entry["t"], [(x, y, cls._image(z.read(name)))
+                                                        for x, y, name in entry["rects"]]))
+        return items
+
+    @staticmethod
+    def _png(image: Image.Image) -> bytes:
+        data = io.BytesIO()
+        image.save(data, "PNG", compress_level = 1)
+        return data.getvalue()
+
+    @staticmethod
+    def _image(data: bytes) -> Image.Image:
+        image = Image.open(io.BytesIO(data))
+        image.load()
+        return image
+
+
+class Recorder:
+
+    INDEX = "index.jsonl"
+
+    def __init__(self, folder: str = "recording", segment: float = 10.0, ring: int = 10,
+                 duration: int = None, delta: Delta = None, pool = None):
+        """
+        Args:
+            folder (str): where segments and index are written.
+            segment (float): seconds of recording in each file.
+            ring (int): last frames kept in memory, see recent.
+            duration (int): milliseconds each frame is shown, by default
+                the time until the next frame.
+            delta (Delta): store changes instead of frames, see Delta.
+            pool (Executor): writes the segments, while add() goes on.
+                Index lines follow the order segments are done in.
+        """
+        self.folder = folder
+        self.segment = segment
+        self.duration = duration
+        self.delta = delta
+        self.pool = pool
+        self.pending = []
+        self.lock = threading.Lock()
+        self.ring = deque(maxlen = ring)
+        self.frames, self.times, self.repeats = [], [], []
+        self.count = len(self.segments(folder))
+        os.makedirs(folder, exist_ok = True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
+
+    @property
+    def recent(self):
+        """The last frames added, as (time, image)."""
+        return list(self.ring)
+
+    def add(self, frame: Image.Image, t: float = None):
+        """Add a frame taken at time t (now by default)."""
+        t = tm.time() if t is None else t
+        if self.times and t - self.times[0] >= self.segment:
+            self.flush()
+        self.ring.append((t, frame))
+        if self.delta:
+            item = self.delta.push(frame, t)
+            if item is None:
+                # unchanged: the previous frame is shown longer
+                self.repeats[-1] += 1
+                return
+            self.frames.append(item)
+        else:
+            # palette now, once: the segment keeps a third of the RGB size
+            self.frames.append(frame.convert("P", palette = Image.ADAPTIVE))
+        self.times.append(t)
+        self.repeats.append(0)
+
+    def _durations(self, times: list, repeats: list):
+        if self.duration:
+            return [self.duration * (1 + repeat) for repeat in repeats]
+        steps = [round((b - a) * 1000) for a, b in zip(times, times[1:])]
+        return [max(step, 20) for step in steps] + [steps[-1] if steps else 1000]
+
+    def flush(self):
+        """
+        Write the frames added since the last segment to a new segment.
+        Return its index entry, or a Future of it with a pool.
+        """
+        if not self.frames:
+            return None
+        self.count += 1
+        job = self.count, self.frames, self.times, self.repeats
+        self.frames, self.times, self.repeats = [], [], []
+        if self.delta:
+            # each segment starts with a Key, to be played alone
+            self.delta.reset()
+        if self.pool:
+            future = self.pool.submit(self._write, *job)
+            done = [f for f in self.pending if f.done()]
+            self.pending = [f for f in self.pending if f not in done] + [future]
+            for f in done:
+                # a segment that could not be written raises here
+                f.result()
+            return future
+        return self._write(*job)
+
+    def _write(self, count: int, frames: list, times: list, repeats: list):
+        if self.delta:
+            name = f"segment-{count:06d}.zip"
+            Delta.save(frames, os.path.join(self.folder, name), repeats)
+        else:
+            name = f"segment-{count:06d}.gif"
+            frames[0].save(os.path.join(self.folder, name), save_all = True,
+                           append_images = frames[1:], duration = self._durations(times, repeats), loop = 0)
+        entry = {"file": name, "start": times[0], "end": times[-1],
+                 "frames": len(frames) + sum(repeats)}
+        with self.lock:
+            with open(os.path.join(self.folder, self.INDEX), "a", encoding = "utf-8") as f:
+                f.write(json.dumps(entry) + "\n")
+        return entry
+
+    def close(self):
+        """Write the last segment, wait for the pool, raise its first error."""
+        try:
+            self.flush()
+        finally:
+            pending, self.pending = self.pending, []
+            errors = [f.exception() for f in pending]
+        for error in errors:
+            if error:
+                raise error
+
+    @classmethod
+    def segments(cls, folder: str):
+        """Return the index entries of the segments written in folder."""
+        if not os.path.exists(os.path.join(folder, cls.INDEX)):
+            return []
+        with open(os.path.join(folder, cls.INDEX), encoding = "utf-8") as f:
+            return [json.loads(line) for line in f if line.strip()]
+
+
+class Scheduler:
+    """
+    Capture at a fixed cadence on the thread calling run(), process the
+    frames on worker threads. run() returns when the capture ends: to
+    capture in the background, call it from a thread and stop() it.
+
+    Ticks are due at start + n * interval on the monotonic clock, so a slow
+    capture does not shift the ones after it; ticks already past when the
+    capture returns are skipped and counted as missed. Frames go through a
+    bounded queue to `workers` threads calling sink(frame, t). When the
+    queue is full the policy decides: "drop-oldest" drops the oldest queued
+    frame, "drop-newest" the new one, "block" waits (and delays capture).
+
+    with Recorder("recording", delta = Delta()) as recorder:
+        Scheduler(pg.screenshot, recorder.add, interval = 1).run(seconds = 60)
+
+    sink must take the frames in order, as Recorder does, unless workers > 1.
+    """
+
+    POLICIES = ("drop-oldest", "drop-newest", "block")
+
+    def __init__(self, capture, sink, interval: float = 1.0, size: int = 8,
+                 policy: str = "drop-oldest", workers: int = 1, clock = tm.monotonic):
+        if policy not in self.POLICIES:
+            raise ValueError(f"Invalid policy: {policy}, use one of {self.POLICIES}")
+        self.capture = capture
+        self.sink = sink
+        self.interval = interval
+        self.policy = policy
+        self.workers = workers
+        self.clock = clock
+        self.queue = queue.Queue(maxsize = size)
+        self.stopping = threading.Event()
+        self.lock = threading.Lock()
+        self.threads = []
+        self.metrics = {"ticks": 0, "captured": 0, "dropped": 0, "missed": 0, "processed": 0,
+                        "errors": 0, "jitter_mean": 0.0, "jitter_max": 0.0, "sink_mean": 0.0}
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop()
+        return False
+
+    def start(self):
+        self.stopping.clear()
+        self.threads = [threading.Thread(target = self._consume, daemon = True)
+                        for _ in range(self.workers)]
+        for thread in self.threads:
+            thread.start()
+
+    def stop(self):
+        """Stop capturing, wait until the queued frames are processed."""
+        self.stopping.set()
+        for _ in self.threads:
+            self.queue.put(None)
+        for thread in self.threads:
+            thread.join()
+        self.threads = []
+
+    def _consume(self):
+        while True:
+            item = self.queue.get()
+            if item is None:
+                return
+            frame, t = item
+            start = tm.perf_counter()
+            try:
+                self.sink(frame, t)
+            except Exception as err:
+                with self.lock:
+                    self.metrics["errors"] += 1
+                print(f"Error: {err}")
+                continue
+            with self.lock:
+                n = self.metrics["processed"] = self.metrics["processed"] + 1
+                self.metrics["sink_mean"] += (tm.perf_counter() - start - self.metrics["sink_mean"]) / n
+
+    def _offer(self, item):
+        if self.policy == "block":
+            self.queue.put(item)
+            return
+        try:
+            self.queue.put_nowait(item)
+            return
+        except queue.Full:
+            self.metrics["dropped"] += 1
+        if self.policy == "drop-oldest":
+            try:
+                self.queue.get_nowait()
+            except queue.Empty:
+                pass
+            try:
+                self.queue.put_nowait(item)
+            except queue.Full:
+                pass
+
+    def run(self, seconds: float = None, until = None):
+        """
+        Capture until seconds have elapsed, until() returns True or stop()
+        is called from another thread.
+        """
+        own = not self.threads
+        if own:
+            self.start()
+        start = self.clock()
+        tick = 0
+        try:
+            while not self.stopping.is_set():
+                due = start + tick * self.interval
+                if seconds is not None and due - start > seconds:
+                    break
+                if until and until():
+                    break
+                wait = due - self.clock()
+                if wait > 0 and self.stopping.wait(wait):
+                    break
+
+                late = max(self.clock() - due, 0.0)
+                self.metrics["ticks"] += 1
+                self.metrics["jitter_max"] = max(self.metrics["jitter_max"], late)
+                self.metrics["jitter_mean"] += (late - self.metrics["jitter_mean"]) / self.metrics["ticks"]
+
+                self._offer((self.capture(), tm.time()))
+                self.metrics["captured"] += 1
+
+                # next tick still ahead of the clock, the ones already past are missed
+                tick += 1
+                behind = int((self.clock() - start) / self.interval) + 1 - tick
+                if behind > 0:
+                    self.metrics["missed"] += behind
+                    tick += behind
+        finally:
+            if own:
+                self.stop()
+        return self.metrics
@@ -0,0 +1,164 @@
+# XWALL 2025
+
+import sqlite3
+
+import backend as bk
+from xwall import Address, FKEY, EKEY
+
+
+class Index:
+    """
+    On-disk index of registry keys and value names, kept in SQLite.
+
+    refresh() lists again only the keys whose last write time changed since
+    the previous refresh, search() answers from the index without opening
+    any key.
+
+    index = Index("hklm.db")
+    index.refresh(HKEY.HKEY_LOCAL_MACHINE())
+    found = list(index.search("word"))
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS fkeys (
+            path TEXT PRIMARY KEY COLLATE NOCASE,
+            parent TEXT COLLATE NOCASE,
+            name TEXT,
+            mtime INTEGER
+            );
+        CREATE TABLE IF NOT EXISTS ekeys (
+            key TEXT COLLATE NOCASE,
+            name TEXT,
+            type INTEGER,
+            PRIMARY KEY (key, name)
+            );
+        CREATE INDEX IF NOT EXISTS fkeys_parent ON fkeys (parent);
+        """
+
+    def __init__(self, path: str = "xwall.db", backend: bk.Backend = None):
+        """
+        Args:
+            path (str): SQLite file.
+            backend (Backend): the one of the keys search() yields, by
+                default the one of the last key refreshed, else ABC.backend.
+        """
+        self.path = path
+        self.backend = backend
+        self.db = sqlite3.connect(path)
+        self.db.executescript(self.SCHEMA)
+
+    def close(self):
+        self.db.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
+
+    def __len__(self):
+        return self.db.execute("SELECT COUNT(*) FROM fkeys").fetchone()[0]
+
+    def _drop(self, path: str):
+        """Remove a key and its subtree, return the number of keys removed."""
+        prefix = (len(path) + 1, path + "\\")
+        removed = self.db.execute(
+            "DELETE FROM fkeys WHERE path = ? OR substr(path, 1, ?) = ? COLLATE NOCASE",
+            (path, *prefix))
+        self.db.execute(
+            "DELETE FROM ekeys WHERE key = ? OR substr(key, 1, ?) = ? COLLATE NOCASE",
+            (path, *prefix))
+        return removed.rowcount
+
+    def _children(self, path: str):
+        return [name for name, in self.db.execute(
+            "SELECT name FROM fkeys WHERE parent = ?", (path,))]
+
+    def refresh(self, key: FKEY, prune: bool = False, onerror: object = None):
+        """
+        Bring the subtree of key up to date.
+
+        A key whose last write time is unchanged is only opened to read that
+        time: its values and subkeys are taken from the index. Windows does
+        not propagate the time to the parents of a changed key, so subkeys
+        are still checked one by one unless prune is True, which skips the
+        whole subtree of an unchanged key.
+
+        Returns:
+            dict: keys checked, keys listed again and keys removed.
+        """
+        onerror = onerror if onerror else lambda err: print(f"Error: {err}")
+        backend = self.backend = key.backend
+        stats = {"checked": 0, "listed": 0, "removed": 0}
+
+        stack = [key.address]
+        with self.db:
+            while stack:
+                address = stack.pop()
+                path = address.str
+                try:
+                    with backend.open_key(*address.locate(backend),
+                                          bk.KEY_READ | bk.KEY_WOW64_64KEY) as k:
+                        _, _, mtime = backend.query_info(k)
+                        stats["checked"] += 1
+                        row = self.db.execute(
+                            "SELECT mtime FROM fkeys WHERE path = ?", (path,)).fetchone()
+                        if row and row[0] == mtime:
+                            if not prune:
+                                stack.extend(address / name for name in self._children(path))
+                            continue
+                        fkeys, ekeys, _ = backend.listing(k)
+                except FileNotFoundError:
+                    stats["removed"] += self._drop(path)
+                    continue
+                except OSError as err:
+                    onerror(err)
+                    continue
+
+                stats["listed"] += 1
+                parent = address.up.str if address.up else None
+                self.db.execute("INSERT OR REPLACE INTO fkeys VALUES (?, ?, ?, ?)",
+                                (path, parent, address.name, mtime))
+                self.db.execute("DELETE FROM ekeys WHERE key = ?", (path,))
+                self.db.executemany("INSERT OR REPLACE INTO ekeys VALUES (?, ?, ?)",
+                                    ((path, name, type_) for name, _, type_ in ekeys))
+
+                listed = {name.lower() for name in fkeys}
+                for name in self._children(path):
+                    if name.lower() not in listed:
+                        stats["removed"] += self._drop(path + "\\" + name)
+                stack.extend(address / name for name in fkeys)
+        return stats
+
+    def search(self, text: str, kind: type = None, under: FKEY = None):
+        """
+        Yield the indexed keys and values whose name contains text.
+
+        Args:
+            text (str): case-insensitive part of the name.
+            kind (type): FKEY or EKEY to get only keys or only values.
+            under (FKEY): limit the results to the subtree of this key.
+        """
+        like = text.replace("!", "!!").replace("%", "!%").replace("_", "!_")
+        args = ["%" + like + "%"]
+        where = ""
+        if under:
+            root = under.address.str
+            # substr() drops the NOCASE of the column
+            where = " AND ({0} = ? OR substr({0}, 1, ?) = ? COLLATE NOCASE)"
+            args += [root, len(root) + 1, root + "\\"]
+
+        if kind in (None, FKEY):
+            query = "SELECT path FROM fkeys WHERE name LIKE ? ESCAPE '!'" + where.format("path")
+            for path, in self.db.execute(query, args):
+                yield self._bind(FKEY(Address(*path.split("\\"))))
+        if kind in (None, EKEY):
+            query = "SELECT key, name FROM ekeys WHERE name LIKE ? ESCAPE '!'" + where.format("key")
+            for path, name in self.db.execute(query, args):
+                yield self._bind(EKEY(Address(*path.split("\\")) / name))
+
+    def _bind(self, key):
+        if self.backend is not None:
+            key.backend = self.backend
+        return key
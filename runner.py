@@ -0,0 +1,388 @@
+# XWALL 2025
+
+"""
+Execution of external commands (netsh, powershell, ...): an asyncio API
+with a limit on the commands running together and a timeout per command,
+and a sync facade for the code that is not async.
+
+    runner = Runner(limit = 2, timeout = 60)
+    result = runner.call(["netsh", "advfirewall", "show", "allprofiles"])
+    results = runner.call_all([cmd1, cmd2], on_line = print)
+    for line in runner.stream(["netsh", "advfirewall", "firewall", "show", "rule", "name=all"]):
+        ...
+
+The processes are started by an executor: Executor for real processes,
+FakeExecutor to answer from a table, e.g. in tests on Linux. Shell keeps
+one powershell open for a sequence of commands.
+"""
+
+import asyncio
+import locale
+import os
+import queue
+import subprocess
+import threading
+import time as tm
+import weakref
+from dataclasses import dataclass
+
+
+@dataclass
+class Result:
+    """Outcome of a command: output, exit code and duration in seconds."""
+
+    cmd: list
+    returncode: int = None
+    stdout: str = ""
+    stderr: str = ""
+    duration: float = 0.0
+    timed_out: bool = False
+
+    def __bool__(self):
+        return self.returncode == 0 and not self.timed_out
+
+    @property
+    def output(self):
+        return self.stdout + self.stderr
+
+    def check(self):
+        """Raise as subprocess.run(check = True) would, else return self."""
+        if self.timed_out:
+            raise subprocess.TimeoutExpired(self.cmd, self.duration, self.stdout, self.stderr)
+        if self.returncode:
+            raise subprocess.CalledProcessError(self.returncode, self.cmd, self.stdout, self.stderr)
+        return self
+
+
+class Executor:
+    """Start real processes with asyncio."""
+
+    async def start(self, cmd: list):
+        return await asyncio.create_subprocess_exec(
+            *cmd, stdout = asyncio.subprocess.PIPE, stderr = asyncio.subprocess.PIPE)
+
+
+class FakeProcess:
+    """Process of FakeExecutor: prints its output over seconds, then exits."""
+
+    def __init__(self, returncode: int, output: str, seconds: float, error: str = ""):
+        self.returncode = None
+        self.stdout = asyncio.StreamReader()
+        self.stderr = asyncio.StreamReader()
+        self.stderr.feed_data(error.encode())
+        self.stderr.feed_eof()
+        self._play = asyncio.ensure_future(self._run(returncode, output, seconds))
+
+    async def _run(self, returncode: int, output: str, seconds: float):
+        lines = output.splitlines(keepends = True)
+        for line in lines:
+            await asyncio.sleep(seconds / len(lines))
+            # bytes as they are, e.g. in the code page of a Windows tool
+            self.stdout.feed_data(line if isinstance(line, bytes) else line.encode())
+        if not lines:
+            await asyncio.sleep(seconds)
+        self.stdout.feed_eof()
+        self.returncode = returncode
+
+    async def wait(self):
+        try:
+            await self._play
+        except asyncio.CancelledError:
+            pass
+        return self.returncode
+
+    def kill(self):
+        if self.returncode is None:
+            self._play.cancel()
+            self.stdout.feed_eof()
+            self.returncode = -9
+
+
+class FakeExecutor:
+    """
+    Stand-in of Executor answering from a table.
+
+    answers maps a whole command line ("netsh -f x.txt") or a program
+    ("netsh") to (returncode, output, seconds) or to a function of the
+    command returning it, output being text or bytes already encoded. The
+    commands started are kept in calls.
+    """
+
+    def __init__(self, answers: dict = None, default: tuple = (0, "", 0.0)):
+        self.answers = answers if answers else {}
+        self.default = default
+        self.calls = []
+
+    async def start(self, cmd: list):
+        self.calls.append(list(cmd))
+        answer = self.answers.get(" ".join(cmd), self.answers.get(cmd[0], self.default))
+        if callable(answer):
+            answer = answer(cmd)
+        return FakeProcess(*answer)
+
+
+class Runner:
+    """
+    Run commands with asyncio, at most limit together, each killed after
+    timeout seconds (None: no timeout).
+
+    The sync facade runs the commands on one event loop of the runner, in
+    a thread of its own: the limit holds across all the threads calling
+    it, and on_line is called in that thread.
+    """
+
+    def __init__(self, limit: int = 4, timeout: float = None, executor = None,
+                 encoding: str = None):
+        self.limit = limit
+        self.timeout = timeout
+        self.executor = executor if executor else Executor()
+        self.encoding = encoding if encoding else locale.getpreferredencoding(False)
+        # a semaphore belongs to the loop it is used in: one per loop
+        self._semaphores = weakref.WeakKeyDictionary()
+        self._loop = None
+        self._lock = threading.Lock()
+
+    @property
+    def semaphore(self):
+        loop = asyncio.get_running_loop()
+        if loop not in self._semaphores:
+            self._semaphores[loop] = asyncio.Semaphore(self.limit)
+        return self._semaphores[loop]
+
+    async def _read(self, stream, lines: list, on_line = None, encoding: str = None):
+        while True:
+            line = await stream.readline()
+            if not line:
+                return
+            line = line.decode(encoding or self.encoding, errors = "replace")
+            lines.append(line)
+            if on_line:
+                on_line(line)
+
+    async def run(self, cmd: list, timeout: float = None, on_line = None,
+                  encoding: str = None) -> Result:
+        """
+        Run cmd, passing each line of its output to on_line as it arrives,
+        decoded with encoding (the one of the runner by default).
+        """
+        timeout = timeout if timeout is not None else self.timeout
+        result = Result(list(cmd))
+        out, err = [], []
+        async with self.semaphore:
+            start = tm.perf_counter()
+            process = await self.executor.start(cmd)
+            reading = asyncio.gather(self._read(process.stdout, out, on_line, encoding),
+                                     self._read(process.stderr, err, None, encoding))
+            try:
+                await asyncio.wait_for(reading, timeout)
+                result.returncode = await process.wait()
+            except asyncio.TimeoutError:
+                result.timed_out = True
+                process.kill()
+                result.returncode = await process.wait()
+            except asyncio.CancelledError:
+                # nobody waits for the output any more
+                process.kill()
+                await process.wait()
+                raise
+            result.duration = tm.perf_counter() - start
+        result.stdout, result.stderr = "".join(out), "".join(err)
+        return result
+
+    async def run_all(self, cmds: list, timeout: float = None, on_line = None,
+                      encoding: str = None) -> list:
+        """Run independent commands together, return their results in order."""
+        return list(await asyncio.gather(*(self.run(cmd, timeout, on_line, encoding)
+                                           for cmd in cmds)))
+
+    # sync facade
+
+    @property
+    def loop(self):
+        with self._lock:
+            if self._loop is None or self._loop.is_closed():
+                self._loop = asyncio.new_event_loop()
+                threading.Thread(target = self._serve, args = (self._loop,), daemon = True,
+                                 name = "runner").start()
+            return self._loop
+
+    @staticmethod
+    def _serve(loop):
+        try:
+            loop.run_forever()
+        finally:
+            loop.close()
+
+    def _submit(self, coroutine):
+        return asyncio.run_coroutine_threadsafe(coroutine, self.loop)
+
+    def call(self, cmd: list, timeout: float = None, on_line = None,
+             encoding: str = None) -> Result:
+        return self._submit(self.run(cmd, timeout, on_line, encoding)).result()
+
+    def call_all(self, cmds: list, timeout: float = None, on_line = None,
+                 encoding: str = None) -> list:
+        return self._submit(self.run_all(cmds, timeout, on_line, encoding)).result()
+
+    def stream(self, cmd: list, timeout: float = None, encoding: str = None):
+        """
+        Yield the lines of the output of cmd as they arrive, then raise as
+        Result.check() if it failed or timed out. Stopping the iteration
+        kills the command.
+        """
+        lines = queue.Queue()
+        future = self._submit(self.run(cmd, timeout, lines.put, encoding))
+        future.add_done_callback(lambda _: lines.put(None))
+        try:
+            while True:
+                line = lines.get()
+                if line is None:
+                    break
+                yield line
+        finally:
+            future.cancel()
+        future.result().check()
+
+    def close(self):
+        """Stop the loop of the sync facade, started again when needed."""
+        with self._lock:
+            loop, self._loop = self._loop, None
+        if loop is not None and not loop.is_closed():
+            loop.call_soon_threadsafe(loop.stop)
+
+
+class Shell:
+    """
+    One long-lived shell process running commands one at a time, instead of
+    a new powershell for each command.
+
+    Each command is followed by a newline, a marker and the exit status of
+    the command: the output up to the marker, less that newline, is the
+    output of the command, also when it does not end with a newline. A shell that died, or that was killed by a timeout, is started
+    again at the next command. Commands are single lines.
+
+    with Shell() as shell:
+        shell.run("Start-Service sshd")
+        shell.run("Set-Service -Name sshd -StartupType 'Automatic'")
+
+    Shell(["bash"], dialect = "bash") speaks the same protocol on Linux.
+    """
+
+    ARGV = ["powershell", "-NoLogo", "-NoProfile", "-NonInteractive", "-Command", "-"]
+
+    # command, then the marker with the exit status of the command
+    DIALECTS = {
+        "powershell": (
+            "try {{ {command} ; $xwallok = $? }} catch {{ $_ | Out-String | Write-Output ; $xwallok = $false }}",
+            "[Console]::Out.WriteLine(); [Console]::Out.WriteLine('{marker} ' + $(if ($xwallok) {{ 0 }} "
+            "elseif ($LASTEXITCODE) {{ $LASTEXITCODE }} else {{ 1 }})); [Console]::Out.Flush()"),
+        "bash": ("{command}", "printf '\\n{marker} %s\\n' $?"),
+        }
+
+    def __init__(self, argv: list = None, dialect: str = "powershell", encoding: str = None):
+        self.argv = argv if argv else self.ARGV
+        self.command, self.status = self.DIALECTS[dialect]
+        self.encoding = encoding if encoding else locale.getpreferredencoding(False)
+        self.process = None
+        self.starts = 0
+        self.count = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
+
+    def start(self):
+        self.process = subprocess.Popen(
+            self.argv, stdin = subprocess.PIPE, stdout = subprocess.PIPE,
+            stderr = subprocess.STDOUT, text = True, encoding = self.encoding,
+            errors = "replace", bufsize = 1)
+        self.lines = queue.Queue()
+        # the pipe is read by a thread: a queue get can time out on any platform
+        threading.Thread(target = self._pump, args = (self.process, self.lines),
+                         daemon = True).start()
+        self.token = os.urandom(6).hex()
+        self.starts += 1
+
+    @staticmethod
+    def _pump(process, lines):
+        for line in process.stdout:
+            lines.put(line)
+        lines.put(None)
+
+    @property
+    def alive(self):
+        return self.process is not None and self.process.poll() is None
+
+    def run(self, command: str, timeout: float = None, on_line = None) -> Result:
+        """Run command in the shell, passing each line of its output to on_line."""
+        if not self.alive:
+            self.start()
+        self.count += 1
+        marker = f"__XWALL_{self.token}_{self.count}__"
+        result, out = Result([command]), []
+        start = tm.perf_counter()
+        deadline = start + timeout if timeout is not None else None
+
+        def emit(line):
+            out.append(line)
+            if on_line:
+                on_line(line)
+
+        # a line is held back until the next one: the last one before the
+        # marker ends with the newline printed before the marker
+        last = ""
+        try:
+            self.process.stdin.write(self.command.format(command = command) + "\n")
+            self.process.stdin.write(self.status.format(marker = marker) + "\n")
+            self.process.stdin.flush()
+            while True:
+                left = deadline - tm.perf_counter() if deadline is not None else None
+                line = self.lines.get(timeout = max(left, 0)) if left is not None else self.lines.get()
+                if line is None:
+                    # the shell died: its exit code is the one of the command
+                    result.returncode = self.process.wait()
+                    break
+                if marker in line:
+                    head, _, status = line.partition(marker)
+                    result.returncode = int(status.split()[-1])
+                    last = last + head if head else last[:-1]
+                    break
+                if last:
+                    emit(last)
+                last = line
+        except queue.Empty:
+            result.timed_out = True
+            self.kill()
+        except OSError:
+            # stdin closed under us: the shell is gone
+            result.returncode = self.process.wait()
+        if last:
+            emit(last)
+        result.duration = tm.perf_counter() - start
+        result.stdout = "".join(out)
+        return result
+
+    def kill(self):
+        if self.alive:
+            self.process.kill()
+        if self.process is not None:
+            self.process.wait()
+
+    def close(self):
+        """End the shell, killing it if it does not exit by itself."""
+        if self.alive:
+            try:
+                self.process.stdin.write("exit\n")
+                self.process.stdin.flush()
+                self.process.wait(timeout = 5)
+            except (OSError, subprocess.TimeoutExpired):
+                pass
+        self.kill()
+        self.process = None
+
+
+# shared by the modules running commands
+default = Runner()
@@ -1,7 +1,8 @@
-import subprocess
 import sys
 
-"""
+import runner
+
+r"""
 -----------	[WINDOWS] ----------
 !powershell
 [INSTALL]
@@ -55,6 +56,44 @@ ssh domain\username@servername
 # sudo ufw delete allow ssh
 """
 
+CLIENT = "OpenSSH.Client~~~~0.0.1.0"
+SERVER = "OpenSSH.Server~~~~0.0.1.0"
+TIMEOUT = 30 * 60   # seconds, installing a capability can be slow
+
+
+def powershell(command):
+    return ["powershell", "-Command", command]
+
+
+def _report(result):
+    if result.timed_out:
+        print(f"Timed out after {result.duration:.0f}s: {result.cmd[-1]}")
+    elif result.returncode:
+        print(result.stderr, end="")
+        print(f"Failed ({result.returncode}): {result.cmd[-1]}")
+    return bool(result)
+
+
+def run_steps(commands, shell=None):
+    """
+    Run the PowerShell commands in order in one PowerShell session, printing
+    their output, stop at the first failure.
+    """
+    with shell if shell else runner.Shell() as session:
+        for command in commands:
+            result = session.run(command, timeout=TIMEOUT, on_line=lambda line: print(line, end=""))
+            if not _report(result):
+                return False
+    return True
+
+
+def run_together(commands):
+    """Run independent PowerShell commands at the same time, printing their output."""
+    results = runner.default.call_all([powershell(command) for command in commands],
+                                      timeout=TIMEOUT, on_line=lambda line: print(line, end=""))
+    return all([_report(result) for result in results])
+
+
 def run_ssh_installer(choice=None):
     """
     Executes SSH installation/uninstallation tasks on Windows.
@@ -92,24 +131,25 @@ def run_ssh_installer(choice=None):
             except ValueError:
                 print("Invalid input. Please enter a number.")
 
+    # run_steps: one after the other in one PowerShell, run_together: at the same time
     if choice == 0:
-        subprocess.run(["powershell", "-Command", "Get-WindowsCapability -Online | Where-Object Name -like 'OpenSSH*'"])
+        run_steps(["Get-WindowsCapability -Online | Where-Object Name -like 'OpenSSH*'"])
     elif choice == 1:
-        subprocess.run(["powershell", "-Command", "Add-WindowsCapability -Online -Name OpenSSH.Client~~~~0.0.1.0"])
+        run_steps([f"Add-WindowsCapability -Online -Name {CLIENT}"])
     elif choice == 2:
-        subprocess.run(["powershell", "-Command", "Add-WindowsCapability -Online -Name OpenSSH.Server~~~~0.0.1.0"])
-        subprocess.run(["powershell", "-Command", "Start-Service sshd"])
-        subprocess.run(["powershell", "-Command", "Set-Service -Name sshd -StartupType 'Automatic'"])
+        run_steps([f"Add-WindowsCapability -Online -Name {SERVER}",
+                   "Start-Service sshd",
+                   "Set-Service -Name sshd -StartupType 'Automatic'"])
     elif choice == 3:
-        subprocess.run(["powershell", "-Command", "Add-WindowsCapability -Online -Name OpenSSH.Client~~~~0.0.1.0"])
-        subprocess.run(["powershell", "-Command", "Add-WindowsCapability -Online -Name OpenSSH.Server~~~~0.0.1.0"])
+        run_together([f"Add-WindowsCapability -Online -Name {CLIENT}",
+                      f"Add-WindowsCapability -Online -Name {SERVER}"])
     elif choice == 4:
-        subprocess.run(["powershell", "-Command", "Remove-WindowsCapability -Online -Name OpenSSH.Client~~~~0.0.1.0"])
+        run_steps([f"Remove-WindowsCapability -Online -Name {CLIENT}"])
     elif choice == 5:
-        subprocess.run(["powershell", "-Command", "Remove-WindowsCapability -Online -Name OpenSSH.Server~~~~0.0.1.0"])
+        run_steps([f"Remove-WindowsCapability -Online -Name {SERVER}"])
     elif choice == 6:
-        subprocess.run(["powershell", "-Command", "Remove-WindowsCapability -Online -Name OpenSSH.Client~~~~0.0.1.0"])
-        subprocess.run(["powershell", "-Command", "Remove-WindowsCapability -Online -Name OpenSSH.Server~~~~0.0.1.0"])
+        run_together([f"Remove-WindowsCapability -Online -Name {CLIENT}",
+                      f"Remove-WindowsCapability -Online -Name {SERVER}"])
     elif choice == 7:
         print("Connect server:\tssh username@servername")
         print("Copy files:\tscp -rpT <host@machine_name:/path> <to_local>")
@@ -0,0 +1,48 @@
+# XWALL 2025
+
+import os
+import sys
+
+import pytest
+
+# the modules live at the top of the repository, not in a package
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import backend as bk
+from xwall import ABC
+
+
+@pytest.fixture
+def memory():
+    """A MemoryBackend as ABC.backend for the test, the previous one restored after."""
+    previous = ABC.backend
+    ABC.backend = bk.MemoryBackend()
+    ABC.resolver.clear()
+    try:
+        yield ABC.backend
+    finally:
+        ABC.backend = previous
+        ABC.resolver.clear()
+
+
+@pytest.fixture
+def listing():
+    """
+    Return listing(*rules, language = "en"): the output of netsh show rule
+    verbose for rules given as (name, direction, action, program, extra lines).
+    """
+    labels = {
+        "en": ("Rule Name", "Enabled", "Yes", "Direction", "Action", "Program"),
+        "it": ("Nome regola", "Abilitata", "Sì", "Direzione", "Azione", "Programma"),
+        }
+
+    def listing(*rules, language = "en"):
+        name_, enabled, yes, direction_, action_, program_ = labels[language]
+        lines = [""]
+        for name, direction, action, program, *extra in rules:
+            lines += [f"{name_}:    {name}", "-" * 70, f"{enabled}:    {yes}",
+                      f"{direction_}:    {direction}", *extra,
+                      f"{program_}:    {program}", f"{action_}:    {action}", ""]
+        lines.append("Ok.")
+        return "\n".join(lines) + "\n"
+    return listing
@@ -0,0 +1,25 @@
+# XWALL 2025
+
+from xwall import Address
+
+
+def test_chain():
+    address = Address("HKEY_LOCAL_MACHINE", "SOFTWARE", "Vendor")
+    assert address.core == ("HKEY_LOCAL_MACHINE", "SOFTWARE", "Vendor")
+    assert address.str == "HKEY_LOCAL_MACHINE\\SOFTWARE\\Vendor"
+    assert address.size == 3
+    assert address.parent.str == "HKEY_LOCAL_MACHINE\\SOFTWARE"
+    assert address.root.name == "HKEY_LOCAL_MACHINE"
+    assert address.relative.core == ("SOFTWARE", "Vendor")
+    assert address.is_absolute and not address.relative.is_absolute
+    assert Address("HKEY_CURRENT_USER").is_root
+
+
+def test_children_share_their_parent():
+    parent = Address("HKEY_LOCAL_MACHINE", "SOFTWARE")
+    first, second = parent / "A", parent / "B"
+    assert first.up is parent and second.up is parent
+    assert first.base is parent.base
+    # names are interned: the same string object across addresses
+    assert (parent / "".join(["A"])).name is first.name
+    assert (parent / Address("X", "Y")).core == ("HKEY_LOCAL_MACHINE", "SOFTWARE", "X", "Y")
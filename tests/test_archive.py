@@ -0,0 +1,103 @@
+# XWALL 2025
+
+import numpy as np
+import pytest
+from PIL import Image
+
+from archive import Archive
+
+
+def frame(n: int, mode: str = "RGB"):
+    pixels = np.zeros((24, 32, 3), dtype = np.uint8)
+    pixels[n % 24, :] = 255
+    return Image.fromarray(pixels).convert(mode)
+
+
+def same(a: Image.Image, b: Image.Image):
+    return a.mode == b.mode and np.array_equal(np.asarray(a), np.asarray(b))
+
+
+@pytest.fixture
+def session(tmp_path):
+    path = str(tmp_path / "session")
+    with Archive(path) as archive:
+        for n in range(10):
+            archive.append(frame(n), t = 1000.0 + 10 * n)
+    return path
+
+
+def test_at(session):
+    with Archive(session) as archive:
+        assert len(archive) == 10
+        t, image = archive.at(1042.5)
+        assert t == 1040.0 and same(image, frame(4))
+        assert archive.at(1090.0)[0] == 1090.0 and archive.at(5000.0)[0] == 1090.0
+        with pytest.raises(KeyError):
+            archive.at(999.0)
+        assert archive.find(999.0) == -1
+        assert archive[-1][0] == 1090.0
+        with pytest.raises(IndexError):
+            archive[10]
+
+
+@pytest.mark.parametrize("codec", Archive.CODECS)
+@pytest.mark.parametrize("mode", Archive.MODES)
+def test_codecs(tmp_path, codec, mode):
+    path = str(tmp_path / "session")
+    with Archive(path, codec = codec) as archive:
+        archive.append(frame(3, mode), t = 1.0)
+    with Archive(path) as archive:
+        assert same(archive.frame(0), frame(3, mode))
+
+
+def test_other_modes_as_rgb(tmp_path):
+    path = str(tmp_path / "session")
+    with Archive(path) as archive:
+        archive.append(frame(1, "CMYK"), t = 1.0)
+    with Archive(path) as archive:
+        assert archive.frame(0).mode == "RGB"
+
+
+def test_dedup(tmp_path):
+    path = str(tmp_path / "session")
+    with Archive(path) as archive:
+        assert archive.append(frame(1), t = 1.0)
+        assert not archive.append(frame(1), t = 2.0)
+        assert archive.append(frame(2), t = 3.0)
+    with Archive(path) as archive:
+        # the frame shown at 2 is the one of 1
+        assert len(archive) == 2 and same(archive.at(2.0)[1], frame(1))
+    with Archive(str(tmp_path / "all"), dedup = False) as archive:
+        archive.append(frame(1), t = 1.0)
+        assert archive.append(frame(1), t = 2.0)
+
+
+def test_append_after_reopen(session):
+    with Archive(session) as archive:
+        with pytest.raises(ValueError):
+            archive.append(frame(0), t = 1000.0)
+        # the last frame is not known across sessions: stored again
+        assert archive.append(frame(9), t = 1100.0)
+        archive.refresh()
+        assert len(archive) == 11 and archive.at(1100.0)[0] == 1100.0
+
+
+def test_range_and_export(session, tmp_path):
+    with Archive(session) as archive:
+        assert [t for t, _ in archive.range(1025.0, 1050.0)] == [1020.0, 1030.0, 1040.0, 1050.0]
+        assert len(list(archive.range())) == 10
+        path = str(tmp_path / "clip.png")
+        assert archive.export(path, 1020.0, 1040.0, speed = 2.0) == 3
+        assert archive.export(str(tmp_path / "none.png"), 0.0, 10.0) == 0
+    with Image.open(path) as clip:
+        assert clip.n_frames == 3 and clip.info["duration"] == 5000
+
+
+def test_codec_checked(tmp_path):
+    with pytest.raises(ValueError):
+        Archive(str(tmp_path / "session"), codec = "gif")
+
+
+def test_empty(tmp_path):
+    with Archive(str(tmp_path / "session")) as archive:
+        assert len(archive) == 0 and list(archive.range()) == []
@@ -0,0 +1,147 @@
+# XWALL 2025
+
+import struct
+
+import pytest
+
+import backend as bk
+from regindex import Index
+from xwall import ABC, Address, EKEY, FKEY, HKEY
+
+
+def sz(text: str) -> bytes:
+    return (text + "\x00").encode("utf-16-le")
+
+
+def build_hive(tree: dict, path: str):
+    """
+    Write a minimal REGF hive: tree maps a key name to (subtree, values),
+    values being (name, type, raw data). The root key holds tree.
+    """
+    cells = bytearray()
+
+    def alloc(data: bytes) -> int:
+        size = len(data) + 4
+        size += -size % 8
+        offset = len(cells)
+        cells.extend(struct.pack("<i", -size) + data + bytes(size - 4 - len(data)))
+        return offset
+
+    def nk(name: str, subtree: dict, values: list) -> int:
+        children = [nk(child, *content) for child, content in subtree.items()]
+        lf = alloc(b"lf" + struct.pack("<H", len(children)) +
+                   b"".join(struct.pack("<iI", child, 0) for child in children)) if children else -1
+        vks = []
+        for value_name, type_, data in values:
+            if len(data) <= 4:
+                # small data sits in the offset field
+                size, offset = len(data) | 0x80000000, struct.unpack("<i", data.ljust(4, b"\x00"))[0]
+            else:
+                size, offset = len(data), alloc(data)
+            raw = value_name.encode("latin-1")
+            vks.append(alloc(b"vk" + struct.pack("<HIiIHH", len(raw), size, offset, type_, 1, 0) + raw))
+        vl = alloc(b"".join(struct.pack("<i", vk) for vk in vks)) if vks else -1
+        raw = name.encode("latin-1")
+        return alloc(b"nk" + struct.pack("<HQIIIIiiIiiiIIIII", 0x20, 132000000000000000, 0, 0,
+                                          len(children), 0, lf, -1, len(vks), vl,
+                                          -1, -1, 0, 0, 0, 0, 0) +
+                     struct.pack("<HH", len(raw), 0) + raw)
+
+    root = nk("ROOT", tree, [])
+    base = bytearray(bk.HiveBackend.BASE)
+    base[:4] = b"regf"
+    struct.pack_into("<i", base, 0x24, root)
+    with open(path, "wb") as f:
+        f.write(bytes(base) + bytes(cells))
+
+
+@pytest.fixture
+def hive(tmp_path):
+    tree = {"SOFTWARE": ({"Vendor": ({"App": ({}, [("Path", bk.REG_SZ, sz("C:\\app")),
+                                                   ("Count", bk.REG_DWORD, struct.pack("<I", 7))])},
+                                     [("Multi", bk.REG_MULTI_SZ, sz("a") + sz("b") + b"\x00\x00")])},
+                         [])}
+    path = str(tmp_path / "software.hiv")
+    build_hive(tree, path)
+    with bk.HiveBackend(path) as backend:
+        yield backend
+
+
+def test_hive_listing(hive):
+    root = hive.roots()["HKEY_LOCAL_MACHINE"]
+    with hive.open_key(root, "software\\VENDOR") as handle:
+        fkeys, ekeys, _ = hive.listing(handle)
+    assert fkeys == ["App"]
+    assert ekeys == [("Multi", ["a", "b"], bk.REG_MULTI_SZ)]
+
+    with hive.open_key(root, "SOFTWARE\\Vendor\\App") as handle:
+        assert hive.query_info(handle)[:2] == (0, 2)
+        assert hive.query_value(handle, "path") == ("C:\\app", bk.REG_SZ)
+        assert hive.query_value(handle, "Count") == (7, bk.REG_DWORD)
+
+
+def test_hive_missing_and_read_only(hive):
+    root = hive.roots()["HKEY_LOCAL_MACHINE"]
+    with pytest.raises(FileNotFoundError):
+        hive.open_key(root, "SOFTWARE\\Missing")
+    with hive.open_key(root, "SOFTWARE") as handle:
+        with pytest.raises(PermissionError):
+            hive.delete_key(handle, "Vendor")
+
+
+def test_hive_not_regf(tmp_path):
+    path = tmp_path / "empty.hiv"
+    path.write_bytes(bytes(bk.HiveBackend.BASE))
+    with pytest.raises(ValueError):
+        bk.HiveBackend(str(path))
+
+
+def test_hive_keys(hive, memory):
+    ABC.backend = hive
+    found = [(key.address.str, key.value if isinstance(key, EKEY) else None)
+             for key in HKEY.HKEY_LOCAL_MACHINE().walk()]
+    assert found == [
+        ("HKEY_LOCAL_MACHINE\\SOFTWARE", None),
+        ("HKEY_LOCAL_MACHINE\\SOFTWARE\\Vendor", None),
+        ("HKEY_LOCAL_MACHINE\\SOFTWARE\\Vendor\\App", None),
+        ("HKEY_LOCAL_MACHINE\\SOFTWARE\\Vendor\\App\\Path", "C:\\app"),
+        ("HKEY_LOCAL_MACHINE\\SOFTWARE\\Vendor\\App\\Count", 7),
+        ("HKEY_LOCAL_MACHINE\\SOFTWARE\\Vendor\\Multi", ["a", "b"]),
+        ]
+    assert FKEY(Address("HKEY_LOCAL_MACHINE", "software", "vendor")).exists
+    assert not FKEY(Address("HKEY_LOCAL_MACHINE", "x")).exists
+
+
+def test_key_with_its_own_backend(memory):
+    # the default backend is not the one of the key
+    other = bk.MemoryBackend()
+    other.set_value("HKEY_CURRENT_USER\\Software\\Vendor\\App", "Path", "C:\\app")
+    key = FKEY(Address("HKEY_CURRENT_USER", "Software", "Vendor"))
+    key.backend = other
+    assert key.exists
+    assert [found.address.str for found in key.walk()] == [
+        "HKEY_CURRENT_USER\\Software\\Vendor\\App",
+        "HKEY_CURRENT_USER\\Software\\Vendor\\App\\Path",
+        ]
+    assert not FKEY(Address("HKEY_CURRENT_USER", "Software", "Vendor")).exists
+
+    # and so are the keys reached from it
+    app = next(key.walk())
+    assert app.exists
+    assert [found.name for found in app.walk()] == ["Path"]
+    assert [found.name for found in key.suba] == ["App"]
+    assert [found.name for found in key.query("App/*")] == ["Path"]
+    assert app.parent.exists and app.root.exists
+    assert app.root.value is other.roots()["HKEY_CURRENT_USER"]
+
+
+def test_index_keys_on_the_backend_indexed(memory, tmp_path):
+    other = bk.MemoryBackend()
+    other.set_value("HKEY_CURRENT_USER\\Software\\Vendor", "word", "1")
+    key = FKEY(Address("HKEY_CURRENT_USER", "Software"))
+    key.backend = other
+    with Index(str(tmp_path / "index.db")) as index:
+        index.refresh(key)
+        found = list(index.search("word"))
+    assert [(value.address.str, value.value) for value in found] == [
+        ("HKEY_CURRENT_USER\\Software\\Vendor\\word", "1")]
@@ -0,0 +1,74 @@
+# XWALL 2025
+
+from xwall import Batch, Firewall, Netsh, RuleIndex
+
+
+class FakeNetsh:
+    """Runner of Batch: answers a script with the Ok. lines given, a listing with rules."""
+
+    def __init__(self, oks: int, rules: str = ""):
+        self.oks = oks
+        self.rules = rules
+        self.calls = []
+        self.script = None
+
+    def __call__(self, cmd: list):
+        self.calls.append(cmd)
+        if cmd[:2] == ["netsh", "-f"]:
+            with open(cmd[2]) as f:
+                self.script = f.read()
+            return 0, "Ok.\n\n" * self.oks
+        return 0, self.rules
+
+
+def batch(runner):
+    batch = Batch(runner)
+    batch.add_rule("xwall-a-out", "C:\\a.exe", "out")
+    batch.add_rule("xwall-a-in", "C:\\a.exe", "in")
+    batch.add_rule("xwall-b-out", "C:\\Program Files\\b.exe", "out")
+    return batch
+
+
+def test_all_added():
+    runner = FakeNetsh(oks = 3)
+    outcomes = batch(runner).apply()
+    assert [outcome.ok for outcome in outcomes] == [True, True, True]
+    # one netsh for the whole batch, no listing needed
+    assert len(runner.calls) == 1
+    assert 'program="C:\\Program Files\\b.exe"' in runner.script
+    assert runner.script.count("advfirewall firewall add rule") == 3
+
+
+def test_some_failed(listing):
+    rules = listing(("xwall-a-out", "Out", "Block", "C:\\a.exe"),
+                    ("xwall-b-out", "Out", "Block", "C:\\Program Files\\b.exe"))
+    runner = FakeNetsh(oks = 2, rules = rules)
+    outcomes = batch(runner).apply()
+    assert [(outcome.name, outcome.ok) for outcome in outcomes] == [
+        ("xwall-a-out", True), ("xwall-a-in", False), ("xwall-b-out", True)]
+    assert runner.calls[1] == Netsh.NETSH_LISTRULE_CMD + ["verbose"]
+
+
+def test_localized_listing(listing):
+    rules = listing(("xwall-a-out", "In uscita", "Blocca", "C:\\a.exe"),
+                    ("xwall-a-in", "In ingresso", "Blocca", "C:\\a.exe"),
+                    language = "it")
+    outcomes = batch(FakeNetsh(oks = 0, rules = rules)).apply()
+    assert [outcome.ok for outcome in outcomes] == [True, True, False]
+
+
+def test_empty_batch():
+    runner = FakeNetsh(oks = 0)
+    assert Batch(runner).apply() == []
+    assert runner.calls == []
+
+
+def test_block_traffic_in_one_batch(tmp_path):
+    for name in ("a.exe", "b.exe"):
+        (tmp_path / name).write_bytes(b"")
+    runner = FakeNetsh(oks = 4)
+    index = Firewall.block_traffic(str(tmp_path), index = RuleIndex(),
+                                   batch = True, runner = runner)
+    assert len(runner.calls) == 1
+    assert runner.script.count("add rule") == 4
+    assert index.covers(tmp_path / "a.exe", "in") and index.covers(tmp_path / "b.exe", "out")
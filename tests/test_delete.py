@@ -0,0 +1,78 @@
+# XWALL 2025
+
+import pytest
+
+import backend as bk
+from xwall import Address, Deletion, FKEY, HKEY
+
+
+@pytest.fixture
+def vendor(memory):
+    for path in ("A\\A1", "A\\A2", "B", "C\\C1\\C11"):
+        memory.set_value(f"HKEY_CURRENT_USER\\Software\\Vendor\\{path}", "x", "1")
+    memory.set_value("HKEY_CURRENT_USER\\Software\\Kept", "y", "2")
+    return FKEY(Address("HKEY_CURRENT_USER", "Software", "Vendor"))
+
+
+def names(addresses):
+    return sorted(address.str.rpartition("\\Software\\")[2] for address in addresses)
+
+
+def software(memory):
+    return sorted(memory.tree["HKEY_CURRENT_USER"].keys["software"].keys)
+
+
+def test_plan_is_post_order(vendor):
+    plan = vendor._plan()
+    done = set()
+    for parent, children in plan:
+        # the subkeys of a key are emptied before it is deleted
+        assert parent.str not in done
+        done.update((parent / name).str for name in children)
+    assert plan[-1][0].str == "HKEY_CURRENT_USER\\Software" and plan[-1][1] == ["Vendor"]
+    assert len(done) == 8
+
+
+def test_preview_changes_nothing(vendor, memory):
+    deletion = vendor.delete()
+    assert deletion.preview and len(deletion.deleted) == 8
+    assert software(memory) == ["kept", "vendor"]
+
+
+def test_delete(vendor, memory):
+    opened = []
+    open_key = memory.open_key
+    memory.open_key = lambda *args: opened.append(args) or open_key(*args)
+    deletion = vendor.delete(preview = False)
+    assert deletion and len(deletion.deleted) == 8
+    assert software(memory) == ["kept"]
+    assert not vendor.exists
+    # one walk, then each parent key opened once to delete its subkeys
+    parents = [args[1] for args in opened if args[2:] == (bk.KEY_ALL_ACCESS,)]
+    assert sorted(parents) == ["Software", "Software\\Vendor", "Software\\Vendor\\A",
+                               "Software\\Vendor\\C", "Software\\Vendor\\C\\C1"]
+
+
+def test_denied_and_missing(vendor, memory):
+    delete_key = memory.delete_key
+
+    def denying(handle, name):
+        if name == "A1":
+            raise PermissionError(5, "Access is denied", name)
+        return delete_key(handle, name)
+
+    plan = vendor._plan()
+    memory.delete_key = denying
+    # B goes away between the plan and its run
+    delete_key(memory.open_key("HKEY_CURRENT_USER", "Software\\Vendor"), "B")
+    deletion = Deletion(plan, preview = False).run(memory, memory.delete_key)
+    assert not deletion
+    assert names(deletion.missing) == ["Vendor\\B"]
+    # A keeps its denied subkey, so A and Vendor are denied too
+    assert names(deletion.denied) == ["Vendor", "Vendor\\A", "Vendor\\A\\A1"]
+    assert software(memory) == ["kept", "vendor"]
+
+
+def test_root_is_never_deleted(memory):
+    with pytest.raises(ValueError):
+        HKEY.HKEY_CURRENT_USER().delete(preview = False)
@@ -0,0 +1,110 @@
+# XWALL 2025
+
+import numpy as np
+import pytest
+from PIL import Image
+
+from recorder import Delta, Recorder
+
+
+def desktop(n: int = 40, seed: int = 1):
+    """Synthetic session: mostly idle, a cursor moving now and then."""
+    rng = np.random.default_rng(seed)
+    base = rng.integers(0, 255, (96, 128, 3), dtype = np.uint8)
+    frames = []
+    for i in range(n):
+        pixels = base.copy()
+        if i % 4 == 0:
+            x = (i * 3) % 100
+            pixels[10:20, x:x + 8] = 255
+        frames.append(Image.fromarray(pixels))
+    return frames
+
+
+def same(a: Image.Image, b: Image.Image):
+    return np.array_equal(np.asarray(a), np.asarray(b))
+
+
+def test_drop_and_patch():
+    delta = Delta(tile = 16)
+    frames = desktop()
+    items = [delta.push(frame, t) for t, frame in enumerate(frames)]
+    assert isinstance(items[0], Delta.Key)
+    # the cursor left at 1, then nothing changed until 4
+    assert isinstance(items[1], Delta.Patch) and items[2] is None and items[3] is None
+    patch = items[4]
+    assert isinstance(patch, Delta.Patch)
+    # only the tiles around the cursor, not the frame
+    assert sum(image.width * image.height for _, _, image in patch.rects) < 128 * 96 / 4
+    stats = delta.stats
+    assert stats["frames"] == 40 and stats["keys"] == 1
+    assert stats["dropped"] + stats["patches"] + stats["keys"] == 40
+    assert stats["pixels"] < 40 * 128 * 96 / 10
+
+
+def test_replay():
+    delta = Delta(tile = 16)
+    frames = desktop()
+    items = [item for item in (delta.push(frame, t) for t, frame in enumerate(frames)) if item]
+    played = dict(Delta.replay(items))
+    for t, frame in enumerate(frames):
+        shown = played[max(k for k in played if k <= t)]
+        assert same(shown, frame)
+
+
+def test_keys():
+    delta = Delta(tile = 8, keyframe = 3, limit = 0.5)
+    black, white = Image.new("RGB", (32, 32)), Image.new("RGB", (32, 32), "white")
+    dot = black.copy()
+    dot.putpixel((1, 1), (255, 255, 255))
+    kinds = [type(delta.push(frame, t)).__name__
+             for t, frame in enumerate([black, dot, black, dot, black, white])]
+    # a Key every keyframe frames, and when most of the frame changed
+    assert kinds == ["Key", "Patch", "Patch", "Patch", "Key", "Key"]
+    delta.reset()
+    assert isinstance(delta.push(white, 6), Delta.Key)
+    # a new size starts again
+    assert isinstance(delta.push(Image.new("RGB", (16, 16)), 7), Delta.Key)
+
+
+def test_rects_cover_grid():
+    delta = Delta()
+    grid = np.array([[1, 1, 0, 1],
+                     [1, 1, 0, 0],
+                     [0, 1, 0, 1]], dtype = bool)
+    covered = np.zeros_like(grid)
+    for x0, y0, x1, y1 in delta._rects(grid):
+        assert not covered[y0:y1, x0:x1].any()
+        covered[y0:y1, x0:x1] = True
+    assert np.array_equal(covered, grid)
+
+
+def test_save_load(tmp_path):
+    delta = Delta(tile = 16)
+    frames = desktop(12)
+    items = [item for item in (delta.push(frame, t) for t, frame in enumerate(frames)) if item]
+    path = str(tmp_path / "segment.zip")
+    Delta.save(items, path)
+    loaded = Delta.load(path)
+    assert [item.t for item in loaded] == [item.t for item in items]
+    for (_, a), (_, b) in zip(Delta.replay(items), Delta.replay(loaded)):
+        assert same(a, b)
+
+
+def test_patch_before_key():
+    with pytest.raises(ValueError):
+        list(Delta.replay([Delta.Patch(0, [])]))
+
+
+def test_recorder_segments(tmp_path):
+    folder = str(tmp_path / "rec")
+    with Recorder(folder, segment = 20, delta = Delta(tile = 16)) as recorder:
+        for t, frame in enumerate(desktop()):
+            recorder.add(frame, t = t)
+    entries = Recorder.segments(folder)
+    assert [entry["file"] for entry in entries] == ["segment-000001.zip", "segment-000002.zip"]
+    # the dropped frames are counted as repeats
+    assert sum(entry["frames"] for entry in entries) == 40
+    # each segment plays alone
+    items = Delta.load(str(tmp_path / "rec" / entries[1]["file"]))
+    assert isinstance(items[0], Delta.Key)
@@ -0,0 +1,60 @@
+# XWALL 2025
+
+import os
+
+import pytest
+
+from xwall import Discovery
+
+
+@pytest.fixture
+def folder(tmp_path):
+    for rel in ("a.exe", "notes.txt", "Sub/B.EXE", "Sub/Deep/c.exe", "Cache/d.exe", "sub2/e.dll"):
+        path = tmp_path / rel
+        path.parent.mkdir(parents = True, exist_ok = True)
+        path.write_bytes(b"x")
+    return tmp_path
+
+
+def found(discovery, root):
+    return sorted(os.path.relpath(path, root).replace(os.sep, "/") for path, _, _ in discovery.scan())
+
+
+def test_scan(folder):
+    assert found(Discovery(folder), folder) == ["Cache/d.exe", "Sub/B.EXE", "Sub/Deep/c.exe", "a.exe"]
+    assert found(Discovery(folder, recursive = False), folder) == ["a.exe"]
+    assert found(Discovery(folder, include = ["*.exe", "*.dll"], exclude = ["cache", "sub/deep"]),
+                 folder) == ["Sub/B.EXE", "a.exe", "sub2/e.dll"]
+
+
+def test_parallel_scan(folder):
+    assert found(Discovery(folder, workers = 3), folder) == found(Discovery(folder), folder)
+
+
+def test_state_file(folder, tmp_path_factory):
+    state = str(tmp_path_factory.mktemp("state") / "state.json")
+    first = Discovery(folder, state = state)
+    assert len(list(first.changed())) == 4
+    first.save()
+
+    second = Discovery(folder, state = state)
+    assert list(second.changed()) == []
+    (folder / "a.exe").write_bytes(b"changed")
+    (folder / "new.exe").write_bytes(b"")
+    assert sorted(os.path.basename(path) for path in Discovery(folder, state = state).changed()) == [
+        "a.exe", "new.exe"]
+
+
+def test_partial_run_is_not_saved(folder, tmp_path_factory):
+    state = str(tmp_path_factory.mktemp("state") / "state.json")
+    discovery = Discovery(folder, state = state)
+    next(discovery.changed())
+    discovery.save()
+    assert not os.path.exists(state)
+
+
+def test_unreadable_folder(tmp_path):
+    errors = []
+    discovery = Discovery(tmp_path / "missing", onerror = errors.append)
+    assert list(discovery.scan()) == []
+    assert isinstance(errors[0], FileNotFoundError)
@@ -0,0 +1,126 @@
+# XWALL 2025
+
+import pytest
+
+import backend as bk
+from export import Jsonl, Reg
+from xwall import Address, FKEY
+
+
+VALUES = [
+    ("", "default", bk.REG_SZ),
+    ("Path", "C:\\Program Files\\\"app\"", bk.REG_SZ),
+    ("Count", 7, bk.REG_DWORD),
+    ("Big", 1 << 40, bk.REG_QWORD),
+    ("Data", bytes(range(64)), bk.REG_BINARY),
+    ("List", ["a", "b c"], bk.REG_MULTI_SZ),
+    ("Expand", "%SystemRoot%\\x", bk.REG_EXPAND_SZ),
+    ]
+
+
+@pytest.fixture
+def source(memory):
+    for name, value, type_ in VALUES:
+        memory.set_value("HKEY_CURRENT_USER\\Software\\Vendor", name, value, type_)
+    memory.set_value("HKEY_CURRENT_USER\\Software\\Vendor\\App\\Deep", "x", "1")
+    memory.add_key("HKEY_CURRENT_USER\\Software\\Vendor\\Empty")
+    return FKEY(Address("HKEY_CURRENT_USER", "Software", "Vendor"))
+
+
+def tree(backend, path: str = "HKEY_CURRENT_USER\\Software\\Vendor"):
+    key = FKEY(Address(*path.split("\\")))
+    key.backend = backend
+    return sorted((address.str, sorted(fkeys), sorted(ekeys, key = repr))
+                  for address, fkeys, ekeys, _ in key.listings())
+
+
+@pytest.mark.parametrize("name", ["vendor.reg", "vendor.reg.gz"])
+def test_reg_round_trip(source, memory, tmp_path, name):
+    path = str(tmp_path / name)
+    assert Reg.dump(source, path) == 4
+    target = bk.MemoryBackend()
+    assert Reg.load(path, target) == 4
+    assert tree(target) == tree(memory)
+
+
+@pytest.mark.parametrize("name", ["vendor.jsonl", "vendor.jsonl.gz"])
+def test_jsonl_round_trip(source, memory, tmp_path, name):
+    path = str(tmp_path / name)
+    assert Jsonl.dump(source, path) == 4
+    target = bk.MemoryBackend()
+    assert Jsonl.load(path, target) == 4
+    assert tree(target) == tree(memory)
+
+
+def test_reg_file_as_regedit_writes_it(source, tmp_path):
+    path = tmp_path / "vendor.reg"
+    Reg.dump(source, str(path))
+    text = path.read_bytes().decode("utf-16")
+    assert text.startswith(Reg.HEADER + "\r\n\r\n[HKEY_CURRENT_USER\\Software\\Vendor]\r\n")
+    assert '"Path"="C:\\\\Program Files\\\\\\"app\\""' in text
+    assert '"Count"=dword:00000007' in text
+    # hex data wrapped at 80 columns
+    assert all(len(line) <= 80 for line in text.split("\r\n"))
+
+
+def test_reg_deletions(tmp_path):
+    # [-key] removes the whole subtree, "name"=- one value, missing ones are ignored
+    target = bk.MemoryBackend()
+    target.set_value("HKEY_CURRENT_USER\\Software\\Old\\A\\B", "x", "1")
+    target.set_value("HKEY_CURRENT_USER\\Software\\Old\\C", "y", "2")
+    target.set_value("HKEY_CURRENT_USER\\Software\\Kept", "gone", "3")
+    target.set_value("HKEY_CURRENT_USER\\Software\\Kept", "stays", "4")
+    path = tmp_path / "delete.reg"
+    path.write_text("\r\n".join([
+        Reg.HEADER, "",
+        "[-HKEY_CURRENT_USER\\Software\\Old]", "",
+        "[-HKEY_CURRENT_USER\\Software\\Missing]", "",
+        "[HKEY_CURRENT_USER\\Software\\Kept]",
+        '"gone"=-',
+        '"never"=-',
+        '"new"=dword:0000000a', "",
+        ]), encoding = "utf-16")
+
+    assert Reg.load(str(path), target) == 1
+    software = target.tree["HKEY_CURRENT_USER"].keys["software"]
+    assert list(software.keys) == ["kept"]
+    assert sorted(software.keys["kept"].values.values()) == [
+        ("new", 10, bk.REG_DWORD), ("stays", "4", bk.REG_SZ)]
+
+
+def test_raw_values():
+    # data that does not decode to its type is written as it is
+    assert Reg.value("d", b"\x01\x02\x03", bk.REG_DWORD) == '"d"=hex(4):01,02,03'
+    assert Reg.value("b", b"\x01\x02", bk.REG_BINARY) == '"b"=hex:01,02'
+    assert Reg._parse('"d"=hex(4):01,02,03') == ("d", b"\x01\x02\x03", bk.REG_DWORD)
+
+
+def test_reg_deletions_reported(tmp_path, memory):
+    target = bk.MemoryBackend()
+    target.set_value("HKEY_CURRENT_USER\\Software\\Old\\Locked", "x", "1")
+    target.set_value("HKEY_CURRENT_USER\\Software\\Old\\Free", "y", "2")
+    delete_key = target.delete_key
+
+    def denying(handle, name):
+        if name == "Locked":
+            raise PermissionError(5, "Access is denied", name)
+        return delete_key(handle, name)
+
+    target.delete_key = denying
+    path = tmp_path / "delete.reg"
+    path.write_text("\r\n".join([
+        Reg.HEADER, "",
+        "[-HKEY_CURRENT_USER\\Software\\Old]", "",
+        "[-HKEY_CURRENT_USER\\Software\\Missing]", "",
+        "[HKEY_CURRENT_USER\\Software\\After]", '"z"="3"', "",
+        ]), encoding = "utf-16")
+
+    deletions = []
+    # a denied key does not stop the import
+    assert Reg.load(str(path), target, ondelete = deletions.append) == 1
+    old, missing = deletions
+    assert [address.str for address in old.deleted] == ["HKEY_CURRENT_USER\\Software\\Old\\Free"]
+    assert [address.str for address in old.denied] == ["HKEY_CURRENT_USER\\Software\\Old\\Locked",
+                                                       "HKEY_CURRENT_USER\\Software\\Old"]
+    assert [address.str for address in missing.missing] == ["HKEY_CURRENT_USER\\Software\\Missing"]
+    assert sorted(target.tree["HKEY_CURRENT_USER"].keys["software"].keys) == ["after", "old"]
@@ -0,0 +1,61 @@
+# XWALL 2025
+
+import pytest
+
+import runner as rn
+from xwall import Firewall, Netsh, Rule, RuleIndex
+
+
+def index_of(text: str):
+    return RuleIndex(Netsh.parse(text.splitlines()))
+
+
+@pytest.mark.parametrize("extra, covered", [
+    ((), True),
+    (("Profiles:    Domain,Private,Public", "Protocol:    Any", "LocalIP:    Any", "RemoteIP:    Any"), True),
+    (("Profiles:    Public",), False),
+    (("RemoteIP:    10.0.0.5/32",), False),
+    (("Protocol:    TCP", "LocalPort:    Any", "RemotePort:    443"), False),
+    ])
+def test_covers(listing, extra, covered):
+    index = index_of(listing(("xwall-a-out", "Out", "Block", "C:\\a.exe", *extra)))
+    assert index.covers("c:\\A.EXE", "out") is covered
+    assert not index.covers("c:\\A.EXE", "in")
+
+
+def test_covers_disabled():
+    index = RuleIndex([Rule("off", [("enabled", "No"), ("direction", "Out"),
+                                    ("action", "Block"), ("program", "C:\\a.exe")])])
+    assert not index.covers("C:\\a.exe", "out")
+
+
+def test_lookup_and_names(listing, monkeypatch):
+    monkeypatch.setenv("SystemRoot", "C:\\Windows")
+    index = index_of(listing(("APW-1-BKO-x", "Out", "Block", "%SystemRoot%\\x.exe"),
+                             ("APW-2-BKI-x", "In", "Block", "C:\\Windows\\x.exe"),
+                             ("Other rule", "Out", "Allow", "C:\\Windows\\.\\X.exe")))
+    assert len(index) == 3
+    assert [rule.name for rule in index.lookup("c:\\windows\\x.exe", "out")] == ["APW-1-BKO-x"]
+    assert [rule.name for rule in index.lookup("C:/Windows/x.exe", "out", "allow")] == ["Other rule"]
+    assert [rule.name for rule in index.named("APW")] == ["APW-1-BKO-x", "APW-2-BKI-x"]
+    assert [rule.name for rule in index.named("APW-2")] == ["APW-2-BKI-x"]
+    assert index.named("XWALL") == []
+
+
+def test_block_traffic_skips_covered_programs(listing, tmp_path, monkeypatch):
+    for name in ("a.exe", "b.exe", "notes.txt"):
+        (tmp_path / name).write_bytes(b"")
+    index = index_of(listing(("old", "Out", "Block", str(tmp_path / "a.exe"))))
+    executor = rn.FakeExecutor(default = (0, "Ok.\n", 0.0))
+    monkeypatch.setattr(rn.default, "executor", executor)
+
+    Firewall.block_traffic(str(tmp_path), index = index)
+    added = sorted(tuple(arg for arg in cmd if arg.startswith(("dir=", "program=")))
+                   for cmd in executor.calls)
+    assert added == [("dir=in", f"program={tmp_path / 'a.exe'}"),
+                     ("dir=in", f"program={tmp_path / 'b.exe'}"),
+                     ("dir=out", f"program={tmp_path / 'b.exe'}")]
+    # the rules added are in the index: a second run adds nothing
+    executor.calls.clear()
+    Firewall.block_traffic(str(tmp_path), index = index)
+    assert executor.calls == []
@@ -0,0 +1,53 @@
+# XWALL 2025
+
+import pytest
+
+import backend as bk
+from xwall import ABC, Address, EKEY, FKEY, HKEY
+
+
+@pytest.fixture
+def probe(memory):
+    memory.set_value("HKEY_LOCAL_MACHINE\\SOFTWARE\\A\\B", "x", "1")
+    memory.set_value("HKEY_LOCAL_MACHINE\\SYSTEM\\C", "y", "2")
+    memory.set_value("HKEY_CURRENT_USER\\Software\\D", "z", "3")
+    ABC.backend = probe = bk.Instrumented(memory)
+    return probe
+
+
+def test_counts_per_hive(probe):
+    events = []
+    probe.hook = lambda event, hive, subtree, seconds, error: events.append((event, hive, subtree))
+    found = [key.address.str for key in HKEY.HKEY_LOCAL_MACHINE().walk()]
+    assert len(found) == 7
+    hives = probe.summary()["hives"]
+    # the hive key and its 5 subkeys, each opened and listed once
+    assert hives == {"HKEY_LOCAL_MACHINE": {"open": 6, "enum": 6}}
+    assert ("open", "HKEY_LOCAL_MACHINE", "SOFTWARE") in events
+
+
+def test_subtrees_and_errors(probe):
+    list(HKEY.HKEY_LOCAL_MACHINE().walk())
+    list(HKEY.HKEY_CURRENT_USER().walk())
+    with pytest.raises(FileNotFoundError):
+        probe.open_key(probe.roots()["HKEY_LOCAL_MACHINE"], "SOFTWARE\\Missing")
+    summary = probe.summary()
+    assert summary["hives"]["HKEY_LOCAL_MACHINE"]["error"] == 1
+    paths = [path for path, wall, busy in summary["subtrees"]]
+    assert {"HKEY_LOCAL_MACHINE\\SOFTWARE", "HKEY_LOCAL_MACHINE\\SYSTEM",
+            "HKEY_CURRENT_USER\\Software"} <= set(paths)
+    assert all(wall >= 0 and busy >= 0 for _, wall, busy in summary["subtrees"])
+
+    probe.reset()
+    assert probe.summary() == {"hives": {}, "subtrees": []}
+
+
+def test_fallbacks_and_writes(probe, memory):
+    # a value is not a key: exists falls back to its parent
+    assert EKEY(Address("HKEY_LOCAL_MACHINE", "SOFTWARE", "A", "B", "x")).exists
+    key = FKEY(Address("HKEY_LOCAL_MACHINE", "SOFTWARE", "A"))
+    key.delete(preview = False)
+    events = probe.summary()["hives"]["HKEY_LOCAL_MACHINE"]
+    assert events["fallback"] == 1
+    assert events["delete"] == 2
+    assert "a" not in memory.tree["HKEY_LOCAL_MACHINE"].keys["software"].keys
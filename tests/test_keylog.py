@@ -0,0 +1,85 @@
+# XWALL 2025
+
+import os
+import time as tm
+
+from keylog import Event, KeyLog, Typed
+
+
+def test_round_trip(tmp_path):
+    path = str(tmp_path / "keys.log")
+    events = list(KeyLog.events("Hi there\n", start = 100.0))
+    with KeyLog(path) as log:
+        for event in events:
+            log(event)
+    assert os.path.getsize(path) == len(events) * KeyLog.RECORD.size
+    assert list(KeyLog.read(path)) == events
+
+
+def test_batches(tmp_path):
+    path = str(tmp_path / "keys.log")
+    with KeyLog(path, batch = 4, every = 60) as log:
+        for i in range(6):
+            log.add(float(i), "a", 30, True)
+        # one batch on disk, two events in the buffer
+        assert log.written == 4 and log.count == 2
+        assert os.path.getsize(path) == 4 * KeyLog.RECORD.size
+        log.flush()
+        assert log.written == 6 and log.count == 0
+    assert [event.scan_code for event in KeyLog.read(path)] == [30] * 6
+
+
+def test_idle_events_written(tmp_path):
+    path = str(tmp_path / "keys.log")
+    with KeyLog(path, batch = 100, every = 0.1) as log:
+        log.add(1.0, "a", 0, True)
+        deadline = tm.monotonic() + 5
+        while not log.written and tm.monotonic() < deadline:
+            tm.sleep(0.05)
+        assert log.written == 1 and len(list(KeyLog.read(path))) == 1
+
+
+def test_read_from(tmp_path):
+    path = str(tmp_path / "keys.log")
+    with KeyLog(path) as log:
+        for event in KeyLog.events("abc"):
+            log(event)
+    assert [event.name for event in KeyLog.read(path, start = 4)] == ["c", "c"]
+    # a record being written is not read
+    with open(path, "ab") as f:
+        f.write(b"\0" * 5)
+    assert len(list(KeyLog.read(path))) == 6
+
+
+def test_names():
+    for name in ("a", "é", "space", "right shift", "f12"):
+        assert KeyLog.name(KeyLog.code(name)) == name
+    assert KeyLog.name(KeyLog.code("media play")) == "unknown"
+    assert KeyLog.name(KeyLog.code(None)) == "unknown"
+
+
+def test_typed():
+    events = KeyLog.events("Hello world\nxy\bz\tLast")
+    assert list(Typed.strings(events)) == ["Hello world", "xz", "Last"]
+    # without backspace handling it ends the string, as in keyboard
+    assert list(Typed.strings(KeyLog.events("ab\bc"), backspace = False)) == ["ab", "c"]
+
+
+def test_caps_lock():
+    events = [Event(0, "caps lock", 0, "down"), Event(0, "caps lock", 0, "up"),
+              *KeyLog.events("ab"), Event(0, "shift", 0, "down"), *KeyLog.events("c")]
+    assert list(Typed.strings(events)) == ["ABc"]
+
+
+def test_typed_incremental(tmp_path):
+    path = str(tmp_path / "keys.log")
+    typed, texts, seen = Typed(), [], 0
+    with KeyLog(path) as log:
+        for part in ("first\nsec", "ond\n"):
+            for event in KeyLog.events(part):
+                log(event)
+            log.flush()
+            for event in KeyLog.read(path, start = seen):
+                seen += 1
+                texts += typed.feed(event)
+    assert texts == ["first", "second"] and typed.current == ""
@@ -0,0 +1,62 @@
+# XWALL 2025
+
+import sys
+
+import runner as rn
+from xwall import Batch, Netsh, RuleIndex
+
+
+def test_parse(listing):
+    lines = listing(("first", "In", "Allow", "%SystemRoot%\\x.exe", "Profiles:    Domain,Private,Public"),
+                    ("second", "Out", "Block", "C:\\y.exe", "Protocol:    TCP", "RemotePort:    443"))
+    first, second = Netsh.parse(lines.splitlines())
+    assert (first.name, first.direction, first.action, first.enabled) == ("first", "in", "allow", True)
+    assert first.profiles == "Domain,Private,Public"
+    assert (second.protocol, second.remote_port) == ("TCP", "443")
+    assert Netsh.rules_to_dict(lines.splitlines())[1]["rule_name"] == "second"
+
+
+def test_parse_lazily(listing):
+    lines = iter(listing(("first", "In", "Allow", "C:\\x.exe"),
+                         ("second", "Out", "Block", "C:\\y.exe")).splitlines())
+    rules = Netsh.parse(lines)
+    assert next(rules).name == "first"
+    # the first rule is out once the name of the next one is read
+    assert next(lines) != ""
+
+
+def test_parse_italian(listing):
+    lines = listing(("regola", "In uscita", "Blocca", "C:\\a.exe",
+                     "Profili:    Dominio,Privato,Pubblico", "Protocollo:    Qualsiasi",
+                     "IP locale:    Qualsiasi", "IP remoto:    Qualsiasi"),
+                    language = "it")
+    rule, = Netsh.parse(lines.splitlines())
+    assert (rule.enabled, rule.direction, rule.action, rule.program) == (True, "out", "block", "C:\\a.exe")
+    assert rule.unrestricted
+
+
+def test_stream_decodes_the_oem_code_page(listing, monkeypatch):
+    # what Italian Windows writes to the pipe, cp850 being the OEM code page there
+    text = listing(("perché", "In uscita", "Blocca", "C:\\a.exe"), language = "it")
+    monkeypatch.setattr(Netsh, "ENCODING", "cp850")
+    cmd = [sys.executable, "-c", "import sys; sys.stdout.buffer.write(bytes.fromhex(sys.argv[1]))",
+           text.encode("cp850").hex()]
+    rule, = Netsh.parse(Netsh.stream(cmd))
+    assert (rule.name, rule.enabled) == ("perché", True)
+    assert RuleIndex([rule]).covers("C:\\a.exe", "out")
+
+
+def test_batch_decodes_the_oem_code_page(listing, monkeypatch):
+    text = listing(("xwall-perché-out", "In uscita", "Blocca", "C:\\perché.exe"), language = "it")
+
+    def netsh(cmd):
+        if cmd[1] == "-f":
+            return 0, "Ok.\n", 0.0
+        return 0, text.encode("cp850"), 0.0
+
+    monkeypatch.setattr(Netsh, "ENCODING", "cp850")
+    monkeypatch.setattr(rn.default, "executor", rn.FakeExecutor({"netsh": netsh}))
+    batch = Batch()
+    batch.add_rule("xwall-perché-out", "C:\\perché.exe", "out")
+    batch.add_rule("xwall-perché-in", "C:\\perché.exe", "in")
+    assert [outcome.ok for outcome in batch.apply()] == [True, False]
@@ -0,0 +1,65 @@
+# XWALL 2025
+
+import pytest
+
+import backend as bk
+from xwall import Address, EKEY, FKEY, HKEY, Query
+
+
+@pytest.fixture
+def machine(memory):
+    for vendor in ("Adobe", "Microsoft", "Mozilla"):
+        for app in ("App1", "App2"):
+            memory.set_value(f"HKEY_LOCAL_MACHINE\\SOFTWARE\\{vendor}\\Uninstall\\{app}",
+                             "DisplayName", f"{vendor} {app}")
+        memory.set_value(f"HKEY_LOCAL_MACHINE\\SOFTWARE\\{vendor}\\Settings\\Deep\\Deeper", "x", 1,
+                         bk.REG_DWORD)
+    return HKEY.HKEY_LOCAL_MACHINE()
+
+
+def relative(keys, skip: int = 1):
+    return sorted("\\".join(key.address.core[skip:]) for key in keys)
+
+
+def test_glob_states():
+    query = Query("SOFTWARE/*/Uninstall/**")
+    assert query.descends(("software",))
+    assert query.descends(("SOFTWARE", "Vendor"))
+    assert not query.descends(("SYSTEM",))
+    assert not query.descends(("SOFTWARE", "Vendor", "Settings"))
+    assert query.descends(("SOFTWARE", "Vendor", "Uninstall", "App", "Sub"))
+    # "**" matches no part at all too
+    assert len(query.parts) in query.states(("SOFTWARE", "V", "UNINSTALL"))
+
+
+def test_query(machine):
+    found = machine.query("SOFTWARE/*/Uninstall/*", kind = FKEY)
+    assert relative(found) == [f"SOFTWARE\\{vendor}\\Uninstall\\{app}"
+                               for vendor in ("Adobe", "Microsoft", "Mozilla")
+                               for app in ("App1", "App2")]
+    values = list(machine.query("software/m*/uninstall/*/displayname", kind = EKEY))
+    assert sorted(value.value for value in values) == [
+        "Microsoft App1", "Microsoft App2", "Mozilla App1", "Mozilla App2"]
+
+
+def test_query_regex_and_depth(machine):
+    found = machine.query("**", regex = r"Deeper\\x$")
+    assert len(relative(found)) == 3
+    assert relative(machine.query(depth = 2)) == ["SOFTWARE", "SOFTWARE\\Adobe",
+                                                  "SOFTWARE\\Microsoft", "SOFTWARE\\Mozilla"]
+    records = list(machine.query("SOFTWARE/Adobe", records = True))
+    assert [record.kind for record in records] == [FKEY]
+
+
+def test_query_prunes(machine, memory):
+    opened = []
+    open_key = memory.open_key
+    memory.open_key = lambda *args: opened.append(args[1]) or open_key(*args)
+    list(machine.query("SOFTWARE/Adobe/Uninstall/*"))
+    # nothing below the apps can match: only the path to them is listed
+    assert opened == [None, "SOFTWARE", "SOFTWARE\\Adobe", "SOFTWARE\\Adobe\\Uninstall"]
+
+
+def test_query_relative_to_the_key(machine):
+    adobe = FKEY(Address("HKEY_LOCAL_MACHINE", "SOFTWARE", "Adobe"))
+    assert relative(adobe.query("*/App?"), skip = 3) == ["Uninstall\\App1", "Uninstall\\App2"]
@@ -0,0 +1,69 @@
+# XWALL 2025
+
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from PIL import Image
+
+from recorder import Recorder
+
+
+def frame(shade: int):
+    return Image.new("RGB", (40, 30), (shade, 0, 255 - shade))
+
+
+def test_segments(tmp_path):
+    folder = str(tmp_path / "rec")
+    with Recorder(folder, segment = 10, ring = 3) as recorder:
+        for t in range(25):
+            recorder.add(frame(t * 10), t = 100.0 + t)
+            # at most one segment of frames in memory
+            assert len(recorder.frames) <= 10
+        assert [t for t, _ in recorder.recent] == [122.0, 123.0, 124.0]
+    entries = Recorder.segments(folder)
+    assert [entry["file"] for entry in entries] == \
+        ["segment-000001.gif", "segment-000002.gif", "segment-000003.gif"]
+    assert [entry["frames"] for entry in entries] == [10, 10, 5]
+    assert entries[1]["start"] == 110.0 and entries[1]["end"] == 119.0
+    with Image.open(os.path.join(folder, entries[0]["file"])) as gif:
+        assert gif.n_frames == 10 and gif.info["duration"] == 1000
+
+
+def test_numbering_goes_on(tmp_path):
+    folder = str(tmp_path / "rec")
+    for start in (0, 100):
+        with Recorder(folder, segment = 10) as recorder:
+            recorder.add(frame(0), t = start)
+    assert [entry["file"] for entry in Recorder.segments(folder)] == \
+        ["segment-000001.gif", "segment-000002.gif"]
+
+
+def test_pool(tmp_path):
+    folder = str(tmp_path / "rec")
+    with ThreadPoolExecutor(1) as pool:
+        with Recorder(folder, segment = 5, pool = pool) as recorder:
+            for t in range(20):
+                recorder.add(frame(t), t = t)
+    assert sorted(entry["file"] for entry in Recorder.segments(folder)) == \
+        [f"segment-{n:06d}.gif" for n in range(1, 5)]
+
+
+def test_pool_errors_surface(tmp_path, monkeypatch):
+    def write(count, *job):
+        raise OSError(f"disk full at {count}")
+
+    with ThreadPoolExecutor(1) as pool:
+        recorder = Recorder(str(tmp_path / "rec"), segment = 5, pool = pool)
+        monkeypatch.setattr(recorder, "_write", write)
+        recorder.add(frame(0), t = 0)
+        first = recorder.flush()
+        first.exception()
+        recorder.add(frame(1), t = 10)
+        # the failed segment is done: the next flush raises its error
+        with pytest.raises(OSError, match = "at 1"):
+            recorder.flush()
+        recorder.add(frame(2), t = 20)
+        with pytest.raises(OSError, match = "at"):
+            recorder.close()
+        assert recorder.pending == []
@@ -0,0 +1,30 @@
+# XWALL 2025
+
+import backend as bk
+from xwall import Address, EKEY, FKEY, Record
+
+
+def test_walked_values_keep_their_data(memory):
+    memory.set_value("HKEY_CURRENT_USER\\S\\A", "n", 7, bk.REG_DWORD)
+    memory.set_value("HKEY_CURRENT_USER\\S\\A", "s", "text")
+    key = FKEY(Address("HKEY_CURRENT_USER", "S"))
+    values = [found for found in key.walk() if isinstance(found, EKEY)]
+
+    opened = []
+    open_key = memory.open_key
+    memory.open_key = lambda *args: opened.append(args[1]) or open_key(*args)
+    assert [(value.value, value.type) for value in values] == [(7, bk.REG_DWORD), ("text", bk.REG_SZ)]
+    assert opened == []
+
+    # an EKEY built by hand still reads its value
+    assert EKEY(Address("HKEY_CURRENT_USER", "S", "A", "n")).value == 7
+    assert opened == ["S\\A"]
+
+
+def test_records(memory):
+    memory.set_value("HKEY_CURRENT_USER\\S\\A", "n", 7, bk.REG_DWORD)
+    records = list(FKEY(Address("HKEY_CURRENT_USER", "S")).walk(records = True))
+    assert all(isinstance(record, Record) for record in records)
+    assert [(record.name, record.kind, record.value) for record in records] == [
+        ("A", FKEY, None), ("n", EKEY, 7)]
+    assert records[1].key.data == (7, bk.REG_DWORD)
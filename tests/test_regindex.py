@@ -0,0 +1,80 @@
+# XWALL 2025
+
+import pytest
+
+import backend as bk
+from regindex import Index
+from xwall import Address, EKEY, FKEY
+
+
+@pytest.fixture
+def index(memory, tmp_path):
+    memory.set_value("HKEY_LOCAL_MACHINE\\SOFTWARE\\Vendor\\App", "WordPath", "C:\\word")
+    memory.set_value("HKEY_LOCAL_MACHINE\\SOFTWARE\\Vendor\\Word", "Version", 16, bk.REG_DWORD)
+    memory.set_value("HKEY_LOCAL_MACHINE\\SOFTWARE\\Other", "x", "1")
+    with Index(str(tmp_path / "index.db")) as index:
+        yield index
+
+
+def software():
+    return FKEY(Address("HKEY_LOCAL_MACHINE", "SOFTWARE"))
+
+
+def found(keys):
+    return sorted(key.address.str for key in keys)
+
+
+def test_refresh_lists_only_changed_keys(index, memory):
+    assert index.refresh(software()) == {"checked": 5, "listed": 5, "removed": 0}
+    assert len(index) == 5
+    assert index.refresh(software()) == {"checked": 5, "listed": 0, "removed": 0}
+
+    memory.set_value("HKEY_LOCAL_MACHINE\\SOFTWARE\\Vendor\\App", "New", "1")
+    assert index.refresh(software()) == {"checked": 5, "listed": 1, "removed": 0}
+    assert found(index.search("new")) == ["HKEY_LOCAL_MACHINE\\SOFTWARE\\Vendor\\App\\New"]
+
+
+def test_refresh_prune(index, memory):
+    index.refresh(software())
+    # an unchanged key hides its subtree: the change below is not seen
+    memory.set_value("HKEY_LOCAL_MACHINE\\SOFTWARE\\Vendor\\App", "New", "1")
+    assert index.refresh(software(), prune = True) == {"checked": 1, "listed": 0, "removed": 0}
+    assert list(index.search("new")) == []
+
+
+def test_refresh_removes_deleted_keys(index, memory):
+    index.refresh(software())
+    vendor = memory.open_key("HKEY_LOCAL_MACHINE", "SOFTWARE\\Vendor")
+    memory.delete_key(vendor, "App")
+    assert index.refresh(software())["removed"] == 1
+    assert list(index.search("wordpath")) == []
+    assert len(index) == 4
+
+
+def test_search(index):
+    index.refresh(software())
+    assert found(index.search("WORD")) == [
+        "HKEY_LOCAL_MACHINE\\SOFTWARE\\Vendor\\App\\WordPath",
+        "HKEY_LOCAL_MACHINE\\SOFTWARE\\Vendor\\Word",
+        ]
+    assert found(index.search("word", kind = FKEY)) == ["HKEY_LOCAL_MACHINE\\SOFTWARE\\Vendor\\Word"]
+    values = list(index.search("word", kind = EKEY))
+    assert [value.value for value in values] == ["C:\\word"]
+    # LIKE wildcards are searched as text
+    assert list(index.search("%")) == []
+
+
+@pytest.mark.parametrize("spelling", ["SOFTWARE", "Software", "software\\vendor"])
+def test_search_under_any_case(index, spelling):
+    index.refresh(software())
+    under = FKEY(Address("HKEY_LOCAL_MACHINE", *spelling.split("\\")))
+    assert len(list(index.search("word", under = under))) == 2
+    assert list(index.search("word", under = FKEY(Address("HKEY_LOCAL_MACHINE", "SOFTWARE", "Other")))) == []
+
+
+def test_drop_any_case(index):
+    index.refresh(software())
+    assert index._drop("hkey_local_machine\\software\\VENDOR") == 3
+    assert found(index.search("")) == ["HKEY_LOCAL_MACHINE\\SOFTWARE",
+                                       "HKEY_LOCAL_MACHINE\\SOFTWARE\\Other",
+                                       "HKEY_LOCAL_MACHINE\\SOFTWARE\\Other\\x"]
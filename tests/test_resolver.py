@@ -0,0 +1,76 @@
+# XWALL 2025
+
+import backend as bk
+from xwall import ABC, Address, FKEY, Resolver
+
+
+def test_lru_and_invalidate():
+    resolver = Resolver(size = 2)
+    a, b, c = (Address("HKEY_CURRENT_USER", "S", name) for name in "abc")
+    resolver.put("exists", a, True)
+    resolver.put("exists", b, False)
+    assert resolver.get("exists", a) is True
+    resolver.put("exists", c, True)
+    # b was the least recently used
+    assert resolver.get("exists", b) is None
+    assert (resolver.hits, resolver.misses) == (1, 1)
+
+    resolver.invalidate(Address("HKEY_CURRENT_USER", "s"))
+    assert resolver.get("exists", a) is None and resolver.get("exists", c) is None
+
+
+def test_views_per_subtree():
+    resolver = Resolver(depth = 2)
+    deep = Address("HKEY_LOCAL_MACHINE", "SOFTWARE", "Vendor", "App", "Sub")
+    assert resolver.order(deep) == Resolver.ACCESS
+    resolver.learn(Address("HKEY_LOCAL_MACHINE", "SOFTWARE", "Vendor", "Other"), Resolver.ACCESS[1])
+    assert resolver.order(deep)[0] == Resolver.ACCESS[1]
+    assert sorted(resolver.order(deep)) == sorted(Resolver.ACCESS)
+    assert resolver.order(Address("HKEY_LOCAL_MACHINE", "SOFTWARE", "Else")) == Resolver.ACCESS
+
+
+def test_bind_forgets_another_backend():
+    resolver = Resolver()
+    resolver.bind("first").put("exists", Address("HKEY_CURRENT_USER"), True)
+    assert resolver.bind("first").get("exists", Address("HKEY_CURRENT_USER")) is True
+    assert resolver.bind("second").get("exists", Address("HKEY_CURRENT_USER")) is None
+
+
+def test_exists_is_cached(memory):
+    memory.set_value("HKEY_CURRENT_USER\\S\\A", "x", "1")
+    opened = []
+    open_key = memory.open_key
+    memory.open_key = lambda *args: opened.append(args[1]) or open_key(*args)
+    key, missing = FKEY(Address("HKEY_CURRENT_USER", "S", "A")), FKEY(Address("HKEY_CURRENT_USER", "S", "B"))
+    assert key.exists and key.exists
+    assert not missing.exists and not missing.exists
+    assert opened.count("S\\A") == 1
+    # the negative result is kept until the registry changes through the key classes
+    memory.add_key("HKEY_CURRENT_USER\\S\\B")
+    assert not missing.exists
+    ABC.resolver.clear()
+    assert missing.exists
+    FKEY(Address("HKEY_CURRENT_USER", "S")).delete(preview = False)
+    assert not key.exists
+
+
+def test_info_learns_the_view(memory):
+    memory.set_value("HKEY_LOCAL_MACHINE\\SOFTWARE\\Vendor\\App", "x", "1")
+    memory.add_key("HKEY_LOCAL_MACHINE\\SOFTWARE\\Vendor\\Other")
+    wow32 = bk.KEY_READ | bk.KEY_WOW64_32KEY
+    opened = []
+    open_key = memory.open_key
+
+    def only_32(root, sub_path = None, access = bk.KEY_READ):
+        opened.append(access)
+        # the vendor key is only in the 32-bit view
+        if sub_path and sub_path.startswith("SOFTWARE\\Vendor") and access != wow32:
+            raise FileNotFoundError(2, "The system cannot find the file specified", sub_path)
+        return open_key(root, sub_path, access)
+
+    memory.open_key = only_32
+    assert FKEY(Address("HKEY_LOCAL_MACHINE", "SOFTWARE", "Vendor", "App")).info[1] == 1
+    assert opened == [Resolver.ACCESS[0], wow32]
+    opened.clear()
+    assert FKEY(Address("HKEY_LOCAL_MACHINE", "SOFTWARE", "Vendor", "Other")).info[:2] == (0, 0)
+    assert opened == [wow32]
@@ -0,0 +1,81 @@
+# XWALL 2025
+
+import pytest
+
+from xwall import RuleCache, Rule
+
+
+class Clock:
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    return Clock()
+
+
+def cache_of(clock, probe, **options):
+    listed = []
+
+    def source():
+        listed.append(clock.now)
+        return [Rule(f"rule-{len(listed)}", [("direction", "Out"), ("action", "Block"),
+                                             ("program", "C:\\a.exe")])]
+    return RuleCache(source = source, probe = probe, clock = clock, **options), listed
+
+
+def test_ttl_and_probe(clock):
+    stamps = iter([1, 1, 2])
+    cache, listed = cache_of(clock, lambda: next(stamps), ttl = 10)
+    first = cache.rules()
+    clock.now = 5
+    assert cache.rules() is first and cache.probes == 1
+    # past the ttl an unchanged stamp keeps the snapshot
+    clock.now = 20
+    assert cache.rules() is first and cache.probes == 2
+    clock.now = 40
+    assert cache.rules() is not first
+    assert listed == [0, 40]
+
+
+def test_unknown_stamp_lists_again(clock):
+    cache, listed = cache_of(clock, lambda: None, ttl = 1)
+    cache.rules()
+    clock.now = 2
+    cache.rules()
+    assert len(listed) == 2
+
+
+def test_max_age(clock):
+    cache, listed = cache_of(clock, lambda: "same", ttl = 10, max_age = 100)
+    for clock.now in range(0, 200, 15):
+        cache.rules()
+    assert listed == [0, 105]
+
+
+def test_invalidate_and_index(clock):
+    cache, listed = cache_of(clock, lambda: "same")
+    index = cache.index
+    assert index is cache.index and index.covers("C:\\a.exe", "out")
+    cache.invalidate()
+    assert cache.index is not index
+    assert len(listed) == 2
+
+
+def test_registry_probe(memory):
+    local, policy = RuleCache.RULES_KEYS
+    memory.set_value(f"HKEY_LOCAL_MACHINE\\{local}", "rule-1", "v2.30|Action=Block|")
+    stamp = RuleCache.registry_probe()
+    assert stamp is not None and stamp[1] is None
+    # a rule pushed by group policy changes the stamp
+    memory.set_value(f"HKEY_LOCAL_MACHINE\\{policy}", "rule-2", "v2.30|Action=Block|")
+    pushed = RuleCache.registry_probe()
+    assert pushed != stamp
+    memory.set_value(f"HKEY_LOCAL_MACHINE\\{policy}", "rule-3", "v2.30|Action=Block|")
+    assert RuleCache.registry_probe() != pushed
+    assert RuleCache.registry_probe() == RuleCache.registry_probe()
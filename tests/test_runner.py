@@ -0,0 +1,112 @@
+# XWALL 2025
+
+import subprocess
+import sys
+import threading
+import time as tm
+
+import pytest
+
+import runner as rn
+from xwall import Firewall, Netsh
+
+
+@pytest.fixture
+def fake():
+    return rn.FakeExecutor({
+        "netsh -f ok.txt": (0, "Ok.\n", 0.0),
+        "netsh -f bad.txt": (1, "", 0.0, "Error.\n"),
+        "slow": (0, "one\ntwo\nthree\n", 3.0),
+        "lines": lambda cmd: (0, "".join(f"{i}\n" for i in range(int(cmd[1]))), 0.1),
+        })
+
+
+def test_call(fake):
+    runner = rn.Runner(executor = fake)
+    result = runner.call(["netsh", "-f", "ok.txt"])
+    assert result and result.stdout == "Ok.\n" and result.check() is result
+    failed = runner.call(["netsh", "-f", "bad.txt"])
+    assert not failed and failed.stderr == "Error.\n"
+    with pytest.raises(subprocess.CalledProcessError):
+        failed.check()
+    assert fake.calls == [["netsh", "-f", "ok.txt"], ["netsh", "-f", "bad.txt"]]
+
+
+def test_timeout(fake):
+    runner = rn.Runner(executor = fake, timeout = 1.5)
+    result = runner.call(["slow"], on_line = lambda line: None)
+    assert result.timed_out and not result
+    assert 1.4 < result.duration < 2.5
+    assert result.stdout == "one\n"
+    with pytest.raises(subprocess.TimeoutExpired):
+        result.check()
+
+
+def test_limit_across_threads():
+    running, most = [], []
+    lock = threading.Lock()
+
+    def answer(cmd):
+        with lock:
+            running.append(cmd)
+            most.append(len(running))
+        threading.Timer(0.1, lambda: running.remove(cmd)).start()
+        return 0, "", 0.1
+
+    runner = rn.Runner(limit = 2, executor = rn.FakeExecutor({"x": answer}))
+    threads = [threading.Thread(target = runner.call_all, args = ([["x", str(i)] for i in range(3)],))
+               for _ in range(2)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(most) == 6 and max(most) <= 2
+
+
+def test_call_all_in_order(fake):
+    lines = []
+    results = rn.Runner(executor = fake).call_all([["lines", "3"], ["lines", "1"]], on_line = lines.append)
+    assert [result.stdout for result in results] == ["0\n1\n2\n", "0\n"]
+    assert sorted(lines) == ["0\n", "0\n", "1\n", "2\n"]
+
+
+def test_stream_as_lines_arrive(fake):
+    runner = rn.Runner(executor = fake)
+    start = tm.perf_counter()
+    lines = runner.stream(["slow"])
+    assert next(lines) == "one\n"
+    # the first line comes long before the command ends
+    assert tm.perf_counter() - start < 2.5
+    lines.close()
+    # stopping the iteration kills the command: nothing left running
+    assert list(rn.Runner(executor = fake).stream(["lines", "2"])) == ["0\n", "1\n"]
+
+
+def test_stream_errors(fake):
+    runner = rn.Runner(executor = fake)
+    with pytest.raises(subprocess.CalledProcessError):
+        list(runner.stream(["netsh", "-f", "bad.txt"]))
+    with pytest.raises(subprocess.TimeoutExpired):
+        list(runner.stream(["slow"], timeout = 0.5))
+
+
+def test_real_process():
+    cmd = [sys.executable, "-c", "import time; print('started', flush = True); time.sleep(30)"]
+    lines = []
+    start = tm.perf_counter()
+    with pytest.raises(subprocess.TimeoutExpired):
+        for line in rn.Runner().stream(cmd, timeout = 0.5):
+            lines.append(line)
+    assert lines == ["started\n"] and tm.perf_counter() - start < 5
+
+
+def test_netsh_rules_through_the_runner(listing, monkeypatch):
+    text = listing(("xwall-a", "Out", "Block", "C:\\a.exe"), ("other", "In", "Allow", "C:\\b.exe"))
+    fake = rn.FakeExecutor({"netsh": (0, text, 0.0)})
+    monkeypatch.setattr(rn.default, "executor", fake)
+    assert [rule.name for rule in Firewall.rules()] == ["xwall-a", "other"]
+    assert fake.calls[0][:3] == ["netsh", "advfirewall", "firewall"]
+
+    monkeypatch.setattr(rn.default, "executor", rn.FakeExecutor({"netsh": (0, text, 5.0)}))
+    with pytest.raises(subprocess.TimeoutExpired):
+        list(Netsh.stream(["netsh"], timeout = 0.2))
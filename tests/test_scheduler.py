@@ -0,0 +1,125 @@
+# XWALL 2025
+
+import threading
+
+import pytest
+
+from recorder import Scheduler
+
+
+class Clock:
+    """Fake monotonic clock: moves only when captures take time or the scheduler waits."""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class Waits(threading.Event):
+    """Event whose waits move the fake clock instead of sleeping."""
+
+    def __init__(self, clock: Clock):
+        super().__init__()
+        self.clock = clock
+
+    def wait(self, timeout = None):
+        self.clock.now += timeout
+        return self.is_set()
+
+
+def scheduler(capture_seconds: float = 0.0, sink = None, **kwargs):
+    clock = Clock()
+    count = iter(range(1000))
+
+    def capture():
+        clock.now += capture_seconds
+        return next(count)
+
+    frames = []
+    s = Scheduler(capture, sink if sink else lambda frame, t: frames.append(frame),
+                  clock = clock, **kwargs)
+    s.stopping = Waits(clock)
+    return s, frames, clock
+
+
+def test_cadence():
+    s, frames, clock = scheduler(interval = 1.0)
+    metrics = s.run(seconds = 5)
+    assert frames == [0, 1, 2, 3, 4, 5]
+    assert metrics["ticks"] == metrics["captured"] == metrics["processed"] == 6
+    assert metrics["missed"] == metrics["dropped"] == 0
+    assert metrics["jitter_max"] == 0.0 and clock.now == 5.0
+
+
+def test_no_drift():
+    # a capture taking 0.3 s does not push the next ticks
+    s, frames, clock = scheduler(0.3, interval = 1.0)
+    metrics = s.run(seconds = 4)
+    assert metrics["ticks"] == 5 and metrics["missed"] == 0
+    assert clock.now == pytest.approx(4.3)
+
+
+def test_missed():
+    # a capture taking 2.5 s skips the ticks already past
+    s, frames, clock = scheduler(2.5, interval = 1.0)
+    metrics = s.run(seconds = 8)
+    assert metrics["ticks"] == 3 and metrics["missed"] == 6
+    assert frames == [0, 1, 2]
+
+
+def test_until():
+    s, frames, clock = scheduler(interval = 0.5)
+    s.run(until = lambda: s.metrics["captured"] == 3)
+    assert frames == [0, 1, 2] and clock.now == 1.0
+
+
+def blocked(policy: str):
+    busy, gate, seen = threading.Event(), threading.Event(), []
+
+    def sink(frame, t):
+        busy.set()
+        gate.wait(5)
+        seen.append(frame)
+
+    s, _, _ = scheduler(sink = sink, interval = 1.0, size = 2, policy = policy)
+    s.start()
+    return s, busy, gate, seen
+
+
+@pytest.mark.parametrize("policy, kept", [("drop-oldest", [3, 4]), ("drop-newest", [1, 2])])
+def test_policies(policy, kept):
+    s, busy, gate, seen = blocked(policy)
+    # the worker holds frame 0, the queue takes two of the four others
+    s._offer((0, 0.0))
+    assert busy.wait(5)
+    for frame in range(1, 5):
+        s._offer((frame, 0.0))
+    gate.set()
+    s.stop()
+    assert seen == [0] + kept and s.metrics["dropped"] == 2
+
+
+def test_block():
+    s, busy, gate, seen = blocked("block")
+    threading.Timer(0.2, gate.set).start()
+    s.run(seconds = 5)
+    s.stop()
+    assert seen == [0, 1, 2, 3, 4, 5] and s.metrics["dropped"] == 0
+
+
+def test_sink_errors(capsys):
+    def sink(frame, t):
+        if frame % 2:
+            raise RuntimeError(f"bad frame {frame}")
+
+    s, _, _ = scheduler(sink = sink, interval = 1.0)
+    metrics = s.run(seconds = 3)
+    assert metrics["errors"] == 2 and metrics["processed"] == 2
+    assert "bad frame 1" in capsys.readouterr().out
+
+
+def test_policy_checked():
+    with pytest.raises(ValueError):
+        Scheduler(lambda: None, lambda frame, t: None, policy = "drop-all")
@@ -0,0 +1,54 @@
+# XWALL 2025
+
+import shutil
+
+import pytest
+
+import runner as rn
+
+pytestmark = pytest.mark.skipif(shutil.which("bash") is None, reason = "bash is needed")
+
+
+@pytest.fixture
+def shell():
+    with rn.Shell(["bash"], dialect = "bash", encoding = "utf-8") as shell:
+        yield shell
+
+
+def test_output_and_status(shell):
+    lines = []
+    result = shell.run("echo one; echo two", timeout = 5, on_line = lines.append)
+    assert result and result.stdout == "one\ntwo\n" and lines == ["one\n", "two\n"]
+    result = shell.run("false", timeout = 5)
+    assert result.returncode == 1 and result.stdout == ""
+    assert shell.run("(exit 3)", timeout = 5).returncode == 3
+    assert shell.starts == 1
+
+
+def test_output_without_newline(shell):
+    lines = []
+    result = shell.run("echo -n partial", timeout = 5, on_line = lines.append)
+    assert result and result.stdout == "partial" and lines == ["partial"]
+    # the blank lines of the command are its own
+    assert shell.run("echo; echo x; echo", timeout = 5).stdout == "\nx\n\n"
+    assert shell.run("printf 'a\\nb'", timeout = 5).stdout == "a\nb"
+
+
+def test_state_is_kept(shell):
+    shell.run("XWALL_TEST=kept", timeout = 5)
+    assert shell.run("echo $XWALL_TEST", timeout = 5).stdout == "kept\n"
+
+
+def test_timeout_restarts(shell):
+    result = shell.run("echo before; sleep 30", timeout = 0.5)
+    assert result.timed_out and not result and result.stdout == "before\n"
+    assert not shell.alive
+    assert shell.run("echo after", timeout = 5).stdout == "after\n"
+    assert shell.starts == 2
+
+
+def test_exit_restarts(shell):
+    result = shell.run("exit 4", timeout = 5)
+    assert result.returncode == 4
+    assert shell.run("echo again", timeout = 5).stdout == "again\n"
+    assert shell.starts == 2
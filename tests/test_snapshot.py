@@ -0,0 +1,63 @@
+# XWALL 2025
+
+import pytest
+
+import backend as bk
+from xwall import Address, EKEY, FKEY, Snapshot
+
+
+@pytest.fixture
+def vendor(memory):
+    memory.set_value("HKEY_LOCAL_MACHINE\\SOFTWARE\\Vendor\\App", "Path", "C:\\app")
+    memory.set_value("HKEY_LOCAL_MACHINE\\SOFTWARE\\Vendor\\App", "Data", b"\x01\x02", bk.REG_BINARY)
+    memory.set_value("HKEY_LOCAL_MACHINE\\SOFTWARE\\Vendor\\Old\\Sub", "x", 1, bk.REG_DWORD)
+    memory.set_value("HKEY_LOCAL_MACHINE\\SOFTWARE\\Vendor\\Same", "y", "2")
+    return FKEY(Address("HKEY_LOCAL_MACHINE", "SOFTWARE", "Vendor"))
+
+
+def changes(diff):
+    return {kind: sorted((change.path.rpartition("Vendor\\")[2], change.kind, change.old, change.new)
+                         for change in getattr(diff, kind))
+            for kind in ("added", "removed", "modified")}
+
+
+def test_same_tree(vendor):
+    before = vendor.snapshot()
+    assert before.root.digest == vendor.snapshot().root.digest
+    assert not before.diff(vendor.snapshot())
+
+
+def test_diff(vendor, memory):
+    before = vendor.snapshot()
+    memory.set_value("HKEY_LOCAL_MACHINE\\SOFTWARE\\Vendor\\App", "Path", "D:\\app")
+    memory.delete_value(memory.open_key("HKEY_LOCAL_MACHINE", "SOFTWARE\\Vendor\\App"), "Data")
+    memory.set_value("HKEY_LOCAL_MACHINE\\SOFTWARE\\Vendor\\App", "New", 3, bk.REG_DWORD)
+    memory.set_value("HKEY_LOCAL_MACHINE\\SOFTWARE\\Vendor\\Added\\Deep", "z", "1")
+    FKEY(Address("HKEY_LOCAL_MACHINE", "SOFTWARE", "Vendor", "Old")).delete(preview = False)
+
+    diff = before.diff(vendor.snapshot())
+    assert changes(diff) == {
+        "added": [("Added", FKEY, None, None), ("App\\New", EKEY, None, (3, bk.REG_DWORD))],
+        "removed": [("App\\Data", EKEY, (b"\x01\x02", bk.REG_BINARY), None), ("Old", FKEY, None, None)],
+        "modified": [("App\\Path", EKEY, ("C:\\app", bk.REG_SZ), ("D:\\app", bk.REG_SZ))],
+        }
+
+
+def test_unchanged_subtrees_are_skipped(vendor, memory):
+    before = vendor.snapshot()
+    memory.set_value("HKEY_LOCAL_MACHINE\\SOFTWARE\\Vendor\\App", "Path", "D:\\app")
+    after = vendor.snapshot()
+    same = before.root.keys["same"], after.root.keys["same"]
+    assert same[0].digest == same[1].digest
+    assert before.root.keys["app"].digest != after.root.keys["app"].digest
+    assert before.root.digest != after.root.digest
+
+
+def test_save_and_load(vendor, memory, tmp_path):
+    before = vendor.snapshot()
+    before.save(str(tmp_path / "vendor.json.gz"))
+    loaded = Snapshot.load(str(tmp_path / "vendor.json.gz"))
+    assert (loaded.path, loaded.taken, loaded.root.digest) == (before.path, before.taken, before.root.digest)
+    memory.set_value("HKEY_LOCAL_MACHINE\\SOFTWARE\\Vendor\\Same", "y", "3")
+    assert changes(loaded.diff(vendor.snapshot()))["modified"] == [
+        ("Same\\y", EKEY, ("2", bk.REG_SZ), ("3", bk.REG_SZ))]
@@ -0,0 +1,123 @@
+# XWALL 2025
+
+import pytest
+
+import backend as bk
+from xwall import Address, FKEY, HKEY
+
+
+@pytest.fixture
+def tree(memory):
+    """HKEY_CURRENT_USER\\S with 3 subkeys per key on 3 levels, a value in each subkey."""
+    def grow(path: str, depth: int):
+        for i in range(3):
+            memory.set_value(f"{path}\\k{i}", f"v{i}", i, bk.REG_DWORD)
+            if depth > 1:
+                grow(f"{path}\\k{i}", depth - 1)
+    grow("HKEY_CURRENT_USER\\S", 3)
+    return FKEY(Address("HKEY_CURRENT_USER", "S"))
+
+
+def paths(keys):
+    return [key.address.str for key in keys]
+
+
+def test_depth_first_order(memory):
+    memory.set_value("HKEY_CURRENT_USER\\S\\a\\b", "x", "1")
+    memory.set_value("HKEY_CURRENT_USER\\S\\a", "y", "2")
+    memory.set_value("HKEY_CURRENT_USER\\S\\c", "z", "3")
+    key = FKEY(Address("HKEY_CURRENT_USER", "S"))
+    # each subkey followed by its subtree, then the values of the key
+    assert paths(key.walk()) == [
+        "HKEY_CURRENT_USER\\S\\a",
+        "HKEY_CURRENT_USER\\S\\a\\b",
+        "HKEY_CURRENT_USER\\S\\a\\b\\x",
+        "HKEY_CURRENT_USER\\S\\a\\y",
+        "HKEY_CURRENT_USER\\S\\c",
+        "HKEY_CURRENT_USER\\S\\c\\z",
+        ]
+    assert paths(key.walk(order = "breadth")) == [
+        "HKEY_CURRENT_USER\\S\\a",
+        "HKEY_CURRENT_USER\\S\\c",
+        "HKEY_CURRENT_USER\\S\\a\\b",
+        "HKEY_CURRENT_USER\\S\\a\\y",
+        "HKEY_CURRENT_USER\\S\\c\\z",
+        "HKEY_CURRENT_USER\\S\\a\\b\\x",
+        ]
+
+
+def test_depth_limit(tree):
+    # 3 subkeys, then their 3 values and 9 subkeys
+    assert len(list(tree.walk(depth = 1))) == 3
+    assert len(list(tree.walk(depth = 2))) == 3 + 12
+    assert len(list(tree.walk(order = "breadth", depth = 2))) == 3 + 12
+
+
+def test_each_key_opened_once(tree, memory):
+    opened = []
+    open_key = memory.open_key
+    memory.open_key = lambda *args: opened.append(args[1]) or open_key(*args)
+    found = list(tree.walk())
+    # the walked key and its 3 + 9 subkeys with children
+    assert len(opened) == 1 + 3 + 9 + 27
+    assert len(found) == 2 * (3 + 9 + 27)
+
+
+@pytest.mark.parametrize("order", ["depth", "breadth"])
+def test_parallel_walk(tree, order):
+    plain = paths(tree.walk(order = order))
+    assert paths(tree.walk(order = order, workers = 4)) == plain
+    assert paths(tree.walk(order = order, workers = 4, queue = 1)) == plain
+    assert sorted(paths(tree.walk(workers = 4, ordered = False))) == sorted(plain)
+
+
+def test_parallel_listings(tree):
+    plain = [(address.str, *rest) for address, *rest in tree.listings()]
+    assert [(address.str, *rest) for address, *rest in tree.listings(workers = 4)] == plain
+    assert plain[0][0] == "HKEY_CURRENT_USER\\S"
+    assert plain[0][1] == ["k0", "k1", "k2"]
+
+
+
+
+def test_parallel_walk_stops_early(tree, memory):
+    opened = []
+    open_key = memory.open_key
+    memory.open_key = lambda *args: opened.append(args[1]) or open_key(*args)
+    walk = tree.walk(workers = 2, queue = 2)
+    assert next(walk).address.str == "HKEY_CURRENT_USER\\S\\k0"
+    walk.close()
+    # the listings queued ahead are dropped, not run to the end of the tree
+    assert len(opened) < 1 + 3 + 9 + 27
+
+
+def test_parallel_search(memory):
+    for i in range(20):
+        memory.set_value(f"HKEY_CURRENT_USER\\S\\k{i}", "match" if i % 4 == 0 else "other", i, bk.REG_DWORD)
+    found = HKEY.HKEY_CURRENT_USER().search(lambda key: key.name == "match", workers = 4)
+    assert sorted(key.value for key in found) == [0, 4, 8, 12, 16]
+
+
+def test_prune_and_errors(tree, memory):
+    pruned = paths(tree.walk(prune = lambda record: record.name == "k1"))
+    assert "HKEY_CURRENT_USER\\S\\k1" in pruned
+    assert not any(path.startswith("HKEY_CURRENT_USER\\S\\k1\\") for path in pruned)
+
+    errors = []
+    open_key = memory.open_key
+
+    def failing(root, sub_path = None, access = bk.KEY_READ):
+        if sub_path and sub_path.endswith("k2"):
+            raise PermissionError(5, "Access is denied", sub_path)
+        return open_key(root, sub_path, access)
+
+    memory.open_key = failing
+    found = paths(tree.walk(onerror = errors.append))
+    assert errors
+    assert not any("\\k2\\" in path for path in found)
+
+
+def test_walk_stops_early(tree):
+    walk = HKEY.HKEY_CURRENT_USER().walk()
+    assert next(walk).address.str == "HKEY_CURRENT_USER\\S"
+    walk.close()
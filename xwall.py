@@ -2,123 +2,577 @@
 
 import subprocess
 import sys, os
+import ntpath
 import pathlib as pt
 import time as tm
+import re
+import fnmatch
+import hashlib
+import gzip
+import json
+import threading
+import tempfile
 
 from pathlib import Path
+from collections import deque, namedtuple, OrderedDict
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 
 from rich.progress import Progress
 from rich.progress import track
 from enum import Enum
-import winreg
 from dataclasses import dataclass, field as Field
 
+import backend as bk
+import runner as rn
+
+
+
+class Rule:
+    """
+    One firewall rule of `netsh advfirewall firewall show rule verbose`.
+
+    The fields used to pick rules have their own slot, typed; the others
+    stay in `other` as (key, value) pairs with the keys of rules_to_dict.
+
+    netsh prints keys and values in the language of Windows: English and
+    Italian are mapped to the English values ("Azione: Blocca" is action
+    "block"). In other languages the fields stay in `other`, and the rule
+    matches no program.
+    """
+
+    __slots__ = ("name", "enabled", "direction", "action", "program", "profiles",
+                 "protocol", "local_ip", "remote_ip", "local_port", "remote_port", "other")
+
+    FIELDS = {
+        "enabled": "enabled", "direction": "direction", "action": "action",
+        "program": "program", "profiles": "profiles", "protocol": "protocol",
+        "localip": "local_ip", "remoteip": "remote_ip",
+        "localport": "local_port", "remoteport": "remote_port",
+        # italiano
+        "abilitata": "enabled", "direzione": "direction", "azione": "action",
+        "programma": "program", "profili": "profiles", "protocollo": "protocol",
+        "ip_locale": "local_ip", "ip_remoto": "remote_ip",
+        "porta_locale": "local_port", "porta_remota": "remote_port",
+        }
+    # localized values of direction and action
+    VALUES = {
+        "in ingresso": "in", "ingresso": "in", "in uscita": "out", "uscita": "out",
+        "consenti": "allow", "blocca": "block", "ignora": "bypass",
+        }
+    YES = ("yes", "sì", "si")
+    ANY = ("any", "qualsiasi")
+
+    def __init__(self, name: str, pairs: list = ()):
+        self.name = name
+        self.enabled = True
+        self.direction = self.action = self.program = None
+        self.profiles = self.protocol = self.local_ip = self.remote_ip = None
+        self.local_port = self.remote_port = None
+        other = []
+        for key, value in pairs:
+            slot = self.FIELDS.get(key)
+            if slot is None:
+                other.append((key, value))
+            elif slot == "enabled":
+                self.enabled = value.lower() in self.YES
+            elif slot in ("direction", "action"):
+                value = value.lower()
+                setattr(self, slot, self.VALUES.get(value, value))
+            else:
+                setattr(self, slot, value)
+        self.other = tuple(other)
+
+    def __repr__(self):
+        return f"Rule({self.name!r}, {self.direction}, {self.action}, {self.program!r})"
+
+    @property
+    def unrestricted(self):
+        """True if the rule applies to every profile, protocol, address and port."""
+        # all the profiles are listed one by one, whatever the language
+        if self.profiles and self.profiles.lower() not in self.ANY and len(self.profiles.split(",")) < 3:
+            return False
+        return all(not value or value.lower() in self.ANY for value in
+                   (self.protocol, self.local_ip, self.remote_ip, self.local_port, self.remote_port))
 
 
 class Netsh:
 
     NETSH_ADDRULE_CMD = ["netsh", "advfirewall", "firewall", "add", "rule"]
-    NETSH_LISTRULE_CMD = ["netsh", "advfirewall", "firewall", "show rule", "name=all"]
+    NETSH_LISTRULE_CMD = ["netsh", "advfirewall", "firewall", "show", "rule", "name=all"]
+    TIMEOUT = 60    # seconds for a single netsh command
+    # netsh writes to a pipe in the OEM code page (cp850 on Italian Windows),
+    # not in the ANSI one Python reads pipes with: "Sì" would not decode
+    ENCODING = "oem" if sys.platform == "win32" else None
 
     @staticmethod
-    def rules_to_dict(text_rules: str):
-        # Analizza l'output di netsh
-        rules = []
-        current_rule = {}
-        for line in text_rules:
-            if ":" in line:
+    def blocks(lines):
+        """
+        Yield the (name, [(key, value), ...]) of each rule in netsh output,
+        as soon as the separator after the next rule name arrives.
+
+        The "----" line comes after the name of a rule, not before it: the
+        line read just before it is the name of the next rule whatever the
+        language of the output.
+        """
+        name, pairs = None, []
+        for line in lines:
+            line = line.strip()
+            if line.startswith("----"):
+                head = pairs.pop() if pairs else (None, None)
+                if name is not None:
+                    yield name, pairs
+                name, pairs = head[1], []
+            elif ":" in line:
                 key, value = line.split(":", 1)
-                # init data
-                key = key.strip().lower().replace(" ", "_")  # Pulisce la chiave per il dizionario
-                value = value.strip()
-                # add rule feature to the rule dict
-                current_rule[key] = value
-            elif "----" in line:  #fine della regola
-                if current_rule:
-                  rules.append(current_rule)
-                current_rule = {} #resetta il dizionario
-
-        if current_rule: #aggiunge l'ultima regola
-            rules.append(current_rule)
+                pairs.append((key.strip().lower().replace(" ", "_"), value.strip()))
+        if name is not None:
+            yield name, pairs
+
+    @classmethod
+    def parse(cls, lines):
+        """Yield a Rule for each rule of netsh output, lines read lazily."""
+        for name, pairs in cls.blocks(lines):
+            yield Rule(name, pairs)
+
+    @classmethod
+    def stream(cls, cmd: list, timeout: float = None):
+        """
+        Yield the lines printed by cmd while it runs, through the shared
+        runner: killed after timeout seconds (Netsh.TIMEOUT by default),
+        subprocess.TimeoutExpired is raised then.
+        """
+        timeout = cls.TIMEOUT if timeout is None else timeout
+        yield from rn.default.stream(cmd, timeout = timeout, encoding = cls.ENCODING)
+
+    @classmethod
+    def rules_to_dict(cls, text_rules: list):
+        # Analizza l'output di netsh
+        return [{"rule_name": name, **dict(pairs)} for name, pairs in cls.blocks(text_rules)]
+
+
+class RuleIndex:
+    """
+    Firewall rules indexed by (program, direction, action) and by name
+    prefix, the part before the first "-" (e.g. "APW").
+
+    index = RuleIndex(Firewall.rules())
+    index.covers("C:\\Tools\\app.exe", "out")
+    """
+
+    def __init__(self, rules = ()):
+        self.programs = {}
+        self.prefixes = {}
+        self.size = 0
+        for rule in rules:
+            self.add(rule)
+
+    def __len__(self):
+        return self.size
+
+    @staticmethod
+    def program(path) -> str:
+        """Return the key of a program path, as Windows compares them."""
+        return ntpath.normcase(ntpath.normpath(ntpath.expandvars(str(path))))
+
+    def add(self, rule: Rule):
+        self.size += 1
+        if rule.program:
+            key = self.program(rule.program), rule.direction, rule.action
+            self.programs.setdefault(key, []).append(rule)
+        self.prefixes.setdefault(rule.name.split("-", 1)[0], []).append(rule)
+
+    def lookup(self, program, direction: str, action: str = "block"):
+        """Return the rules of program for direction and action."""
+        return self.programs.get((self.program(program), direction, action), [])
+
+    def covers(self, program, direction: str, action: str = "block"):
+        """
+        True if an enabled rule already applies action to all the traffic of
+        program: a rule limited to a profile, a protocol, addresses or ports
+        does not count.
+        """
+        return any(rule.enabled and rule.unrestricted
+                   for rule in self.lookup(program, direction, action))
+
+    def named(self, prefix: str):
+        """Return the rules whose name starts with prefix."""
+        head, dash, _ = prefix.partition("-")
+        rules = self.prefixes.get(head, [])
+        if dash:
+            rules = [rule for rule in rules if rule.name.startswith(prefix)]
         return rules
 
 
-class Firewall:
+class Batch:
+    """
+    Firewall rules collected and added by a single `netsh -f script` run,
+    instead of one netsh process per rule.
+
+    netsh prints "Ok." for each command of the script that succeeds: when
+    every command did, each rule is reported as added; otherwise the rules
+    are read again once and each one is looked up by name.
+
+    runner(cmd) -> (returncode, output) runs netsh; pass another one to
+    run the batch against a stand-in.
+    """
+
+    Outcome = namedtuple("Outcome", ["name", "program", "direction", "ok"])
+    TIMEOUT = 600   # seconds for a whole script
+
+    def __init__(self, runner = None):
+        self.runner = runner if runner else self.run
+        self.rules = []
+
+    def __len__(self):
+        return len(self.rules)
+
+    @staticmethod
+    def run(cmd: list):
+        result = rn.default.call(cmd, timeout = Batch.TIMEOUT, encoding = Netsh.ENCODING)
+        return result.returncode, result.output
+
+    @staticmethod
+    def argv(pairs: list) -> list:
+        """Return the arguments of a rule for subprocess, which quotes them."""
+        return [f"{key}={value}" for key, value in pairs]
 
     @staticmethod
-    def block_traffic(path: str, ingoing: bool = True, outgoing: bool = True):
+    def _quote(key: str, value) -> str:
+        value = str(value)
+        return f'{key}="{value}"' if " " in value else f"{key}={value}"
+
+    def add_rule(self, name: str, program, direction: str, action: str = "block",
+                 description: str = None, enable: str = "yes", profile: str = "any"):
+        pairs = [("dir", direction), ("action", action), ("name", name), ("program", program),
+                 ("enable", enable), ("profile", profile)]
+        if description:
+            pairs.append(("description", description))
+        self.rules.append((Rule(name, [("direction", direction), ("action", action),
+                                       ("program", str(program))]), pairs))
+
+    def script(self) -> str:
+        # the script runs in the netsh root context: each line is a whole command
+        return "".join(" ".join(Netsh.NETSH_ADDRULE_CMD[1:] +
+                                [self._quote(key, value) for key, value in pairs]) + "\n"
+                       for _, pairs in self.rules)
+
+    def apply(self):
+        """Run the script, return an Outcome per rule in the order added."""
+        if not self.rules:
+            return []
+        handle, script = tempfile.mkstemp(suffix = ".txt", prefix = "xwall-")
+        try:
+            with os.fdopen(handle, "w") as f:
+                f.write(self.script())
+            _, output = self.runner(["netsh", "-f", script])
+        finally:
+            os.remove(script)
+
+        oks = sum(1 for line in output.splitlines() if line.strip().lower() == "ok.")
+        if oks == len(self.rules):
+            added = None
+        else:
+            _, listing = self.runner(Netsh.NETSH_LISTRULE_CMD + ["verbose"])
+            added = RuleIndex(Netsh.parse(listing.splitlines()))
+
+        outcomes = []
+        for rule, _ in self.rules:
+            ok = added is None or any(found.name == rule.name for found in
+                                      added.lookup(rule.program, rule.direction, rule.action))
+            outcomes.append(self.Outcome(rule.name, rule.program, rule.direction, ok))
+        return outcomes
+
+
+class Discovery:
+    """
+    Files under a folder whose name matches the include globs and whose
+    name or relative path matches none of the exclude globs (excluded
+    folders are not entered), listed with os.scandir.
+
+    With a state file, changed() yields only the files new or changed,
+    by size or modification time, since the last save().
+
+    found = Discovery("C:/Program Files", exclude = ["WindowsApps"], state = "pf.json")
+    for path in found.changed():
+        ...
+    found.save()
+    """
+
+    def __init__(self, root, include: list = ("*.exe",), exclude: list = (),
+                 recursive: bool = True, state: str = None, workers: int = None,
+                 onerror: object = None):
+        self.root = os.path.abspath(root)
+        self.include = [pattern.lower() for pattern in include]
+        self.exclude = [pattern.lower() for pattern in exclude]
+        self.recursive = recursive
+        self.state = state
+        self.workers = workers
+        self.onerror = onerror if onerror else lambda err: print(f"Error: {err}")
+        self.current = {}
+        self.complete = False
+
+    @staticmethod
+    def _match(patterns: list, name: str, rel: str):
+        return any(fnmatch.fnmatchcase(name, p) or fnmatch.fnmatchcase(rel, p) for p in patterns)
+
+    def _list(self, path: str, rel: str):
+        """Return the (path, size, mtime) of the files of a folder and its (path, rel) subfolders."""
+        files, folders = [], []
+        try:
+            with os.scandir(path) as entries:
+                for entry in entries:
+                    name = entry.name.lower()
+                    sub = rel + "/" + name if rel else name
+                    if self.exclude and self._match(self.exclude, name, sub):
+                        continue
+                    try:
+                        if entry.is_dir(follow_symlinks = False):
+                            if self.recursive:
+                                folders.append((entry.path, sub))
+                        elif entry.is_file() and self._match(self.include, name, sub):
+                            stat = entry.stat()
+                            files.append((entry.path, stat.st_size, stat.st_mtime_ns))
+                    except OSError as err:
+                        self.onerror(err)
+        except OSError as err:
+            self.onerror(err)
+        return files, folders
+
+    def scan(self):
+        """Yield (path, size, mtime) of every file found."""
+        if not self.workers:
+            stack = [(self.root, "")]
+            while stack:
+                files, folders = self._list(*stack.pop())
+                yield from files
+                stack.extend(reversed(folders))
+            return
+
+        # folders listed in parallel, files yielded as their folder is done
+        with ThreadPoolExecutor(self.workers) as pool:
+            running = {pool.submit(self._list, self.root, "")}
+            while running:
+                done, running = wait(running, return_when = FIRST_COMPLETED)
+                for future in done:
+                    files, folders = future.result()
+                    yield from files
+                    running |= {pool.submit(self._list, *folder) for folder in folders}
+
+    def load(self):
+        """Return {path: [size, mtime]} of the last save(), empty without state."""
+        if not self.state or not os.path.exists(self.state):
+            return {}
+        with open(self.state, encoding = "utf-8") as f:
+            return json.load(f)["files"]
+
+    def changed(self):
+        """Yield the path of each file new or changed since the last save()."""
+        known = self.load()
+        self.current, self.complete = {}, False
+        for path, size, mtime in self.scan():
+            self.current[path] = [size, mtime]
+            if known.get(path) != [size, mtime]:
+                yield path
+        self.complete = True
+
+    def save(self):
+        """Write the files seen by a complete changed() to the state file."""
+        if not self.state or not self.complete:
+            return
+        with open(self.state, "w", encoding = "utf-8") as f:
+            json.dump({"root": self.root, "files": self.current}, f)
+
+
+class RuleCache:
+    """
+    Snapshot of the firewall rules, listed again only when they may have changed.
+
+    Within ttl seconds the snapshot is returned as it is; after that the
+    probe is called, and the rules are listed only when its answer differs
+    from the one taken with the snapshot. The default probe reads the value
+    count and the last write time of the FirewallRules keys, where Windows
+    keeps the local rules and the ones pushed by group policy, through
+    ABC.backend: two keys opened against a full `show rule verbose`. A probe
+    returning None means unknown, and the rules are listed again. Rules
+    stored anywhere else are not probed: a snapshot older than max_age
+    seconds is listed again anyway.
+    """
+
+    RULES_KEYS = (
+        "SYSTEM\\CurrentControlSet\\Services\\SharedAccess\\Parameters\\FirewallPolicy\\FirewallRules",
+        "SOFTWARE\\Policies\\Microsoft\\WindowsFirewall\\FirewallRules",
+        )
+
+    def __init__(self, ttl: float = 30.0, source = None, probe = None, clock = tm.monotonic,
+                 max_age: float = 600.0):
+        self.ttl = ttl
+        self.max_age = max_age
+        self.source = source if source else lambda: Firewall.rules()
+        self.probe = probe if probe else self.registry_probe
+        self.clock = clock
+        self.lock = threading.Lock()
+        self.loads = self.probes = 0
+        self.invalidate()
+
+    def invalidate(self):
+        """Drop the snapshot, e.g. after adding or deleting rules."""
+        self.snapshot, self.stamp, self.taken, self.listed = None, None, None, None
+        self._index = None
+
+    @classmethod
+    def registry_probe(cls):
+        backend = ABC.backend
+        if backend is None:
+            return None
+        stamp = []
+        try:
+            root = backend.roots()["HKEY_LOCAL_MACHINE"]
+            for path in cls.RULES_KEYS:
+                try:
+                    with backend.open_key(root, path, bk.KEY_READ | bk.KEY_WOW64_64KEY) as key:
+                        _, values, mtime = backend.query_info(key)
+                    stamp.append((values, mtime))
+                except FileNotFoundError:
+                    # no policy rules is a state too: their key appearing changes the stamp
+                    stamp.append(None)
+        except (OSError, KeyError):
+            return None
+        return tuple(stamp)
+
+    def rules(self) -> list:
+        """Return the rules, from the snapshot while it is still valid."""
+        with self.lock:
+            now = self.clock()
+            if self.snapshot is not None and now - self.taken < self.ttl:
+                return self.snapshot
+
+            self.probes += 1
+            stamp = self.probe()
+            if (self.snapshot is None or stamp is None or stamp != self.stamp
+                    or now - self.listed >= self.max_age):
+                # stamp read before listing: a change made meanwhile is seen next time
+                self.loads += 1
+                self.snapshot, self.stamp, self._index = list(self.source()), stamp, None
+                self.listed = now
+            self.taken = now
+            return self.snapshot
+
+    @property
+    def index(self) -> RuleIndex:
+        rules = self.rules()
+        if self._index is None or self._index[0] is not rules:
+            self._index = rules, RuleIndex(rules)
+        return self._index[1]
+
+
+class Firewall:
+
+    # rules read by listrules(cached = True) and block_traffic
+    cache = RuleCache()
+
+    @classmethod
+    def block_traffic(cls, path: str, ingoing: bool = True, outgoing: bool = True,
+                      index: RuleIndex = None, batch: bool = False, runner = None,
+                      recursive: bool = False, include: list = ("*.exe",), exclude: list = (),
+                      state: str = None, workers: int = None):
         """
         Blocca tutto il traffico di rete in entrata e in uscita per i file .exe
         all'interno della cartella specificata.  Crea regole del firewall di Windows.
+        I programmi già bloccati da una regola attiva vengono saltati.
 
         Args:
             folder_path (str): Il percorso della cartella contenente i file .exe da bloccare.
+            index (RuleIndex): regole esistenti, lette da netsh se non indicate.
+            batch (bool): aggiunge tutte le regole con un solo netsh (vedi Batch).
+            runner: esecutore dei comandi netsh del batch, vedi Batch.
+            recursive, include, exclude, workers: ricerca dei file, vedi Discovery.
+            state (str): file di stato, solo i file nuovi o modificati dall'ultima
+                esecuzione vengono considerati.
         """
 
         path = pt.Path(path)
+        directions = [(d, tag) for d, tag, wanted in (("in", "BKI", ingoing), ("out", "BKO", outgoing))
+                      if wanted]
         try:
             # Verifica che il percorso della cartella esista
             if not path.is_dir():
                 print(f"Errore: La cartella specificata '{path}' non esiste.")
                 sys.exit(1)
 
-            exe_filelist = [file for file in path.iterdir() if file.suffix == ".exe"]
+            index = index if index is not None else cls.cache.index
+            pending = Batch(runner)
+
+            discovery = Discovery(path, include, exclude, recursive, state, workers)
+            exe_filelist = [pt.Path(file) for file in discovery.changed()]
             # Scorre tutti i file nella cartella
             for file in exe_filelist:
 
                 time_now = int(tm.time())
                 time_iso = tm.ctime(time_now)
 
-                ADD_RULE_CMD = ["netsh", "advfirewall", "firewall", "add", "rule"]
-                SETTINGS = ["enable=yes", "profile=any"]
-                # Blocca il traffico in entrata per il file .exe
-                subprocess.run(
-                    [*ADD_RULE_CMD, "dir=in", "action=block",
-                     f'name=APW-{time_now}-BKI-{file.stem}',  #suffisso _In per la regola in entrata
-                     f'program={file.absolute()}',
-                     f"description=Autofirewall generated rule at {time_iso} by Python process.",
-                     *SETTINGS] ,
-                    check=True
-                )
-
-                # Blocca il traffico in uscita per il file .exe
-                subprocess.run(
-                    [*ADD_RULE_CMD, "dir=out", "action=block",
-                     f'name=APW-{time_now}-BKO-{file.stem}', #suffisso _Out per la regola in uscita
-                     f"program={file.absolute()}",
-                     f"description=Autofirewall generated rule at {time_iso} by Python process.",
-                     *SETTINGS] ,
-                    check=True
-                )
-                print(f"Traffico bloccato per: {file}")
+                program = file.absolute()
+                # Blocca il traffico in entrata (BKI) e in uscita (BKO) per il file .exe
+                for direction, tag in directions:
+                    if not index.covers(program, direction):
+                        pending.add_rule(f"APW-{time_now}-{tag}-{file.stem}", program, direction,
+                                         description = f"Autofirewall generated rule at {time_iso} by Python process.")
+
+                if not batch and pending.rules:
+                    cls.cache.invalidate()
+                    # le regole in entrata e in uscita insieme
+                    results = rn.default.call_all(
+                        [Netsh.NETSH_ADDRULE_CMD + Batch.argv(pairs) for _, pairs in pending.rules],
+                        timeout = Netsh.TIMEOUT, encoding = Netsh.ENCODING)
+                    for (rule, _), result in zip(pending.rules, results):
+                        result.check()
+                        index.add(rule)
+                    pending.rules.clear()
+                    print(f"Traffico bloccato per: {file}")
+
+            if pending.rules:
+                cls.cache.invalidate()
+            for rule, outcome in zip([rule for rule, _ in pending.rules], pending.apply()):
+                if outcome.ok:
+                    index.add(rule)
+                    print(f"Traffico bloccato per: {outcome.program} ({outcome.direction})")
+                else:
+                    print(f"Errore: regola non creata {outcome.name} per {outcome.program}")
+                    discovery.current.pop(str(outcome.program), None)
+            discovery.save()
 
         except subprocess.CalledProcessError as e:
             print(f"Errore durante la creazione delle regole del firewall: {e}")
             print("Assicurarsi di avere i privilegi di amministratore e che i comandi siano stati inseriti correttamente.")
             sys.exit(1)
         except Exception as ex:
-            print(f"Si è verificato un errore imprevisto: {ex.with_traceback()}")
+            print(f"Si è verificato un errore imprevisto: {ex}")
             sys.exit(1)
+        return index
 
 
+    @staticmethod
+    def rules(options: list = [], xwall_rules_only: bool = False):
+        """
+        Genera le regole del firewall di Windows (Rule) mentre netsh le stampa,
+        senza attendere la fine del comando.
+        """
+        NETSH_CMD = Netsh.NETSH_LISTRULE_CMD + [*options, "verbose"]
+        for rule in Netsh.parse(Netsh.stream(NETSH_CMD)):
+            if not xwall_rules_only or rule.name.startswith("APW-"):
+                yield rule
 
     @classmethod
-    def listrules(cls, options: list = [], xwall_rules_only: bool = False):
+    def listrules(cls, options: list = [], xwall_rules_only: bool = False, cached: bool = False):
         """
-        Elenca tutte le regole del firewall di Windows e le restituisce come una lista di dizionari.
-        Ogni dizionario rappresenta una regola del firewall.
+        Elenca tutte le regole del firewall di Windows e le restituisce come una lista di Rule.
+        Con cached (e senza options) le regole vengono da Firewall.cache, vedi RuleCache.
         """
 
         try:
-            # Esegue il comando netsh per ottenere tutte le regole del firewall
-            NETSH_CMD = cls.NETSH_LISTRULE_CMD + [*options, "verbose"]
-
-            result = subprocess.run(NETSH_CMD, check=True, capture_output=True, text = True)
-            output = result.stdout
-            output_lines = [line.strip() for line in output.strip().split('\n') if line.strip() != ""]
-
-            # Analizza l'output di netsh
-            rules = cls._rules2dict(output_lines)
+            if cached and not options:
+                rules = cls.cache.rules()
+                return [rule for rule in rules if not xwall_rules_only or rule.name.startswith("APW-")]
+            return list(cls.rules(options, xwall_rules_only))
 
         except subprocess.CalledProcessError as e:
             print(f"Errore durante l'esecuzione del comando netsh: {e}")
@@ -126,34 +580,63 @@ class Firewall:
         except Exception as ex:
             print(f"Si è verificato un errore imprevisto: {ex}")
             sys.exit(1)
-        finally:
-            rules = rules if rules is not None else []
-            # return rules
 
 
 class DType(Enum):
 
-    REG_SZ = winreg.REG_SZ
-    REG_DWORD = winreg.REG_DWORD
-    REG_BINARY = winreg.REG_BINARY
-    REG_EXPAND_SZ = winreg.REG_EXPAND_SZ
+    REG_SZ = bk.REG_SZ
+    REG_DWORD = bk.REG_DWORD
+    REG_BINARY = bk.REG_BINARY
+    REG_EXPAND_SZ = bk.REG_EXPAND_SZ
 
 
 class Address:
+    """
+    Registry address, as a chain of parts sharing their parents.
+
+    Each Address keeps only its last part, interned, and a pointer to its
+    parent: the children made during a walk don't copy the path above them,
+    and the hive at the base of the chain is found once, when it is built.
+    """
+
+    __slots__ = ("up", "name", "size", "base")
 
     def __init__(self, *parts: str):
         if not isinstance(parts, tuple):
             raise TypeError(f"Invalid argument: '{type(parts)}'.")
+        if not parts:
+            raise ValueError(f"Invalid Address parts: {parts}")
 
-        self.core = tuple(str(p) for p in parts)
+        up = None
+        for part in parts[:-1]:
+            up = self._child(up, part)
+        self._link(up, parts[-1])
 
-        if not self.core:
-            raise ValueError(f"Invalid Address parts: {parts}")
+    def _link(self, up, name):
+        self.up = up
+        self.name = sys.intern(str(name))
+        self.size = up.size + 1 if up else 1
+        self.base = up.base if up else self
+
+    @classmethod
+    def _child(cls, up, name):
+        address = object.__new__(cls)
+        address._link(up, name)
+        return address
 
     def __repr__(self):
-        name = self.core[-1].encode(errors = "ignore").decode()
+        name = self.name.encode(errors = "ignore").decode()
         return f"<Address '{name}'>"
 
+    @property
+    def core(self):
+        parts = [None] * self.size
+        node = self
+        for i in range(self.size - 1, -1, -1):
+            parts[i] = node.name
+            node = node.up
+        return tuple(parts)
+
     @property
     def path(self):
         path_str = "\\".join(self.core)
@@ -166,31 +649,20 @@ class Address:
 
     @property
     def is_root(self):
-        if len(self.core) > 1:
-            return False
-        else:
-            root = self.core[0]
-            hkeys = [h for h in HKEY.main().keys()]
-            return True if root in hkeys else False
+        return self.up is None and self.name in bk.HIVES
 
     @property
     def root(self):
-        root = self.core[0]
-        hkeys = [h for h in HKEY.main().keys()]
-        return self.__class__(root) if root in hkeys else None
+        return self.base if self.base.name in bk.HIVES else None
 
     @property
     def is_absolute(self):
-        return True if self.root else False
+        return self.base.name in bk.HIVES
 
     @property
     def is_relative(self):
         return not self.is_absolute
 
-    @property
-    def name(self):
-        return self.core[-1]
-
     @classmethod
     def _to_path(cls, path):
         if isinstance(path, cls):
@@ -206,14 +678,17 @@ class Address:
 
     def __truediv__(self, part):
         if isinstance(part, str):
-            parts = self.core + (part,)
+            parts = (part,)
         elif isinstance(part, self.__class__):
-            parts = self.core + part.core
+            parts = part.core
         elif isinstance(part, Path):
-            parts = self.core + tuple(p for p in part.parts)
+            parts = part.parts
         else:
-            parts = self.core + (str(part),)
-        return self.__class__(*parts)
+            parts = (str(part),)
+        address = self
+        for p in parts:
+            address = self._child(address, p)
+        return address
 
     @property
     def relative(self):
@@ -230,24 +705,106 @@ class Address:
 
     @property
     def location(self):
+        return self.locate(ABC.backend)
+
+    def locate(self, backend):
+        """Return (root handle in backend, sub path) to open the key at."""
         if self.is_absolute:
-            root = HKEY.main()[self.root.name]
-            relative = self.relative
-            sub_path = relative.str if relative else None
+            root = backend.roots()[self.base.name]
+            sub_path = "\\".join(self.core[1:]) if self.up else None
             return root, sub_path
         else:
             return None, None
 
     @property
     def parent(self):
-        parent = self.core[:-1]
-        return self.__class__(*parent)
+        return self.up
+
+
+
+
+class Resolver:
+    """
+    Memory of ABC.info and ABC.exists: the access mask that works in each
+    subtree (e.g. the 32-bit view under a vendor key) and, in a bounded LRU,
+    which addresses exist and which lookups found nothing.
+
+    Deletes made through the key classes invalidate their subtree; call
+    clear() after changing the registry any other way.
+    """
+
+    ACCESS = (bk.KEY_READ | bk.KEY_WOW64_64KEY,
+              bk.KEY_READ | bk.KEY_WOW64_32KEY,
+              bk.KEY_ALL_ACCESS)
 
+    def __init__(self, size: int = 4096, depth: int = 2):
+        self.size = size
+        self.depth = depth      # parts below the hive sharing one access
+        self.backend = None
+        self.lock = threading.Lock()
+        self.clear()
+
+    def clear(self):
+        self.views = {}
+        self.cache = OrderedDict()
+        self.hits = self.misses = 0
+
+    def bind(self, backend):
+        """Forget everything learnt on another backend."""
+        if backend is not self.backend:
+            with self.lock:
+                self.clear()
+                self.backend = backend
+        return self
+
+    @staticmethod
+    def _key(address: Address):
+        return tuple(part.lower() for part in address.core)
+
+    def order(self, address: Address):
+        best = self.views.get(self._key(address)[:1 + self.depth])
+        if best is None:
+            return self.ACCESS
+        return (best, *(access for access in self.ACCESS if access != best))
+
+    def learn(self, address: Address, access: int):
+        self.views[self._key(address)[:1 + self.depth]] = access
+
+    def get(self, kind: str, address: Address):
+        """Return what was stored for the lookup, None if unknown."""
+        key = kind, self._key(address)
+        with self.lock:
+            found = self.cache.get(key)
+            if found is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+                self.cache.move_to_end(key)
+        return found
+
+    def put(self, kind: str, address: Address, found: bool):
+        with self.lock:
+            self.cache[kind, self._key(address)] = found
+            self.cache.move_to_end((kind, self._key(address)))
+            while len(self.cache) > self.size:
+                self.cache.popitem(last = False)
+
+    def invalidate(self, address: Address):
+        """Forget the lookups of address and of its subtree."""
+        prefix = self._key(address)
+        with self.lock:
+            for key in [key for key in self.cache if key[1][:len(prefix)] == prefix]:
+                del self.cache[key]
 
 
 
 class ABC:
 
+    # registry access of every key: swap it for a MemoryBackend or a
+    # HiveBackend to work on something else than the live registry
+    backend = bk.WinregBackend() if bk.winreg else None
+    resolver = Resolver()
+
     def __init__(self, address: Address):
 
         self.address = address
@@ -256,7 +813,13 @@ class ABC:
 
     def __truediv__(self, other):
         address = self.address / other.address
-        return self.__class__(address)
+        return self._own(self.__class__(address))
+
+    def _own(self, key):
+        """Give key the backend of this key, when this key has one of its own."""
+        if "backend" in self.__dict__:
+            key.backend = self.backend
+        return key
 
     def __repr__(self):
         name = self.address.name.encode(errors = "ignore").decode()
@@ -272,8 +835,8 @@ class ABC:
 
     @property
     def root(self):
-        root_key = getattr(HKEY, self.address.root.name)()
-        return root_key
+        root = self.address.root
+        return self._own(HKEY(root, self.backend.roots().get(root.name)))
 
     @property
     def parent(self):
@@ -282,9 +845,9 @@ class ABC:
         else:
             parent = self.address.parent
             if parent.is_root:
-                return getattr(HKEY, parent.name)()
+                return self._own(HKEY(parent, self.backend.roots().get(parent.name)))
             else:
-                return FKEY(parent)
+                return self._own(FKEY(parent))
 
     @property
     def relative(self):
@@ -293,42 +856,46 @@ class ABC:
 
     @staticmethod
     def _info(key, access: object = None):
-        access = winreg.KEY_READ if access is None else access
+        access = bk.KEY_READ if access is None else access
+        backend = key.backend
 
         if isinstance(key, EKEY):
-            hkey, sub_path = key.parent.address.location
-            with winreg.OpenKey(hkey, sub_path, 0, access) as k:
-                value, type_ = winreg.QueryValueEx(k, key.name)
+            hkey, sub_path = key.parent.address.locate(backend)
+            with backend.open_key(hkey, sub_path, access) as k:
+                value, type_ = backend.query_value(k, key.name)
                 return key.name, value, type_
         else:
-            hkey, sub_path = key.address.location
-            with winreg.OpenKey(hkey, sub_path, 0, access) as k:
-                name = winreg.EnumKey(k)
-                return name
+            hkey, sub_path = key.address.locate(backend)
+            with backend.open_key(hkey, sub_path, access) as k:
+                return backend.query_info(k)
 
 
 
     @property
     def info(self):
-        # TODO
-        try:
-            access = winreg.KEY_READ | winreg.KEY_WOW64_64KEY
-            return self._info(self, access = access)
-        except FileNotFoundError:
+        resolver = self.resolver.bind(self.backend)
+        if resolver.get("info", self.address) is False:
+            return None
+
+        # the access that worked last in this subtree first, then the others
+        for i, access in enumerate(resolver.order(self.address)):
+            if i:
+                self.backend.event("fallback", self.address)
             try:
-                access = winreg.KEY_READ | winreg.KEY_WOW64_32KEY
-                return self._info(self, access = access)
+                found = self._info(self, access = access)
             except FileNotFoundError:
-                try:
-                    access = winreg.KEY_ALL_ACCESS
-                    return self._info(self, access = access)
-                except FileNotFoundError:
-                    if self.exists:
-                        raise PermissionError(self.name)
-                    else:
-                        return None
-                except PermissionError:
-                    raise PermissionError(self)
+                continue
+            except PermissionError:
+                if access != bk.KEY_ALL_ACCESS:
+                    raise
+                raise PermissionError(self)
+            resolver.learn(self.address, access)
+            return found
+
+        if self.exists:
+            raise PermissionError(self.name)
+        resolver.put("info", self.address, False)
+        return None
 
 
     @property
@@ -344,19 +911,28 @@ class ABC:
 
     @property
     def exists(self):
+        resolver = self.resolver.bind(self.backend)
+        found = resolver.get("exists", self.address)
+        if found is None:
+            found = self._exists()
+            resolver.put("exists", self.address, found)
+        return found
+
+    def _exists(self):
         try:
-            with winreg.OpenKey(
-                    *self.address.location, 0,
-                    winreg.KEY_READ | winreg.KEY_WOW64_32KEY
+            with self.backend.open_key(
+                    *self.address.locate(self.backend),
+                    bk.KEY_READ | bk.KEY_WOW64_32KEY
                     ):
                 return True
         except FileNotFoundError:
             try:
-                with winreg.OpenKey(
-                        *self.address.parent.location, 0,
-                        winreg.KEY_READ | winreg.KEY_WOW64_32KEY
+                self.backend.event("fallback", self.address)
+                with self.backend.open_key(
+                        *self.address.parent.locate(self.backend),
+                        bk.KEY_READ | bk.KEY_WOW64_32KEY
                         ) as k:
-                    winreg.QueryValueEx(k, self.address.name)
+                    self.backend.query_value(k, self.address.name)
                     return True
             except (FileNotFoundError, OSError, ValueError):
                 return False
@@ -365,6 +941,298 @@ class ABC:
 
 
 
+@dataclass(repr = False)
+class Deletion:
+    """
+    Plan and outcome of a delete: the addresses deleted (or that would be,
+    in preview), denied and already missing.
+    """
+
+    plan: list
+    preview: bool = True
+    deleted: list = Field(default_factory = list)
+    denied: list = Field(default_factory = list)
+    missing: list = Field(default_factory = list)
+
+    def __repr__(self):
+        mode = "preview" if self.preview else "done"
+        return (f"<Deletion {mode}: {len(self.deleted)} deleted, "
+                f"{len(self.denied)} denied, {len(self.missing)} missing>")
+
+    def __bool__(self):
+        return not self.denied
+
+    def __len__(self):
+        return sum(len(names) for _, names in self.plan)
+
+    def _step(self, backend, delete: object, parent: Address, names: list):
+        if self.preview:
+            self.deleted.extend(parent / name for name in names)
+            return
+        try:
+            with backend.open_key(*parent.locate(backend), bk.KEY_ALL_ACCESS) as handle:
+                for name in names:
+                    try:
+                        delete(handle, name)
+                        self.deleted.append(parent / name)
+                    except FileNotFoundError:
+                        self.missing.append(parent / name)
+                    except OSError:
+                        self.denied.append(parent / name)
+        except FileNotFoundError:
+            self.missing.extend(parent / name for name in names)
+        except OSError:
+            self.denied.extend(parent / name for name in names)
+
+    def run(self, backend, delete: object, progress: bool = False):
+        """Run the plan with delete(handle, name), once per parent handle."""
+        if not progress:
+            for parent, names in self.plan:
+                self._step(backend, delete, parent, names)
+            return self
+
+        with Progress(transient = True) as bar:
+            task = bar.add_task("Deleting", total = len(self))
+            for parent, names in self.plan:
+                self._step(backend, delete, parent, names)
+                bar.update(task, advance = len(names))
+        return self
+
+
+
+class Record:
+    """
+    A subkey, or a value with its data, as enumerated by a walk.
+
+    Much lighter than FKEY and EKEY: key builds one only when asked, and
+    the EKEY keeps the data so reading it doesn't reopen the parent key.
+    key is on ABC.backend: walk() and query() give the keys on the backend
+    of the key walked.
+    """
+
+    __slots__ = ("address", "value", "type")
+
+    def __init__(self, address: Address, value: object = None, type_: int = None):
+        self.address = address
+        self.value = value
+        self.type = type_
+
+    def __repr__(self):
+        name = self.address.name.encode(errors = "ignore").decode()
+        return f"<Record '{name}'>"
+
+    @property
+    def name(self):
+        return self.address.name
+
+    @property
+    def is_value(self):
+        return self.type is not None
+
+    @property
+    def kind(self):
+        return EKEY if self.is_value else FKEY
+
+    @property
+    def key(self):
+        if self.is_value:
+            return EKEY(self.address, (self.value, self.type))
+        return FKEY(self.address)
+
+
+
+class Query:
+    """
+    Address glob, regex and kind filter over Address.core, for FKEY.query.
+
+    The glob is matched part by part, case-insensitive, relative to the
+    searched key: "*" and "?" stay within one name, "**" spans any number of
+    keys. It is run as a small automaton, so telling whether a branch can
+    still match costs one step per part of the address.
+    """
+
+    def __init__(self, pattern: str = None, regex: str = None, kind: type = None):
+        parts = [p for p in re.split(r"[\\/]", pattern) if p] if pattern else ["**"]
+        self.pattern = pattern
+        self.parts = [None if p == "**" else re.compile(fnmatch.translate(p), re.IGNORECASE)
+                      for p in parts]
+        self.regex = re.compile(regex) if isinstance(regex, str) else regex
+        self.kind = kind
+
+    def __repr__(self):
+        return f"<Query '{self.pattern}'>"
+
+    def _close(self, states: set):
+        # "**" may also match no part at all
+        for i in sorted(states):
+            while i < len(self.parts) and self.parts[i] is None:
+                i += 1
+                states.add(i)
+        return states
+
+    def states(self, core: tuple):
+        """Return the positions in the glob reached after the parts of core."""
+        states = self._close({0})
+        for name in core:
+            found = set()
+            for i in states:
+                if i == len(self.parts):
+                    continue
+                part = self.parts[i]
+                if part is None:
+                    found.add(i)
+                elif part.match(name):
+                    found.add(i + 1)
+            if not found:
+                return found
+            states = self._close(found)
+        return states
+
+    def descends(self, core: tuple):
+        """Tell whether anything below core can match the glob."""
+        return any(i < len(self.parts) for i in self.states(core))
+
+    def matches(self, record, core: tuple):
+        if self.kind and record.kind is not self.kind:
+            return False
+        if len(self.parts) not in self.states(core):
+            return False
+        return not self.regex or bool(self.regex.search("\\".join(core)))
+
+
+
+class Scanner:
+    """
+    Lists the keys of an FKEY.walk, in the calling thread or ahead of time on
+    a pool of workers, with at most `queue` listings pending.
+    """
+
+    def __init__(self, fkey, onerror: object, depth: int = None, prune: object = None,
+                 workers: int = None, queue: int = None):
+        self.fkey = fkey
+        self.onerror = onerror
+        self.depth = depth
+        self.prune = prune
+        self.pool = ThreadPoolExecutor(workers) if workers else None
+        self.queue = queue if queue else 4 * (workers or 1)
+        self.pending = {}       # address -> future, None while waiting
+        self.waiting = deque()
+        self.running = 0
+
+    def close(self):
+        if self.pool:
+            self.pool.shutdown(wait = False, cancel_futures = True)
+        self.pending.clear()
+        self.waiting.clear()
+
+    def prefetch(self, addresses: list, lifo: bool = False):
+        """Queue the listing of addresses, in the order they will be read."""
+        if not self.pool or not addresses:
+            return
+        for address in addresses:
+            self.pending[address] = None
+        # a stack pops the last address first, so push them reversed
+        self.waiting.extend(reversed(addresses) if lifo else addresses)
+        self.fill(lifo)
+
+    def fill(self, lifo: bool = False):
+        while self.waiting and self.running < self.queue:
+            address = self.waiting.pop() if lifo else self.waiting.popleft()
+            if address in self.pending and self.pending[address] is None:
+                self.pending[address] = self.pool.submit(self.fkey._scan, address)
+                self.running += 1
+
+    def descends(self, k, level: int):
+        """Tell whether the walk goes below k, found at `level`."""
+        if k.is_value or (self.depth is not None and level >= self.depth):
+            return False
+        return not (self.prune and self.prune(k))
+
+    def children(self, address: Address, level: int, lifo: bool = False):
+        """
+        Return the records of the subkeys and values of address, found at
+        `level`, as (record, descends) pairs.
+        """
+        listing = self.listing(address, lifo)
+        if listing is None:
+            return []
+        fkeys, ekeys, _ = listing
+        found = [(k, self.descends(k, level)) for k in self.fkey._records(address, fkeys, ekeys)]
+        self.prefetch([k.address for k, below in found if below], lifo)
+        return found
+
+    def listing(self, address: Address, lifo: bool = False):
+        """Return the listing of address, None if it can't be read."""
+        future = self.pending.pop(address, None)
+        try:
+            if future:
+                self.running -= 1
+                return future.result()
+            return self.fkey._scan(address)
+        except OSError as err:
+            self.onerror(err)
+            return None
+        finally:
+            if self.pool:
+                self.fill(lifo)
+
+    def listings(self, address: Address):
+        """Yield (address, fkeys, ekeys, mtime) of address and every key below, parents first."""
+        stack = [(address, 1)]
+        while stack:
+            address, level = stack.pop()
+            listing = self.listing(address, lifo = True)
+            if listing is None:
+                continue
+            yield (address, *listing)
+            below = [k.address for k in self.fkey._records(address, listing[0], [])
+                     if self.descends(k, level)]
+            self.prefetch(below, lifo = True)
+            stack.extend((k, level + 1) for k in reversed(below))
+
+    def depth_first(self, address: Address):
+        stack = [iter(self.children(address, 1, lifo = True))]
+        while stack:
+            found = next(stack[-1], None)
+            if found is None:
+                stack.pop()
+                continue
+            k, below = found
+            yield k
+            if below:
+                stack.append(iter(self.children(k.address, len(stack) + 1, lifo = True)))
+
+    def breadth_first(self, address: Address):
+        queue = deque([(address, 1)])
+        while queue:
+            address, level = queue.popleft()
+            for k, below in self.children(address, level):
+                yield k
+                if below:
+                    queue.append((k.address, level + 1))
+
+    def unordered(self, address: Address):
+        # every worker lists a key, the subkeys found go back to the frontier
+        frontier, running = [(address, 1)], {}
+        while frontier or running:
+            while frontier and len(running) < self.queue:
+                address, level = frontier.pop()
+                running[self.pool.submit(self.fkey._scan, address)] = address, level
+            done, _ = wait(running, return_when = FIRST_COMPLETED)
+            for future in done:
+                address, level = running.pop(future)
+                try:
+                    fkeys, ekeys, _ = future.result()
+                except OSError as err:
+                    self.onerror(err)
+                    continue
+                for k in self.fkey._records(address, fkeys, ekeys):
+                    yield k
+                    if self.descends(k, level):
+                        frontier.append((k.address, level + 1))
+
+
+
 class FKEY(ABC):
 
     def __init__(self, address: str):
@@ -375,83 +1243,177 @@ class FKEY(ABC):
         name = self.address.name.encode(errors = "ignore").decode()
         return f"<FKEY '{name}'>"
 
+    def _scan(self, address: Address):
+        # one open for the subkeys, the values and the last write time
+        with self.backend.open_key(
+                *address.locate(self.backend),
+                bk.KEY_READ | bk.KEY_WOW64_64KEY) as k:
+            return self.backend.listing(k)
+
     @property
     def list(self):
-        with winreg.OpenKey(
-                *self.address.location, 0,
-                winreg.KEY_READ | winreg.KEY_WOW64_64KEY) as k:
-
-            numf, nume, _ = winreg.QueryInfoKey(k)
-            fkeys = [winreg.EnumKey(k, i) for i in range(numf)]
-            ekeys = [winreg.EnumValue(k, i) for i in range(nume)]
+        fkeys, ekeys, _ = self._scan(self.address)
+        return fkeys, ekeys
 
-            if len(fkeys) == numf and len(ekeys) == nume:
-                return fkeys, ekeys
-            else:
-                path = self.address.core
-                raise PermissionError(f"Access not granted to: {path}")
+    @staticmethod
+    def _records(address: Address, fkeys: list, ekeys: list):
+        found = [Record(address / name) for name in fkeys]
+        found.extend(Record(address / name, value, type_) for name, value, type_ in ekeys)
+        return found
 
+    def _subkeys(self, address: Address, fkeys: list, ekeys: list):
+        found = [self._own(FKEY(address / name)) for name in fkeys]
+        found.extend(self._own(EKEY(address / name, (value, type_)))
+                     for name, value, type_ in ekeys)
+        return found
 
     @property
     def subf(self):
-        found = []
-        for name in self.list[0]:
-            address = self.address / name
-            fkey = FKEY(address)
-            found.append(fkey)
-        return found
+        return self._subkeys(self.address, self.list[0], [])
 
     @property
     def sube(self):
-        found = []
-        for name, value, type_ in self.list[1]:
-            address = self.address / name
-            ekey = EKEY(address)
-            found.append(ekey)
-        return found
+        return self._subkeys(self.address, [], self.list[1])
 
     @property
     def suba(self):
-        return self.subf + self.sube
+        return self._subkeys(self.address, *self.list)
 
-    def walk(self):
+    def walk(self, order: str = "depth", depth: int = None, onerror: object = None,
+             prune: object = None, workers: int = None, ordered: bool = True,
+             queue: int = None, records: bool = False):
+        """
+        Yield every subkey and value below this key.
+
+        Every key is opened and enumerated once, with an explicit stack
+        instead of recursion. A key that can't be read is reported to
+        onerror (printed by default) and its subtree skipped.
+
+        Args:
+            order (str): "depth" yields each subkey followed by its subtree,
+                then the values; "breadth" yields level by level.
+            depth (int): levels to visit below this key, all if None.
+            onerror (callable): called with the error of unreadable keys.
+            prune (callable): called with the Record of every subkey, the
+                walk doesn't go below the ones it returns True for.
+            workers (int): list keys on a pool of threads, ahead of the walk.
+            ordered (bool): with workers, keep the order of a plain walk;
+                if False keys are yielded as soon as they are listed.
+            queue (int): listings pending on the pool, 4 per worker if None.
+            records (bool): yield Record instead of FKEY and EKEY.
+        """
+        if order not in ("depth", "breadth"):
+            raise ValueError(f"Invalid walk order: {order}")
+        onerror = onerror if onerror else lambda err: print(f"Error: {err}")
+
+        scanner = Scanner(self, onerror, depth = depth, prune = prune,
+                          workers = workers, queue = queue)
+        if workers and not ordered:
+            found = scanner.unordered(self.address)
+        elif order == "breadth":
+            found = scanner.breadth_first(self.address)
+        else:
+            found = scanner.depth_first(self.address)
         try:
-            for k in self.suba:
-                yield k
-                if isinstance(k, FKEY):
-                    yield from k.walk()
-        except PermissionError as err:
-            return print(f"Error: {err}")
-        except OSError as err:
-            return print(f"Error: {err}")
+            for record in found:
+                yield record if records else self._own(record.key)
+        finally:
+            # stopping the iteration drops the listings still queued
+            scanner.close()
 
+    def listings(self, depth: int = None, onerror: object = None, prune: object = None,
+                 workers: int = None, queue: int = None):
+        """
+        Yield (address, subkey names, [(name, value, type)], last write time)
+        for this key and every key below, each key before its subkeys.
 
-    def delete(self, preview: bool = True, *access: object):
-        if self.subf:
-            for k in self.subf:
-                k.delete(preview = preview)
+        Same traversal as walk, by key instead of by item: every key comes
+        with its own values, as exporters need. depth counts from this key.
+        """
+        onerror = onerror if onerror else lambda err: print(f"Error: {err}")
+        scanner = Scanner(self, onerror, depth = depth, prune = prune,
+                          workers = workers, queue = queue)
         try:
-            with winreg.OpenKey(*self.parent.address.location, 0,
-                                winreg.KEY_ALL_ACCESS) as pkey:
-                if not preview:
-                    winreg.DeleteKey(pkey, self.name)
-                print(f"Deleted: {self.name}")
-                return True
-        except FileNotFoundError:
-            return True
-        except PermissionError:
-            print(f"PermissionError: {self.address}.")
-            return False
-        except Exception as e:
-            print(f"GeneralError: {e}")
-            return False
+            yield from scanner.listings(self.address)
+        finally:
+            scanner.close()
+
+    def query(self, pattern: str = None, regex: str = None, depth: int = None,
+              kind: type = None, records: bool = False, **options):
+        """
+        Yield the subkeys and values below this key matching a Query.
+
+        Only the branches the pattern can still match are listed, so the
+        cost follows the size of the matched region, not of the tree.
 
+        hkey.query("SOFTWARE/*/Uninstall/*", kind = FKEY)
 
-    def search(self, function: object = None, instances: list = None):
+        Args:
+            pattern (str): address glob relative to this key, see Query.
+            regex (str): regular expression searched in the relative address.
+            depth (int): levels to visit below this key, all if None.
+            kind (type): FKEY or EKEY to get only keys or only values.
+            records (bool): yield Record instead of FKEY and EKEY.
+            options: any other walk argument (order, workers, ...).
+        """
+        query = Query(pattern, regex, kind)
+        skip = self.address.size
+        prune = lambda k: not query.descends(k.address.core[skip:])
+        for k in self.walk(depth = depth, prune = prune, records = True, **options):
+            if query.matches(k, k.address.core[skip:]):
+                yield k if records else self._own(k.key)
+
+    def _plan(self, onerror: object = None):
+        """
+        Return the steps deleting this key and its subtree, from one walk.
+
+        Each step is a parent address with the names of its subkeys. Steps
+        run in reverse walk order, so the subkeys are already empty when
+        their turn comes.
+        """
+        order, children = [self.address], {}
+        for record in self.walk(onerror = onerror, records = True):
+            if not record.is_value:
+                order.append(record.address)
+                # walked children share the Address of their parent
+                children.setdefault(record.address.up, []).append(record.name)
+
+        plan = [(address, children[address]) for address in reversed(order)
+                if address in children]
+        plan.append((self.address.up, [self.name]))
+        return plan
+
+    def snapshot(self, **options):
+        """Return a Snapshot of this subtree, walk options allowed."""
+        return Snapshot.take(self, **options)
+
+    def delete(self, preview: bool = True, progress: bool = False):
+        """
+        Delete this key with its subtree.
+
+        The whole plan is computed with one walk, then every parent key is
+        opened once to delete all its subkeys.
+
+        Args:
+            preview (bool): report what would be deleted, change nothing.
+            progress (bool): show a progress bar, one step per parent key.
+
+        Returns:
+            Deletion: true unless some key was denied.
+        """
+        if self.is_root:
+            raise ValueError(f"Can't delete a root key: {self.name}")
+        deletion = Deletion(self._plan(onerror = lambda err: None), preview)
+        deletion.run(self.backend, self.backend.delete_key, progress)
+        if not preview:
+            self.resolver.invalidate(self.address)
+        return deletion
+
+    def search(self, function: object = None, instances: list = None, **options):
         instances = HKEY, FKEY, EKEY
         if instances: instances = tuple(ins for ins in instances)
 
-        for i, k in enumerate(self.walk()):
+        for i, k in enumerate(self.walk(**options)):
             if isinstance(k, instances):
                 print(i, k)
                 if function(k):
@@ -476,21 +1438,30 @@ class FKEY(ABC):
 
 class EKEY(ABC):
 
-    def __init__(self, address: str):
+    def __init__(self, address: str, data: tuple = None):
         super().__init__(address)
+        # (value, type) as enumerated by a walk, saves reopening the parent
+        self._data = data
 
     def __repr__(self):
         name = self.address.name.encode(errors = "ignore").decode()
         return f"<EKEY '{name}'>"
 
 
+    @property
+    def data(self):
+        if self._data is not None:
+            return self._data
+        _, value, type_ = self.info
+        return value, type_
+
     @property
     def value(self):
-        return self.info[1]
+        return self.data[0]
 
     @property
     def type(self):
-        return self.info[2]
+        return self.data[1]
 
 
     @property
@@ -498,23 +1469,163 @@ class EKEY(ABC):
         return False
 
 
-    def delete(self, preview = True):
-        try:
-            with winreg.OpenKey(*self.parent.address.location, 0,
-                                winreg.KEY_ALL_ACCESS) as pkey:
-                if not preview:
-                    winreg.DeleteValue(pkey, self.name)
-                print(f"Deleted: {self.name}")
-                return True
-        except FileNotFoundError:
-            print(f"Not Found: {self.name}")
-            return True
-        except PermissionError:
-            print(f"PermissionError: {self.address}.")
-            return False
-        except Exception as e:
-            print(f"GeneralError: {e}")
-            return False
+    def delete(self, preview: bool = True):
+        """Delete this value, see FKEY.delete."""
+        deletion = Deletion([(self.address.up, [self.name])], preview)
+        deletion.run(self.backend, self.backend.delete_value)
+        if not preview:
+            self.resolver.invalidate(self.address)
+        return deletion
+
+
+
+class Snap:
+    """A key in a Snapshot: its values, subkeys and Merkle hash."""
+
+    __slots__ = ("name", "values", "keys", "digest")
+
+    def __init__(self, name: str):
+        self.name = name
+        self.values = {}    # lower name -> (name, value, type)
+        self.keys = {}      # lower name -> Snap
+        self.digest = None
+
+    def __repr__(self):
+        return f"<Snap '{self.name}'>"
+
+    def seal(self):
+        """Hash the values and the hashes of the subkeys, once they are sealed."""
+        digest = hashlib.blake2b(digest_size = 16)
+        for _, (name, value, type_) in sorted(self.values.items()):
+            digest.update(repr((name, type_, value)).encode(errors = "backslashreplace"))
+        for _, key in sorted(self.keys.items()):
+            digest.update(repr(key.name).encode(errors = "backslashreplace") + key.digest)
+        self.digest = digest.digest()
+
+    def dump(self):
+        values = [[name, type_, {"hex": value.hex()} if isinstance(value, bytes) else value]
+                  for name, value, type_ in self.values.values()]
+        keys = [key.dump() for key in self.keys.values()]
+        return {"name": self.name, "digest": self.digest.hex(), "values": values, "keys": keys}
+
+    @classmethod
+    def load(cls, data: dict):
+        snap = cls(data["name"])
+        snap.digest = bytes.fromhex(data["digest"])
+        for name, type_, value in data["values"]:
+            if isinstance(value, dict):
+                value = bytes.fromhex(value["hex"])
+            snap.values[name.lower()] = (name, value, type_)
+        for key in data["keys"]:
+            key = cls.load(key)
+            snap.keys[key.name.lower()] = key
+        return snap
+
+
+# a key or value that differs between two snapshots
+Change = namedtuple("Change", ["path", "kind", "old", "new"], defaults = [None, None])
+
+
+@dataclass(repr = False)
+class Diff:
+    """
+    Keys and values added, removed or modified between two snapshots.
+    An added or removed key stands for its whole subtree.
+    """
+
+    added: list = Field(default_factory = list)
+    removed: list = Field(default_factory = list)
+    modified: list = Field(default_factory = list)
+
+    def __repr__(self):
+        return (f"<Diff: {len(self.added)} added, {len(self.removed)} removed, "
+                f"{len(self.modified)} modified>")
+
+    def __bool__(self):
+        return bool(self.added or self.removed or self.modified)
+
+
+class Snapshot:
+    """
+    Content of a subtree at one moment, with a Merkle hash on every key:
+    two snapshots are diffed by going down only where the hashes differ.
+
+    before = HKEY.HKEY_LOCAL_MACHINE().snapshot()
+    ... run the installer ...
+    changes = before.diff(HKEY.HKEY_LOCAL_MACHINE().snapshot())
+    """
+
+    def __init__(self, path: str, root: Snap, taken: float = None):
+        self.path = path
+        self.root = root
+        self.taken = taken if taken is not None else tm.time()
+
+    def __repr__(self):
+        return f"<Snapshot '{self.path}' {tm.ctime(self.taken)}>"
+
+    @classmethod
+    def take(cls, key: FKEY, **options):
+        """Record the subtree of key with one walk, walk options allowed."""
+        root = Snap(key.name)
+        nodes = {key.address: root}
+        for record in key.walk(records = True, **options):
+            parent = nodes[record.address.up]
+            if record.is_value:
+                parent.values[record.name.lower()] = (record.name, record.value, record.type)
+            else:
+                snap = nodes[record.address] = Snap(record.name)
+                parent.keys[record.name.lower()] = snap
+
+        # seal the subkeys before their parent
+        stack = [(root, False)]
+        while stack:
+            snap, ready = stack.pop()
+            if ready:
+                snap.seal()
+            else:
+                stack.append((snap, True))
+                stack.extend((key, False) for key in snap.keys.values())
+        return cls(key.address.str, root)
+
+    def save(self, path: str):
+        data = {"path": self.path, "taken": self.taken, "root": self.root.dump()}
+        with gzip.open(path, "wt", encoding = "utf-8") as f:
+            json.dump(data, f)
+
+    @classmethod
+    def load(cls, path: str):
+        with gzip.open(path, "rt", encoding = "utf-8") as f:
+            data = json.load(f)
+        return cls(data["path"], Snap.load(data["root"]), data["taken"])
+
+    def diff(self, other):
+        """Return what changed from this snapshot to the other, newer one."""
+        diff = Diff()
+        stack = [(self.path, self.root, other.root)]
+        while stack:
+            path, old, new = stack.pop()
+            if old.digest == new.digest:
+                continue
+
+            for lower, (name, value, type_) in new.values.items():
+                if lower not in old.values:
+                    diff.added.append(Change(f"{path}\\{name}", EKEY, None, (value, type_)))
+                elif old.values[lower][1:] != (value, type_):
+                    diff.modified.append(Change(f"{path}\\{name}", EKEY,
+                                                old.values[lower][1:], (value, type_)))
+            for lower, (name, value, type_) in old.values.items():
+                if lower not in new.values:
+                    diff.removed.append(Change(f"{path}\\{name}", EKEY, (value, type_)))
+
+            for lower, key in new.keys.items():
+                if lower not in old.keys:
+                    diff.added.append(Change(f"{path}\\{key.name}", FKEY))
+                else:
+                    stack.append((f"{path}\\{key.name}", old.keys[lower], key))
+            for lower, key in old.keys.items():
+                if lower not in new.keys:
+                    diff.removed.append(Change(f"{path}\\{key.name}", FKEY))
+        return diff
 
 
 
@@ -530,53 +1641,47 @@ class HKEY(FKEY):
         return f"<HKEY '{name}'>"
 
 
-    def search(self, func: object):
-        for k in self.walk():
+    def search(self, func: object, **options):
+        """Yield the keys of walk(**options) accepted by func."""
+        for k in self.walk(**options):
             if func(k):
                 yield k
 
 
     @classmethod
     def registries(cls):
-        return [name for name, value in HKEY.items()]
+        return [name for name, value in HKEY.main().items()]
 
 
     @classmethod
     def HKEY_USERS(cls):
         address = Address("HKEY_USERS")
-        value = winreg.HKEY_USERS
+        value = HKEY.main().get("HKEY_USERS")
         return cls(address, value)
 
     @classmethod
     def HKEY_CLASSES_ROOT(cls):
         address = Address("HKEY_CLASSES_ROOT")
-        return cls(address, winreg.HKEY_CLASSES_ROOT)
+        return cls(address, HKEY.main().get("HKEY_CLASSES_ROOT"))
 
     @classmethod
     def HKEY_CURRENT_CONFIG(cls):
         address = Address("HKEY_CURRENT_CONFIG")
-        return cls(address, winreg.HKEY_CURRENT_CONFIG)
+        return cls(address, HKEY.main().get("HKEY_CURRENT_CONFIG"))
 
     @classmethod
     def HKEY_CURRENT_USER(cls):
         address = Address("HKEY_CURRENT_USER")
-        return cls(address, winreg.HKEY_CURRENT_USER)
+        return cls(address, HKEY.main().get("HKEY_CURRENT_USER"))
 
     @classmethod
     def HKEY_LOCAL_MACHINE(cls):
         address = Address("HKEY_LOCAL_MACHINE")
-        return cls(address, winreg.HKEY_LOCAL_MACHINE)
+        return cls(address, HKEY.main().get("HKEY_LOCAL_MACHINE"))
 
     @staticmethod
     def main():
-        keys = {
-            "HKEY_CLASSES_ROOT": winreg.HKEY_CLASSES_ROOT,
-            "HKEY_CURRENT_CONFIG": winreg.HKEY_CURRENT_CONFIG,
-            "HKEY_CURRENT_USER": winreg.HKEY_CURRENT_USER,
-            "HKEY_LOCAL_MACHINE": winreg.HKEY_LOCAL_MACHINE,
-            "HKEY_USERS": winreg.HKEY_USERS
-            }
-        return keys
+        return ABC.backend.roots()
 
 
 